@@ -10,11 +10,21 @@ from sklearn.preprocessing import StandardScaler
 import joblib
 import os
 import json
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import warnings
 import requests
 import zipfile
 from pathlib import Path
+from instrumentation import span
+from image_io import decode_image, is_animated, iter_animation_frames, DEFAULT_MIN_SIDE
+from image_stats import compute_image_stats
+from audio_features import MelSpectrogramEngine
+from audio_io import load_audio, demux_audio
+from thread_tuning import DEFAULT_PROFILE, load_profile, apply_profile
 warnings.filterwarnings('ignore')
 
 # Import TensorFlow for pre-trained models
@@ -30,105 +40,172 @@ except ImportError:
     print("TensorFlow not available. Please install TensorFlow for accurate detection.")
     TENSORFLOW_AVAILABLE = False
 
-# Import face detection
-try:
-    import dlib
-    FACE_DETECTION_AVAILABLE = True
-except ImportError:
-    print("dlib not available. Face detection will be disabled.")
-    FACE_DETECTION_AVAILABLE = False
+# Face detection (dlib) and FaceForensics++ cropping live in a TensorFlow-free module
+from face_crop import (FACE_DETECTION_AVAILABLE, DEFAULT_INPUT_SIZE, DEFAULT_FACE_SCALE, load_face_detector,
+                       get_boundingbox, crop_face)
 
 class AccurateDeepfakeDetector:
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, load_models=True, cascade=False, audio_model_path=None, thread_profile=None):
         """
         Initialize Accurate Deepfake Detector with pre-trained models
         
         Args:
             model_path: Path to pre-trained deepfake detection model
+            audio_model_path: Weights for the audio CNN (as saved by train_model)
+            load_models: Load the TensorFlow models in this process. Pass False when
+                the models are served by a separate inference process
+                (see attach_remote_models)
+            cascade: Run a cheap detector first and only escalate to the full
+                model when its score is inconclusive (see model_configs['cascade'])
+            thread_profile: Thread limits (dict, or path to a profile written by
+                benchmarks.autotune); defaults to $DEEPSHIELD_THREAD_PROFILE
         """
         self.model_path = model_path
+        self.audio_model_path = audio_model_path
         self.models = {}
         self.scaler = StandardScaler()
         
+        # Xception backbone / classifier head views of the image model and the
+        # optional on-disk store of backbone embeddings (see attach_feature_store)
+        self.image_backbone = None
+        self.image_head = None
+        self.feature_store = None
+        
+        # Multi-backbone image ensemble (built on first use, see model_configs['ensemble']);
+        # optional members hosted by the inference process when attach_remote_models is used
+        self.ensemble = None
+        self.remote_ensemble_members = None
+        
+        # Worker for the soundtrack branch of multimodal video detection (created on first use)
+        self._audio_executor = None
+        
+        # Cascade bookkeeping: per-modality request/escalation counts and stage times
+        self._cascade_lock = threading.Lock()
+        self._cascade_stats = {}
+        
+        # Library thread limits must be in place before TensorFlow starts
+        self.thread_profile = None
+        self.configure_threads(thread_profile)
+        
         # Initialize face detector
-        self.face_detector = None
-        if FACE_DETECTION_AVAILABLE:
-            try:
-                self.face_detector = dlib.get_frontal_face_detector()
-                print("✅ Face detector loaded (dlib)")
-            except Exception as e:
-                print(f"❌ Error loading face detector: {e}")
+        self.face_detector = load_face_detector()
         
         # Initialize models
-        self._load_models()
+        if load_models:
+            self._load_models()
         
         # Model configurations (updated to match FaceForensics++ standards)
         self.model_configs = {
             'image': {
-                'input_size': (299, 299),
+                'input_size': DEFAULT_INPUT_SIZE,
                 'preprocessing': 'faceforensics',  # Updated preprocessing
                 'threshold': 0.5,
-                'face_scale': 1.3  # Face crop scale factor
+                'face_scale': DEFAULT_FACE_SCALE,  # Face crop scale factor
+                'decode_min_side': DEFAULT_MIN_SIDE,  # JPEGs are reduced while decoding down to this short side (0 = full size)
+                'patch_analysis': False,  # Without a face, score native-detail tiles instead of the downscaled whole image
+                'patch_scales': (1.0, 0.5),  # Image scales tiled into input_size patches
+                'max_patches': 32,  # Patches per forward pass; coarse scales are kept whole, the finest is subsampled
+                # Threshold for the top-quartile patch score. UNCALIBRATED: the top-quartile mean sits above
+                # the whole-image score, so 0.5 leans towards deepfake; tune on labelled face-less images
+                'patch_threshold': 0.5
             },
             'video': {
-                'input_size': (299, 299),
+                'input_size': DEFAULT_INPUT_SIZE,
                 'frame_sample_rate': 1,
+                'max_frames': 30,
                 'threshold': 0.5,
-                'face_scale': 1.3
+                'face_scale': DEFAULT_FACE_SCALE,
+                'early_stopping': False,  # Score frames in batches and stop once the verdict is settled
+                'early_stop_batch_size': 4,
+                'early_stop_min_frames': 8,
+                'early_stop_z': 2.58,  # ~99% two-sided confidence bound on the mean frame score
+                'early_stop_min_std': 0.05,
+                'dedup_threshold': 3.0,  # Mean abs thumbnail difference below which a frame counts as a near duplicate (0 disables)
+                'dedup_thumbnail_size': (64, 48),
+                'dedup_max_skipped': 100,  # Near duplicates skipped outright before falling back to stride sampling
+                'dedup_fallback_stride': 10,  # Past that budget, keep one near duplicate per this many sampled frames
+                'inference_batch_size': 8,  # Frames per model call
+                'multimodal': False,  # Also score the soundtrack with the audio CNN, concurrently with the frames
+                'audio_weight': 0.3  # Share of the soundtrack score in the fused video score
             },
             'audio': {
                 'sample_rate': 16000,
                 'duration': 3.0,
-                'threshold': 0.5
+                'threshold': 0.5,
+                'max_duration': 60.0  # Only this many seconds from the start are decoded (None = whole file)
+            },
+            'live': {
+                'thumbnail_size': (64, 48),  # Grayscale proxy used for the change signal
+                'change_threshold': 4.0,  # Mean abs pixel difference below which the last score is reused
+                'max_reuse_frames': 15,  # Force a fresh inference at least this often
+                'ema_alpha': 0.3  # Weight of the newest inference in the smoothed score
+            },
+            'cascade': {
+                'enabled': cascade,
+                'uncertainty_band': (0.35, 0.65),  # Cheap scores inside this band escalate to the full model
+                'cheap_model_path': None,  # Trained EfficientNetB0 weights; without them the cascade is bypassed
+                'cheap_input_size': (224, 224)
+            },
+            'ensemble': {
+                'enabled': False,
+                # Optional backbones next to the Xception image model; each is only built when trained weights exist
+                'members': {
+                    'efficientnet_b0': {'weights': None, 'input_size': (224, 224), 'weight': 1.0},
+                    'resnet50': {'weights': None, 'input_size': (224, 224), 'weight': 1.0}
+                },
+                'xception_weight': 1.0,
+                'max_workers': self.thread_profile['ensemble_workers'] or 3,  # Optional members scored concurrently
+                'latency_budget_ms': None  # Drop optional members that would exceed this (None = wait for all)
             }
         }
         
+        # Mel filterbank/window are cached per configuration; clips are featurized in batches
+        self.audio_engine = MelSpectrogramEngine(sr=self.model_configs['audio']['sample_rate'])
+        
         print("🎯 Accurate Deepfake Detector Initialized!")
         print("📊 Using FaceForensics++ compatible preprocessing")
     
-    def _get_boundingbox(self, face, width, height, scale=1.3, minsize=None):
+    def _get_boundingbox(self, face, width, height, scale=DEFAULT_FACE_SCALE, minsize=None):
         """
         Generate bounding box for face detection (from FaceForensics++)
         """
-        x1 = face.left()
-        y1 = face.top()
-        x2 = face.right()
-        y2 = face.bottom()
-        size_bb = int(max(x2 - x1, y2 - y1) * scale)
-        if minsize:
-            if size_bb < minsize:
-                size_bb = minsize
-        center_x, center_y = (x1 + x2) // 2, (y1 + y2) // 2
-
-        # Check for out of bounds
-        x1 = max(int(center_x - size_bb // 2), 0)
-        y1 = max(int(center_y - size_bb // 2), 0)
-        size_bb = min(width - x1, size_bb)
-        size_bb = min(height - y1, size_bb)
-
-        return x1, y1, size_bb
+        return get_boundingbox(face, width, height, scale=scale, minsize=minsize)
     
-    def _detect_and_crop_face(self, image):
+    @span('face_detect')
+    def _detect_and_crop_face(self, image, keep_image=True):
         """
         Detect face and crop it with proper scaling
+        
+        Args:
+            keep_image: Return the whole image when no face is found (None when False)
+        """
+        return crop_face(self.face_detector, image, scale=self.model_configs['image']['face_scale'],
+                         keep_image=keep_image)
+    
+    def _crop_config(self):
+        """Image crop settings the crop-cache workers reproduce (see dataset_cache.CropCache.build)"""
+        return {key: self.model_configs['image'][key] for key in ('input_size', 'face_scale', 'decode_min_side')}
+    
+    def configure_threads(self, profile=None):
+        """
+        Apply a thread topology (see thread_tuning). OpenCV and BLAS limits
+        can change at any time; TensorFlow's only before its first op, so
+        profiles meant for TF belong in the constructor.
+        
+        Args:
+            profile: dict of thread_tuning settings, a profile JSON path, or
+                None for $DEEPSHIELD_THREAD_PROFILE (library defaults when unset)
         """
-        if self.face_detector is None:
-            return image  # Return original if no face detector
-        
-        # Convert to grayscale for face detection
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        faces = self.face_detector(gray, 1)
-        
-        if len(faces) > 0:
-            # Take the biggest face
-            face = faces[0]
-            height, width = image.shape[:2]
-            x, y, size = self._get_boundingbox(face, width, height, 
-                                             scale=self.model_configs['image']['face_scale'])
-            cropped_face = image[y:y+size, x:x+size]
-            return cropped_face
+        if profile is None or isinstance(profile, str):
+            profile = load_profile(profile)
         else:
-            return image  # Return original if no face detected
+            profile = dict(DEFAULT_PROFILE, **profile)
+        self.thread_profile = profile
+        
+        applied = apply_profile(profile)
+        if applied:
+            print("🧵 Thread limits: " + ", ".join(f"{key}={value}" for key, value in applied.items()))
+        return applied
     
     def _load_models(self):
         """Load pre-trained deepfake detection models"""
@@ -165,6 +242,7 @@ class AccurateDeepfakeDetector:
                 model.load_weights(self.model_path)
                 self.models['image'] = model
                 print("✅ Custom deepfake detection model loaded!")
+                self._split_image_model()
             else:
                 print("⚠️ WARNING: Using XceptionNet with ImageNet weights. This is NOT a real deepfake detector! Results will be unreliable. Please provide real deepfake detection weights for accurate results.")
                 base_model = Xception(weights='imagenet', include_top=False, input_shape=(299, 299, 3))
@@ -184,10 +262,75 @@ class AccurateDeepfakeDetector:
                     metrics=['accuracy']
                 )
                 print("✅ Image model loaded (Xception-based, ImageNet weights)")
+                self._split_image_model()
         except Exception as e:
             print(f"❌ Error loading image model: {e}")
             self.models['image'] = None
     
+    def _split_image_model(self):
+        """
+        Build backbone (input -> 2048-d pooled features) and head (pooled
+        features -> score) views of the image model. Both share the full
+        model's layers and weights, so custom weights keep loading into the
+        single-graph model as before.
+        """
+        model = self.models['image']
+        pool_index = max(i for i, layer in enumerate(model.layers) if isinstance(layer, GlobalAveragePooling2D))
+        pooled = model.layers[pool_index].output
+        
+        self.image_backbone = Model(inputs=model.input, outputs=pooled)
+        head_input = tf.keras.Input(shape=(pooled.shape[-1],))
+        x = head_input
+        for layer in model.layers[pool_index + 1:]:
+            x = layer(x)
+        self.image_head = Model(inputs=head_input, outputs=x)
+    
+    def attach_feature_store(self, store):
+        """
+        Cache Xception embeddings of image inputs in a feature_store.FeatureStore.
+        Repeated inputs then only run the head; a retrained head or a new
+        threshold can be evaluated on the stored embeddings directly.
+        """
+        if self.image_backbone is None:
+            print("⚠️ Feature store needs a local image model; embeddings will not be cached")
+            return
+        self.feature_store = store
+        
+        weights = 'imagenet'
+        if self.model_path and os.path.exists(self.model_path):
+            info = os.stat(self.model_path)
+            weights = f"{os.path.abspath(self.model_path)}:{info.st_size}:{int(info.st_mtime)}"
+        self._embedding_namespace = f"xception:{weights}"
+        print(f"✅ Feature store attached ({len(store)} embeddings)")
+    
+    def image_embeddings(self, x, labels=None):
+        """
+        2048-d backbone embeddings for a batch of preprocessed inputs (N, 299, 299, 3),
+        served from the feature store when present and computed (then stored) otherwise
+        
+        Args:
+            x: Preprocessed image batch
+            labels: Optional 0/1 labels stored alongside the embeddings for head training
+        """
+        from feature_store import content_key
+        
+        if self.feature_store is None:
+            with span('inference'):
+                return self.image_backbone.predict(x)
+        
+        keys = [content_key(item, self._embedding_namespace) for item in x]
+        vectors, missing = self.feature_store.get_many(keys)
+        if missing:
+            with span('inference'):
+                computed = self.image_backbone.predict(x[missing])
+            self.feature_store.put_many([keys[i] for i in missing], computed,
+                                        labels=None if labels is None else [labels[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+        elif labels is not None:
+            self.feature_store.put_many(keys, np.array(vectors), labels=labels)
+        return np.stack(vectors)
+    
     def _load_audio_model(self):
         """Load pre-trained audio deepfake detection model"""
         try:
@@ -210,6 +353,10 @@ class AccurateDeepfakeDetector:
                 metrics=['accuracy']
             )
             
+            if self.audio_model_path and os.path.exists(self.audio_model_path):
+                self.models['audio'].load_weights(self.audio_model_path)
+                print("🔗 Audio weights loaded from:", self.audio_model_path)
+            
             print("✅ Audio model loaded (CNN-based)")
             
         except Exception as e:
@@ -227,6 +374,27 @@ class AccurateDeepfakeDetector:
             print(f"❌ Error loading video model: {e}")
             self.models['video'] = None
     
+    def attach_remote_models(self, client):
+        """
+        Use models hosted by the shared inference process instead of local copies
+        
+        Args:
+            client: inference_server.InferenceClient connected to the inference process
+        """
+        from inference_server import RemoteModel
+        
+        available = client.available_models()
+        # A model the server does not host is disabled here rather than loaded
+        # locally, so every worker keeps to pre/post-processing memory
+        for name in ('image', 'video', 'audio', 'cascade_image'):
+            self.models[name] = RemoteModel(client, name) if name in available else None
+        if 'image_backbone' in available and 'image_head' in available:
+            self.image_backbone = RemoteModel(client, 'image_backbone')
+            self.image_head = RemoteModel(client, 'image_head')
+        self.remote_ensemble_members = {name[len('ensemble_'):]: RemoteModel(client, name)
+                                        for name in available if name.startswith('ensemble_')}
+        print(f"✅ Using shared inference process models: {', '.join(available) or 'none'}")
+    
     def _download_pretrained_models(self):
         """Download pre-trained models from online sources"""
         print("📥 This feature requires manual model download.")
@@ -244,13 +412,30 @@ class AccurateDeepfakeDetector:
     def preprocess_image(self, image_path):
         """Preprocess image for model input (FaceForensics++ compatible)"""
         try:
-            # Load image using OpenCV for face detection
-            img = cv2.imread(image_path)
+            # Load image using OpenCV for face detection, reduced while decoding
+            with span('decode'):
+                img = decode_image(image_path, self.model_configs['image']['decode_min_side'])
             if img is None:
                 return None
             
+            return self.preprocess_image_array(img)
+            
+        except Exception as e:
+            print(f"❌ Error preprocessing image: {e}")
+            return None
+    
+    @span('preprocess')
+    def preprocess_image_array(self, img, crop_face=True):
+        """
+        Preprocess an already decoded BGR image (FaceForensics++ compatible)
+        
+        Args:
+            img: BGR image array
+            crop_face: Run face detection first. Pass False when img is already a face crop
+        """
+        try:
             # Detect and crop face if face detector is available
-            if self.face_detector is not None:
+            if crop_face and self.face_detector is not None:
                 img = self._detect_and_crop_face(img)
             
             # Convert BGR to RGB
@@ -280,21 +465,13 @@ class AccurateDeepfakeDetector:
         """Preprocess audio for model input"""
         try:
             # Load audio
-            y, sr = librosa.load(audio_path, sr=self.model_configs['audio']['sample_rate'])
-            
-            # Extract mel spectrogram
-            mel_spec = librosa.feature.melspectrogram(y=y, sr=sr, n_mels=128)
-            mel_spec_db = librosa.power_to_db(mel_spec, ref=np.max)
-            
-            # Resize to model input size
-            mel_spec_resized = cv2.resize(mel_spec_db, (128, 128))
-            
-            # Normalize
-            mel_spec_normalized = (mel_spec_resized - np.mean(mel_spec_resized)) / np.std(mel_spec_resized)
+            with span('decode'):
+                y, sr = load_audio(audio_path, sr=self.model_configs['audio']['sample_rate'],
+                                   duration=self.model_configs['audio']['max_duration'])
             
-            # Add channel dimension
-            x = np.expand_dims(mel_spec_normalized, axis=-1)
-            x = np.expand_dims(x, axis=0)
+            with span('preprocess'):
+                # Mel spectrogram in dB, resized to 128x128 and standardized: (1, 128, 128, 1)
+                x = self.audio_engine.features([y])
             
             return x
             
@@ -302,21 +479,114 @@ class AccurateDeepfakeDetector:
             print(f"❌ Error preprocessing audio: {e}")
             return None
     
-    def preprocess_video(self, video_path):
-        """Preprocess video for model input (FaceForensics++ compatible)"""
+    def preprocess_audio_batch(self, audio_paths):
+        """
+        Preprocess several audio files into one (N, 128, 128, 1) batch
+        
+        Returns:
+            (batch or None, indices of the paths that decoded)
+        """
+        clips, decoded = [], []
+        for i, audio_path in enumerate(audio_paths):
+            try:
+                with span('decode'):
+                    y, _ = load_audio(audio_path, sr=self.model_configs['audio']['sample_rate'],
+                                      duration=self.model_configs['audio']['max_duration'])
+                clips.append(y)
+                decoded.append(i)
+            except Exception as e:
+                print(f"❌ Error decoding audio {audio_path}: {e}")
+        
+        if not clips:
+            return None, []
+        with span('preprocess'):
+            return self.audio_engine.features(clips), decoded
+    
+    @span('preprocess')
+    def preprocess_video(self, video_path, progress_callback=None, frame_stats=None):
+        """
+        Preprocess video for model input (FaceForensics++ compatible)
+        
+        Args:
+            video_path: Path to the video file
+            progress_callback: Optional callable (stage, done, total); returning
+                False stops frame extraction early
+            frame_stats: Optional dict filled with decode/duplicate counts
+        """
         try:
-            cap = cv2.VideoCapture(video_path)
             frames = []
+            max_frames = self.model_configs['video']['max_frames']
+            
+            frame_iter = self._iter_video_frames(video_path, frame_stats)
+            try:
+                for frame_processed in frame_iter:
+                    frames.append(frame_processed)
+                    
+                    if progress_callback is not None and progress_callback('preprocess', len(frames), max_frames) is False:
+                        break
+            finally:
+                frame_iter.close()
             
+            if frames:
+                return np.array(frames)
+            else:
+                return None
+                
+        except Exception as e:
+            print(f"❌ Error preprocessing video: {e}")
+            return None
+    
+    def _iter_video_frames(self, video_path, frame_stats=None):
+        """
+        Lazily decode, face-crop and normalize sampled frames, up to max_frames.
+        Sampled frames nearly identical to the last kept one are skipped before
+        face detection, so the budget goes to visually distinct moments. Once
+        dedup_max_skipped duplicates have been skipped, a run of duplicates
+        keeps one frame per dedup_fallback_stride sampled frames, which bounds
+        decoding on static footage without accepting every frame.
+        
+        Args:
+            video_path: Path to the video file
+            frame_stats: Optional dict updated with 'frames_decoded' and 'duplicates_skipped'
+        """
+        config = self.model_configs['video']
+        if frame_stats is None:
+            frame_stats = {}
+        frame_stats.update(frames_decoded=0, duplicates_skipped=0)
+        
+        source = self._read_frames(video_path)
+        try:
             frame_count = 0
-            sample_rate = self.model_configs['video']['frame_sample_rate']
+            yielded = 0
+            sample_rate = config['frame_sample_rate']
+            max_frames = config['max_frames']
+            last_thumbnail = None
+            duplicates_since_kept = 0
             
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
+            while yielded < max_frames:
+                with span('decode'):
+                    frame = next(source, None)
+                if frame is None:
                     break
+                frame_stats['frames_decoded'] += 1
                 
                 if frame_count % sample_rate == 0:
+                    # Near-duplicate check on a small grayscale proxy
+                    if config['dedup_threshold'] > 0:
+                        small = cv2.resize(frame, config['dedup_thumbnail_size'], interpolation=cv2.INTER_AREA)
+                        thumbnail = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+                        if last_thumbnail is not None and \
+                                np.mean(cv2.absdiff(thumbnail, last_thumbnail)) < config['dedup_threshold']:
+                            duplicates_since_kept += 1
+                            # Skip budget spent: fall back to stride sampling through the duplicates
+                            if frame_stats['duplicates_skipped'] < config['dedup_max_skipped'] or \
+                                    duplicates_since_kept < config['dedup_fallback_stride']:
+                                frame_stats['duplicates_skipped'] += 1
+                                frame_count += 1
+                                continue
+                        last_thumbnail = thumbnail
+                        duplicates_since_kept = 0
+                    
                     # Detect and crop face if face detector is available
                     if self.face_detector is not None:
                         frame = self._detect_and_crop_face(frame)
@@ -335,38 +605,72 @@ class AccurateDeepfakeDetector:
                     frame_processed = frame_processed / 255.0  # Normalize to [0, 1]
                     frame_processed = (frame_processed - 0.5) / 0.5  # Normalize to [-1, 1]
                     
-                    frames.append(frame_processed)
+                    yielded += 1
+                    yield frame_processed
                 
                 frame_count += 1
-                
-                # Limit number of frames
-                if len(frames) >= 30:
+        finally:
+            source.close()
+    
+    def _read_frames(self, video_path):
+        """BGR frames of a video, or of an animated image (GIF/WebP/APNG) decoded lazily with PIL"""
+        if is_animated(video_path):
+            yield from iter_animation_frames(video_path)
+            return
+        
+        cap = cv2.VideoCapture(video_path)
+        try:
+            while cap.isOpened():
+                ret, frame = cap.read()
+                if not ret:
                     break
-            
+                yield frame
+        finally:
             cap.release()
-            
-            if frames:
-                return np.array(frames)
-            else:
-                return None
-                
-        except Exception as e:
-            print(f"❌ Error preprocessing video: {e}")
-            return None
     
     def predict_image(self, image_path):
         """Predict deepfake in image using pre-trained model"""
+        with span('decode'):
+            img = decode_image(image_path, self.model_configs['image']['decode_min_side'])
+        if img is None:
+            return None
+        
+        return self.predict_image_array(img)
+    
+    def predict_image_array(self, img):
+        """Predict deepfake in an already decoded BGR image"""
+        if self.models['image'] and self.model_configs['cascade']['enabled'] and self._cheap_image_model() is not None:
+            return self._cascade_image_prediction(img)
+        
+        return self._predict_image_model(img)
+    
+    def _predict_image_model(self, img, crop_face=True):
+        """Score a decoded BGR image with the full image model"""
         try:
             if not self.models['image']:
-                return self._fallback_image_prediction(image_path)
+                return self._fallback_image_array_prediction(img)
+            # Patches only replace the whole-image fallback when a face detector ran and found nothing
+            if crop_face and self.model_configs['image']['patch_analysis'] and self.face_detector is not None:
+                face = self._detect_and_crop_face(img, keep_image=False)
+                if face is None:
+                    return self._predict_image_patches(img)
+                img, crop_face = face, False
+            if self.model_configs['ensemble']['enabled']:
+                return self._ensemble_image_prediction(img, crop_face=crop_face)
             
             # Preprocess image
-            x = self.preprocess_image(image_path)
+            x = self.preprocess_image_array(img, crop_face=crop_face)
             if x is None:
                 return None
             
-            # Make prediction
-            prediction = self.models['image'].predict(x)[0][0]
+            # Make prediction; with a feature store only the head runs on repeated inputs
+            if self.feature_store is not None:
+                embedding = self.image_embeddings(x)
+                with span('inference'):
+                    prediction = self.image_head.predict(embedding)[0][0]
+            else:
+                with span('inference'):
+                    prediction = self.models['image'].predict(x)[0][0]
             
             # Determine result
             is_deepfake = prediction > self.model_configs['image']['threshold']
@@ -382,10 +686,110 @@ class AccurateDeepfakeDetector:
             
         except Exception as e:
             print(f"❌ Error in image prediction: {e}")
-            return self._fallback_image_prediction(image_path)
+            return self._fallback_image_array_prediction(img)
+    
+    def _predict_image_without_face(self, img):
+        """Full-model score of an image with no detectable face"""
+        if self.models['image'] and self.model_configs['image']['patch_analysis']:
+            return self._predict_image_patches(img)
+        return self._predict_image_model(img, crop_face=False)
+    
+    def _image_patches(self, img):
+        """
+        Tile a BGR image into input_size patches at each configured scale.
+        Tiles along an axis are spread evenly, overlapping as needed to reach
+        the edges; scales too small to hold a single patch are skipped. When
+        the tiles exceed max_patches, coarse scales are kept whole and the
+        finest one is subsampled evenly.
+        
+        Returns:
+            (patches, layout): list of BGR patches and, per scale, a dict with
+            'scale', 'rows', 'cols' and the (row, col) of each patch kept
+        """
+        config = self.model_configs['image']
+        width, height = config['input_size']
+        img_height, img_width = img.shape[:2]
+        
+        def starts(length, size):
+            count = -(-length // size)
+            return np.linspace(0, length - size, count).round().astype(int) if count > 1 else np.array([0])
+        
+        patches, layout = [], []
+        budget = config['max_patches']
+        for scale in sorted(config['patch_scales']):
+            scaled_width, scaled_height = int(img_width * scale), int(img_height * scale)
+            if scaled_width < width or scaled_height < height or budget <= 0:
+                continue
+            scaled = img if scale == 1.0 else cv2.resize(img, (scaled_width, scaled_height), interpolation=cv2.INTER_AREA)
+            ys, xs = starts(scaled_height, height), starts(scaled_width, width)
+            cells = [(row, col) for row in range(len(ys)) for col in range(len(xs))]
+            if len(cells) > budget:
+                cells = [cells[i] for i in np.linspace(0, len(cells) - 1, budget).round().astype(int)]
+            budget -= len(cells)
+            
+            for row, col in cells:
+                patches.append(scaled[ys[row]:ys[row] + height, xs[col]:xs[col] + width])
+            layout.append({'scale': scale, 'rows': len(ys), 'cols': len(xs), 'cells': cells})
+        return patches, layout
+    
+    def _predict_image_patches(self, img):
+        """
+        Score an image with no face from native-detail patches in one batch.
+        Generator artifacts are often local, so the image score is the mean of
+        the top quarter of patch scores rather than the mean of all patches.
+        """
+        try:
+            with span('preprocess'):
+                patches, layout = self._image_patches(img)
+                if not patches:
+                    return self._predict_image_model(img, crop_face=False)  # Smaller than one patch
+                x = np.stack([cv2.cvtColor(patch, cv2.COLOR_BGR2RGB) for patch in patches]).astype(np.float32)
+                x = x / 127.5 - 1.0  # [-1, 1], as preprocess_image_array
+            with span('inference'):
+                scores = np.asarray(self.models['image'].predict(x)).reshape(-1)
+            
+            top = np.sort(scores)[-max(1, len(scores) // 4):]
+            prediction = float(top.mean())
+            is_deepfake = prediction > self.model_configs['image']['patch_threshold']
+            confidence = prediction * 100 if is_deepfake else (1 - prediction) * 100
+            
+            # Heatmap-ready grids: one rows x cols list per scale, None where a tile was not sampled
+            grids, index = [], 0
+            for entry in layout:
+                grid = [[None] * entry['cols'] for _ in range(entry['rows'])]
+                for row, col in entry['cells']:
+                    grid[row][col] = round(float(scores[index]), 4)
+                    index += 1
+                grids.append({'scale': entry['scale'], 'rows': entry['rows'], 'cols': entry['cols'], 'grid': grid})
+            
+            return {
+                'is_deepfake': bool(is_deepfake),
+                'confidence': float(confidence),
+                'raw_score': prediction,
+                'model_used': 'pre_trained_xception_patches',
+                'preprocessing': self.model_configs['image']['preprocessing'],
+                'patch_analysis': {
+                    'patches': len(patches),
+                    'threshold': self.model_configs['image']['patch_threshold'],
+                    'calibrated': False,
+                    'max_score': float(scores.max()),
+                    'mean_score': float(scores.mean()),
+                    'scales': grids
+                }
+            }
+        
+        except Exception as e:
+            print(f"❌ Error in patch prediction: {e}")
+            return self._fallback_image_array_prediction(img)
     
     def predict_audio(self, audio_path):
         """Predict deepfake in audio using pre-trained model"""
+        # No trained cheap audio stage exists: the spectral heuristics are not
+        # calibrated, so letting them settle verdicts would change results
+        return self._predict_audio_model(audio_path)
+    
+    def _predict_audio_model(self, audio_path):
+        """Score an audio file with the full audio model"""
         try:
             if not self.models['audio']:
                 return self._fallback_audio_prediction(audio_path)
@@ -396,7 +800,8 @@ class AccurateDeepfakeDetector:
                 return None
             
             # Make prediction
-            prediction = self.models['audio'].predict(x)[0][0]
+            with span('inference'):
+                prediction = self.models['audio'].predict(x)[0][0]
             
             # Determine result
             is_deepfake = prediction > self.model_configs['audio']['threshold']
@@ -414,23 +819,115 @@ class AccurateDeepfakeDetector:
             print(f"❌ Error in audio prediction: {e}")
             return self._fallback_audio_prediction(audio_path)
     
-    def predict_video(self, video_path):
+    def predict_video(self, video_path, progress_callback=None):
         """Predict deepfake in video using pre-trained model"""
+        if self.model_configs['video']['multimodal'] and self.models.get('audio'):
+            return self._predict_video_multimodal(video_path, progress_callback)
+        
+        return self._predict_video_frames(video_path, progress_callback)
+    
+    def _predict_video_frames(self, video_path, progress_callback=None):
+        """Frame-only video prediction (full model; no calibrated cheap video stage exists)"""
+        return self._predict_video_model(video_path, progress_callback)
+    
+    def _predict_audio_track(self, video_path):
+        """Score a video's soundtrack with the audio CNN; None when there is no usable audio"""
+        start = time.perf_counter()
+        try:
+            config = self.model_configs['audio']
+            with span('decode'):
+                y = demux_audio(video_path, sr=config['sample_rate'], duration=config['max_duration'])
+            if y is None or len(y) < config['sample_rate'] // 2:
+                return None
+            
+            with span('preprocess'):
+                x = self.audio_engine.features([y])
+            with span('inference'):
+                prediction = self.models['audio'].predict(x)[0][0]
+            
+            is_deepfake = prediction > config['threshold']
+            return {
+                'is_deepfake': bool(is_deepfake),
+                'confidence': float(prediction * 100 if is_deepfake else (1 - prediction) * 100),
+                'raw_score': float(prediction),
+                'audio_seconds': round(len(y) / config['sample_rate'], 2),
+                'latency_ms': round((time.perf_counter() - start) * 1000, 2),
+                'model_used': 'pre_trained_cnn',
+                'preprocessing': 'mel_spectrogram'
+            }
+        
+        except Exception as e:
+            print(f"❌ Error in soundtrack prediction: {e}")
+            return None
+    
+    def _predict_video_multimodal(self, video_path, progress_callback=None):
+        """
+        Score frames and soundtrack concurrently and fuse the verdicts; wall
+        time is that of the slower branch. The soundtrack runs on a worker
+        thread with this context copied, so its spans stay attributed to
+        the video detection.
+        """
+        if self._audio_executor is None:
+            with self._cascade_lock:
+                if self._audio_executor is None:
+                    self._audio_executor = ThreadPoolExecutor(max_workers=self.thread_profile['soundtrack_workers'] or 2,
+                                                              thread_name_prefix="deepshield-soundtrack")
+        
+        audio_future = self._audio_executor.submit(contextvars.copy_context().run, self._predict_audio_track, video_path)
+        
+        start = time.perf_counter()
+        frames = self._predict_video_frames(video_path, progress_callback)
+        frames_ms = round((time.perf_counter() - start) * 1000, 2)
+        audio = audio_future.result()
+        
+        if frames is None:
+            return None
+        
+        result = dict(frames)
+        result['frames_latency_ms'] = frames_ms
+        result['audio_track'] = audio
+        if audio is None:
+            result['modalities'] = ['frames']
+            return result
+        
+        weight = self.model_configs['video']['audio_weight']
+        fused = (1 - weight) * frames['raw_score'] + weight * audio['raw_score']
+        is_deepfake = fused > self.model_configs['video']['threshold']
+        result.update({
+            'is_deepfake': bool(is_deepfake),
+            'confidence': float(fused * 100 if is_deepfake else (1 - fused) * 100),
+            'raw_score': float(fused),
+            'frame_score': frames['raw_score'],
+            'modalities': ['frames', 'audio'],
+            'model_used': f"{frames['model_used']}+audio_cnn"
+        })
+        return result
+    
+    def _predict_video_model(self, video_path, progress_callback=None):
+        """Score a video with the full frame model"""
         try:
             if not self.models['video']:
                 return self._fallback_video_prediction(video_path)
             
+            if self.model_configs['video']['early_stopping']:
+                return self._predict_video_sequential(video_path, progress_callback)
+            
             # Preprocess video
-            frames = self.preprocess_video(video_path)
+            frame_stats = {}
+            frames = self.preprocess_video(video_path, progress_callback=progress_callback, frame_stats=frame_stats)
             if frames is None:
                 return None
             
-            # Make predictions on frames
+            # Make predictions on frames, a batch per model call
             predictions = []
-            for frame in frames:
-                frame_expanded = np.expand_dims(frame, axis=0)
-                pred = self.models['video'].predict(frame_expanded)[0][0]
-                predictions.append(pred)
+            batch_size = self.model_configs['video']['inference_batch_size']
+            for start in range(0, len(frames), batch_size):
+                with span('inference'):
+                    scores = self.models['video'].predict(frames[start:start + batch_size])[:, 0]
+                predictions.extend(scores)
+                
+                if progress_callback is not None and progress_callback('inference', len(predictions), len(frames)) is False:
+                    break
             
             # Aggregate predictions
             avg_prediction = np.mean(predictions)
@@ -446,6 +943,7 @@ class AccurateDeepfakeDetector:
                 'raw_score': float(avg_prediction),
                 'frame_consistency': float(1 - std_prediction),
                 'frames_analyzed': len(predictions),
+                'duplicate_frames_skipped': frame_stats['duplicates_skipped'],
                 'model_used': 'pre_trained_xception_frames',
                 'preprocessing': 'frame_sampling'
             }
@@ -454,20 +952,306 @@ class AccurateDeepfakeDetector:
             print(f"❌ Error in video prediction: {e}")
             return self._fallback_video_prediction(video_path)
     
+    def _load_cascade_model(self):
+        """
+        Load the EfficientNetB0 classifier used as the cheap image stage.
+        Only built when trained weights are configured: an untrained head would
+        settle verdicts at random instead of deferring to the full model.
+        """
+        weights_path = self.model_configs['cascade']['cheap_model_path']
+        if not TENSORFLOW_AVAILABLE or not weights_path or not os.path.exists(weights_path):
+            self.models['cascade_image'] = None
+            return
+        
+        try:
+            self.models['cascade_image'] = self._build_classifier(EfficientNetB0, self.model_configs['cascade']['cheap_input_size'],
+                                                                  weights_path)
+            print("✅ Cascade model loaded (EfficientNetB0)")
+        except Exception as e:
+            print(f"❌ Error loading cascade model: {e}")
+            self.models['cascade_image'] = None
+    
+    def _build_classifier(self, backbone, input_size, weights_path):
+        """Backbone + pooled sigmoid head, loaded from trained weights"""
+        width, height = input_size
+        base_model = backbone(weights=None, include_top=False, input_shape=(height, width, 3))
+        x = base_model.output
+        x = GlobalAveragePooling2D()(x)
+        x = Dropout(0.3)(x)
+        predictions = Dense(1, activation='sigmoid')(x)
+        model = Model(inputs=base_model.input, outputs=predictions)
+        model.load_weights(weights_path)
+        return model
+    
+    def _load_ensemble(self):
+        """
+        Register Xception (the image model, always awaited) and every optional
+        backbone with trained weights in a ModelEnsemble
+        """
+        from ensemble import ModelEnsemble, EnsembleMember
+        
+        config = self.model_configs['ensemble']
+        ensemble = ModelEnsemble(max_workers=config['max_workers'], latency_budget_ms=config['latency_budget_ms'])
+        ensemble.register(EnsembleMember('xception', self.models['image'], self.model_configs['image']['input_size'],
+                                         'xception', weight=config['xception_weight'], required=True))
+        
+        backbones = {'efficientnet_b0': (EfficientNetB0, 'efficientnet'), 'resnet50': (ResNet50, 'caffe')}
+        for name, member in config['members'].items():
+            if self.remote_ensemble_members is not None:
+                if name in self.remote_ensemble_members:
+                    ensemble.register(EnsembleMember(name, self.remote_ensemble_members[name], member['input_size'],
+                                                     backbones[name][1], weight=member['weight']))
+                continue
+            if name not in backbones or not member['weights'] or not os.path.exists(member['weights']):
+                continue
+            backbone, normalization = backbones[name]
+            try:
+                model = self._build_classifier(backbone, member['input_size'], member['weights'])
+                ensemble.register(EnsembleMember(name, model, member['input_size'], normalization, weight=member['weight']))
+                print(f"✅ Ensemble member loaded ({name})")
+            except Exception as e:
+                print(f"❌ Error loading ensemble member {name}: {e}")
+        
+        self.ensemble = ensemble
+    
+    def _ensemble_image_prediction(self, img, crop_face=True):
+        """Score a decoded BGR image with every scheduled ensemble member and fuse the scores"""
+        if self.ensemble is None:
+            with self._cascade_lock:
+                if self.ensemble is None:
+                    self._load_ensemble()
+        
+        try:
+            face = self._detect_and_crop_face(img) if crop_face and self.face_detector is not None else img
+            scores, members = self.ensemble.predict([face])
+            prediction = scores[0]
+            
+            is_deepfake = prediction > self.model_configs['image']['threshold']
+            confidence = prediction * 100 if is_deepfake else (1 - prediction) * 100
+            
+            return {
+                'is_deepfake': bool(is_deepfake),
+                'confidence': float(confidence),
+                'raw_score': float(prediction),
+                'model_used': 'ensemble_' + '+'.join(name for name, value in members.items() if not isinstance(value, str)),
+                'preprocessing': self.model_configs['image']['preprocessing'],
+                'ensemble': {name: value if isinstance(value, str) else float(value[0]) for name, value in members.items()}
+            }
+        
+        except Exception as e:
+            print(f"❌ Error in ensemble prediction: {e}")
+            return self._fallback_image_array_prediction(img)
+    
+    def _cheap_image_model(self):
+        """
+        The trained EfficientNetB0 cheap stage, or None. Without it the image
+        cascade is bypassed: the statistics heuristic only scores 0.5-0.9 and
+        would settle authentic-but-blurry photos as deepfakes.
+        """
+        if 'cascade_image' not in self.models:
+            with self._cascade_lock:
+                if 'cascade_image' not in self.models:
+                    self._load_cascade_model()
+        return self.models['cascade_image']
+    
+    def _cheap_image_prediction(self, face):
+        """Cheap image stage: EfficientNetB0 on the face crop (None escalates to the full model)"""
+        model = self._cheap_image_model()
+        if model is None:
+            return None
+        
+        try:
+            # EfficientNet rescales internally, so it takes RGB in [0, 255]
+            x = cv2.resize(cv2.cvtColor(face, cv2.COLOR_BGR2RGB), self.model_configs['cascade']['cheap_input_size'])
+            x = np.expand_dims(x.astype(np.float32), axis=0)
+            with span('inference'):
+                prediction = model.predict(x)[0][0]
+            
+            is_deepfake = prediction > self.model_configs['image']['threshold']
+            confidence = prediction * 100 if is_deepfake else (1 - prediction) * 100
+            
+            return {
+                'is_deepfake': bool(is_deepfake),
+                'confidence': float(confidence),
+                'raw_score': float(prediction),
+                'model_used': 'cascade_efficientnet_b0',
+                'preprocessing': self.model_configs['image']['preprocessing']
+            }
+        
+        except Exception as e:
+            print(f"❌ Error in cascade image prediction: {e}")
+            return None
+    
+    def _cascade_image_prediction(self, img):
+        """Image cascade; the face is cropped once and shared by both stages"""
+        face = self._detect_and_crop_face(img, keep_image=False) if self.face_detector is not None else img
+        if face is None:
+            return self._run_cascade('image',
+                                     lambda: self._cheap_image_prediction(img),
+                                     lambda: self._predict_image_without_face(img))
+        return self._run_cascade('image',
+                                 lambda: self._cheap_image_prediction(face),
+                                 lambda: self._predict_image_model(face, crop_face=False))
+    
+    def _run_cascade(self, modality, cheap, full):
+        """
+        Run the cheap stage and escalate to the full model only when its
+        raw score falls inside the configured uncertainty band
+        
+        Args:
+            modality: Key of the cascade statistics ('image')
+            cheap: Zero-argument callable returning the cheap prediction
+            full: Zero-argument callable returning the full-model prediction
+        """
+        low, high = self.model_configs['cascade']['uncertainty_band']
+        
+        start = time.perf_counter()
+        with span('cascade_cheap'):
+            cheap_result = cheap()
+        cheap_seconds = time.perf_counter() - start
+        
+        escalated = cheap_result is None or low < cheap_result['raw_score'] < high
+        full_seconds = 0.0
+        result = cheap_result
+        if escalated:
+            start = time.perf_counter()
+            with span('cascade_full'):
+                result = full()
+            full_seconds = time.perf_counter() - start
+        
+        with self._cascade_lock:
+            stats = self._cascade_stats.setdefault(modality, {
+                'requests': 0, 'escalated': 0, 'cheap_seconds': 0.0, 'full_seconds': 0.0
+            })
+            stats['requests'] += 1
+            stats['escalated'] += int(escalated)
+            stats['cheap_seconds'] += cheap_seconds
+            stats['full_seconds'] += full_seconds
+        
+        if result is None:
+            return None
+        
+        result = dict(result)
+        result['cascade'] = {
+            'escalated': escalated,
+            'cheap_model': cheap_result['model_used'] if cheap_result else None,
+            'cheap_score': cheap_result['raw_score'] if cheap_result else None,
+            'cheap_ms': round(cheap_seconds * 1000, 2),
+            'full_ms': round(full_seconds * 1000, 2) if escalated else None
+        }
+        return result
+    
+    def cascade_report(self):
+        """
+        Escalation rate and estimated compute saved by the cascade, per modality.
+        Time saved is the full-model time the settled requests would have cost
+        (priced at the mean measured escalation) minus the cheap stage's cost.
+        """
+        report = {}
+        with self._cascade_lock:
+            for modality, stats in self._cascade_stats.items():
+                total, escalated = stats['requests'], stats['escalated']
+                mean_full = stats['full_seconds'] / escalated if escalated else None
+                entry = {
+                    'requests': total,
+                    'escalated': escalated,
+                    'escalation_rate': escalated / total if total else 0.0,
+                    'mean_cheap_ms': stats['cheap_seconds'] / total * 1000 if total else 0.0,
+                    'mean_full_ms': mean_full * 1000 if mean_full is not None else None,
+                    'estimated_seconds_saved': None,
+                    'estimated_compute_saved': None
+                }
+                if mean_full:
+                    baseline = total * mean_full
+                    saved = (total - escalated) * mean_full - stats['cheap_seconds']
+                    entry['estimated_seconds_saved'] = saved
+                    entry['estimated_compute_saved'] = saved / baseline
+                report[modality] = entry
+        return report
+    
+    def _predict_video_sequential(self, video_path, progress_callback=None):
+        """
+        Score frames in small batches and stop once the verdict is settled:
+        the confidence interval of the running mean score lies entirely on one
+        side of the threshold, or the frame budget (max_frames) is used up
+        """
+        config = self.model_configs['video']
+        threshold = config['threshold']
+        batch_size = config['early_stop_batch_size']
+        
+        predictions = []
+        interval = (0.0, 1.0)
+        settled = False
+        frame_stats = {}
+        frame_iter = self._iter_video_frames(video_path, frame_stats)
+        try:
+            while not settled:
+                with span('preprocess'):
+                    batch = [frame for _, frame in zip(range(batch_size), frame_iter)]
+                if not batch:
+                    break
+                
+                with span('inference'):
+                    scores = self.models['video'].predict(np.array(batch))[:, 0]
+                predictions.extend(float(score) for score in scores)
+                
+                # Normal-approximation bound on the mean; the std floor keeps a few
+                # identical early scores from looking infinitely certain
+                n = len(predictions)
+                std = max(float(np.std(predictions)), config['early_stop_min_std'])
+                margin = config['early_stop_z'] * std / np.sqrt(n)
+                mean = float(np.mean(predictions))
+                interval = (mean - margin, mean + margin)
+                settled = n >= config['early_stop_min_frames'] and (interval[0] > threshold or interval[1] < threshold)
+                
+                if progress_callback is not None and progress_callback('inference', n, config['max_frames']) is False:
+                    break
+        finally:
+            frame_iter.close()
+        
+        if not predictions:
+            return None
+        
+        avg_prediction = np.mean(predictions)
+        std_prediction = np.std(predictions)
+        
+        is_deepfake = avg_prediction > threshold
+        confidence = avg_prediction * 100 if is_deepfake else (1 - avg_prediction) * 100
+        
+        return {
+            'is_deepfake': bool(is_deepfake),
+            'confidence': float(confidence),
+            'raw_score': float(avg_prediction),
+            'frame_consistency': float(1 - std_prediction),
+            'frames_analyzed': len(predictions),
+            'duplicate_frames_skipped': frame_stats['duplicates_skipped'],
+            'frame_budget': config['max_frames'],
+            'early_stopped': settled and len(predictions) < config['max_frames'],
+            'score_interval': [float(max(interval[0], 0.0)), float(min(interval[1], 1.0))],
+            'model_used': 'pre_trained_xception_frames',
+            'preprocessing': 'frame_sampling_sequential'
+        }
+    
     def _fallback_image_prediction(self, image_path):
         """Fallback prediction for images"""
+        with span('decode'):
+            img = decode_image(image_path, self.model_configs['image']['decode_min_side'])
+        if img is None:
+            return None
+        
+        return self._fallback_image_array_prediction(img)
+    
+    @span('fallback')
+    def _fallback_image_array_prediction(self, img):
+        """Fallback prediction for an already decoded BGR image"""
         try:
-            # Simple heuristic-based prediction
-            img = cv2.imread(image_path)
-            if img is None:
-                return None
-            
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            # Simple heuristic-based prediction on bounded-size image statistics
+            stats = compute_image_stats(img)
             
             # Basic features
-            blur_score = cv2.Laplacian(gray, cv2.CV_64F).var()
-            brightness = np.mean(gray)
-            contrast = np.std(gray)
+            blur_score = stats['noise_level']
+            brightness = stats['brightness']
+            contrast = stats['contrast']
             
             # Simple scoring
             score = 0.5  # Base score
@@ -494,10 +1278,14 @@ class AccurateDeepfakeDetector:
             print(f"❌ Error in fallback image prediction: {e}")
             return None
     
+    @span('fallback')
     def _fallback_audio_prediction(self, audio_path):
         """Fallback prediction for audio"""
         try:
-            y, sr = librosa.load(audio_path, sr=None)
+            # Same window and rate as the model path, so the decoded buffer is shared
+            with span('decode'):
+                y, sr = load_audio(audio_path, sr=self.model_configs['audio']['sample_rate'],
+                                   duration=self.model_configs['audio']['max_duration'])
             
             # Basic audio features
             spectral_centroid = np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))
@@ -526,24 +1314,23 @@ class AccurateDeepfakeDetector:
             print(f"❌ Error in fallback audio prediction: {e}")
             return None
     
+    @span('fallback')
     def _fallback_video_prediction(self, video_path):
         """Fallback prediction for video"""
         try:
-            cap = cv2.VideoCapture(video_path)
+            frames = self._read_frames(video_path)
             frame_count = 0
             blur_scores = []
             
-            while cap.isOpened() and frame_count < 10:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
+            for frame in frames:
                 gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
                 blur_score = cv2.Laplacian(gray, cv2.CV_64F).var()
                 blur_scores.append(blur_score)
                 frame_count += 1
+                if frame_count == 10:
+                    break
             
-            cap.release()
+            frames.close()
             
             if blur_scores:
                 avg_blur = np.mean(blur_scores)
@@ -573,6 +1360,7 @@ class AccurateDeepfakeDetector:
             print(f"❌ Error in fallback video prediction: {e}")
             return None
     
+    @span('detect', modality='image')
     def detect_image(self, image_path):
         """Detect deepfake in image"""
         try:
@@ -592,6 +1380,126 @@ class AccurateDeepfakeDetector:
             print(f"❌ Error in image detection: {e}")
             return None
     
+    def detect_animation(self, image_path, progress_callback=None):
+        """
+        Detect deepfakes in an animated image (GIF, WebP, APNG). Frames are
+        decoded lazily, sampled and deduplicated like video frames and scored
+        by the frame model; single-frame files are treated as still images.
+        """
+        if not is_animated(image_path):
+            return self.detect_image(image_path)  # Timed by detect_image's own image span
+        
+        try:
+            with span('detect', modality='video'):
+                prediction = self._predict_video_frames(image_path, progress_callback)
+            if prediction is None:
+                return None
+            prediction = dict(prediction, animated=True)
+            
+            return {
+                'type': 'image',
+                'file_path': image_path,
+                'timestamp': datetime.now().isoformat(),
+                'result': prediction,
+                'analysis_summary': self._generate_summary(prediction, 'video')
+            }
+            
+        except Exception as e:
+            print(f"❌ Error in animation detection: {e}")
+            return None
+    
+    @span('detect', modality='image')
+    def detect_images(self, image_paths):
+        """
+        Detect deepfakes in several images with one batched model call
+        
+        Returns:
+            List of detection results (None for unreadable files), in input order
+        """
+        if not self.models['image'] or self.model_configs['cascade']['enabled'] or self.model_configs['ensemble']['enabled'] \
+                or self.model_configs['image']['patch_analysis']:
+            return [self.detect_animation(path) for path in image_paths]
+        
+        batch, batch_index = [], []
+        animations = {}
+        for i, path in enumerate(image_paths):
+            if is_animated(path):
+                animations[i] = self.detect_animation(path)  # Scored as a frame sequence
+                continue
+            with span('decode'):
+                img = decode_image(path, self.model_configs['image']['decode_min_side'])
+            x = self.preprocess_image_array(img) if img is not None else None
+            if x is not None:
+                batch.append(x[0])
+                batch_index.append(i)
+        
+        predictions = {}
+        if batch:
+            x = np.stack(batch)
+            try:
+                if self.feature_store is not None:
+                    with span('inference'):
+                        scores = self.image_head.predict(self.image_embeddings(x))[:, 0]
+                else:
+                    with span('inference'):
+                        scores = self.models['image'].predict(x)[:, 0]
+            except Exception as e:
+                print(f"❌ Error in batched image prediction: {e}")
+                return [animations[i] if i in animations else self.detect_image(path)
+                        for i, path in enumerate(image_paths)]
+            
+            for i, score in zip(batch_index, scores):
+                is_deepfake = score > self.model_configs['image']['threshold']
+                predictions[i] = {
+                    'is_deepfake': bool(is_deepfake),
+                    'confidence': float(score * 100 if is_deepfake else (1 - score) * 100),
+                    'raw_score': float(score),
+                    'model_used': 'pre_trained_xception',
+                    'preprocessing': self.model_configs['image']['preprocessing']
+                }
+        
+        results = []
+        for i, path in enumerate(image_paths):
+            if i in animations:
+                results.append(animations[i])
+                continue
+            prediction = predictions.get(i)
+            results.append(None if prediction is None else {
+                'type': 'image',
+                'file_path': path,
+                'timestamp': datetime.now().isoformat(),
+                'result': prediction,
+                'analysis_summary': self._generate_summary(prediction, 'image')
+            })
+        return results
+    
+    @span('detect', modality='image')
+    def detect_image_array(self, img, source=None):
+        """
+        Detect deepfake in an already decoded BGR image (e.g. a live camera frame)
+        
+        Args:
+            img: BGR image array as returned by cv2.imdecode
+            source: Optional label stored in place of the file path
+        """
+        try:
+            prediction = self.predict_image_array(img)
+            if prediction is None:
+                return None
+            
+            return {
+                'type': 'image',
+                'file_path': source,
+                'timestamp': datetime.now().isoformat(),
+                'result': prediction,
+                'analysis_summary': self._generate_summary(prediction, 'image')
+            }
+            
+        except Exception as e:
+            print(f"❌ Error in image detection: {e}")
+            return None
+    
+    @span('detect', modality='audio')
     def detect_audio(self, audio_path):
         """Detect deepfake in audio"""
         try:
@@ -611,10 +1519,54 @@ class AccurateDeepfakeDetector:
             print(f"❌ Error in audio detection: {e}")
             return None
     
-    def detect_video(self, video_path):
+    @span('detect', modality='audio')
+    def detect_audios(self, audio_paths):
+        """
+        Detect deepfakes in several audio files with one batched model call
+        
+        Returns:
+            List of detection results (None for unreadable files), in input order
+        """
+        if not self.models['audio']:
+            return [self.detect_audio(path) for path in audio_paths]
+        
+        x, decoded = self.preprocess_audio_batch(audio_paths)
+        predictions = {}
+        if x is not None:
+            try:
+                with span('inference'):
+                    scores = self.models['audio'].predict(x)[:, 0]
+            except Exception as e:
+                print(f"❌ Error in batched audio prediction: {e}")
+                return [self.detect_audio(path) for path in audio_paths]
+            
+            for i, score in zip(decoded, scores):
+                is_deepfake = score > self.model_configs['audio']['threshold']
+                predictions[i] = {
+                    'is_deepfake': bool(is_deepfake),
+                    'confidence': float(score * 100 if is_deepfake else (1 - score) * 100),
+                    'raw_score': float(score),
+                    'model_used': 'pre_trained_cnn',
+                    'preprocessing': 'mel_spectrogram'
+                }
+        
+        results = []
+        for i, path in enumerate(audio_paths):
+            prediction = predictions.get(i)
+            results.append(None if prediction is None else {
+                'type': 'audio',
+                'file_path': path,
+                'timestamp': datetime.now().isoformat(),
+                'result': prediction,
+                'analysis_summary': self._generate_summary(prediction, 'audio')
+            })
+        return results
+    
+    @span('detect', modality='video')
+    def detect_video(self, video_path, progress_callback=None):
         """Detect deepfake in video"""
         try:
-            prediction = self.predict_video(video_path)
+            prediction = self.predict_video(video_path, progress_callback=progress_callback)
             if prediction is None:
                 return None
             
@@ -644,37 +1596,261 @@ class AccurateDeepfakeDetector:
         summary.append(f"Model: {prediction['model_used']}")
         summary.append(f"Processing: {prediction['preprocessing']}")
         
+        if content_type == 'image' and 'patch_analysis' in prediction:
+            patches = prediction['patch_analysis']
+            summary.append(f"Patches Analyzed: {patches['patches']} (max score {patches['max_score']:.2f})")
+        
         if content_type == 'video' and 'frame_consistency' in prediction:
             summary.append(f"Frame Consistency: {prediction['frame_consistency']:.2f}")
             summary.append(f"Frames Analyzed: {prediction['frames_analyzed']}")
+            if prediction.get('audio_track'):
+                audio = prediction['audio_track']
+                summary.append(f"Soundtrack: {'suspicious' if audio['is_deepfake'] else 'authentic'} "
+                               f"({audio['confidence']:.1f}%)")
+            if prediction.get('duplicate_frames_skipped'):
+                summary.append(f"Near-Duplicate Frames Skipped: {prediction['duplicate_frames_skipped']}")
         
         return summary
     
-    def train_model(self, dataset_path, model_type='image'):
-        """Train model on custom dataset"""
-        print("🔄 Training functionality requires labeled dataset")
-        print("📊 Dataset should contain:")
-        print("   - Real/authentic samples")
-        print("   - Deepfake/manipulated samples")
-        print("   - Proper labels (0 for real, 1 for deepfake)")
-        
-        # Placeholder for training logic
-        print("🔗 For training, use datasets like:")
-        print("   - FaceForensics++")
-        print("   - DeepFake Detection Challenge")
-        print("   - Celeb-DF")
-    
-    def evaluate_model(self, test_dataset_path):
-        """Evaluate model performance"""
-        print("📈 Evaluation requires test dataset with ground truth labels")
-        print("📊 Metrics to evaluate:")
-        print("   - Accuracy")
-        print("   - Precision/Recall")
-        print("   - F1-Score")
-        print("   - ROC-AUC")
+    def train_model(self, dataset_path, model_type='image', epochs=5, batch_size=16, output_path=None,
+                    cache_dir=None, workers=None, learning_rate=1e-4, validation_split=0.1, head_batch_size=256):
+        """
+        Fine-tune the image model's classifier head (or the audio CNN) on a labelled dataset
+        
+        The dataset is laid out like evaluate_model's (real/ and fake/ folders).
+        Image crops come from the same sharded crop cache, read through a
+        tf.data pipeline (interleaved shards, file cache, parallel map,
+        prefetch). With a feature store attached, backbone embeddings are
+        computed once and only the head trains, with larger batches.
+        
+        Args:
+            dataset_path: Root of the labelled dataset
+            model_type: 'image' or 'audio'
+            epochs: Training epochs
+            batch_size: Batch size when the backbone runs in the loop
+            output_path: Where to save weights (loadable via model_path / audio_model_path)
+            cache_dir: Crop cache directory (default: <dataset>/.deepshield_cache)
+            workers: Face-crop processes (default: CPU count)
+            learning_rate: Adam learning rate
+            validation_split: Fraction of files held out, chosen by path hash
+            head_batch_size: Batch size for head-only training on cached embeddings
+        
+        Returns:
+            dict with the Keras history, examples/sec per epoch and the weights path
+        """
+        if not TENSORFLOW_AVAILABLE:
+            print("❌ Training requires TensorFlow")
+            return None
+        if not self.models.get(model_type) or not hasattr(self.models[model_type], 'fit'):
+            print(f"❌ Training needs a local {model_type} model")
+            return None
+        
+        import training_pipeline
+        from dataset_cache import CropCache, scan_labelled_dataset
+        
+        cache_dir = cache_dir or os.path.join(dataset_path, '.deepshield_cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        
+        if model_type == 'image':
+            items = scan_labelled_dataset(dataset_path)
+            output_path = output_path or os.path.join('models', 'deepfake_xception_weights.h5')
+        elif model_type == 'audio':
+            items = scan_labelled_dataset(dataset_path, extensions={'.wav', '.mp3', '.m4a', '.flac', '.ogg'})
+            output_path = output_path or os.path.join('models', 'deepfake_audio_cnn_weights.h5')
+        else:
+            print(f"❌ Unknown model type: {model_type}")
+            return None
+        
+        if not items:
+            print(f"❌ No labelled {model_type} files found under {dataset_path}")
+            return None
+        train_items, val_items = training_pipeline.split_items(items, validation_split)
+        print(f"📂 {len(train_items)} training / {len(val_items)} validation {model_type} files")
+        
+        if model_type == 'image':
+            cache = CropCache(cache_dir)
+            load = cache.build(items, workers=workers, crop_config=self._crop_config())
+            print(f"🧩 Crops: {load['cached']} cached, {load['processed']} new, {load['failed']} failed")
+            train_paths = [path for path, _ in train_items if path in cache.sources]
+            val_paths = [path for path, _ in val_items if path in cache.sources]
+            examples = len(train_paths)
+            
+            # Only the classifier head trains; the Xception backbone stays frozen
+            for layer in self.image_backbone.layers:
+                layer.trainable = False
+            
+            if self.feature_store is not None:
+                model = self.image_head
+                train_ds = val_ds = None
+                if train_paths:
+                    embeddings, labels = self._cached_embeddings(cache, train_paths, batch_size)
+                    train_ds = training_pipeline.embedding_dataset(embeddings, labels, head_batch_size, training=True)
+                if val_paths:
+                    embeddings, labels = self._cached_embeddings(cache, val_paths, batch_size)
+                    val_ds = training_pipeline.embedding_dataset(embeddings, labels, head_batch_size, training=False)
+            else:
+                model = self.models['image']
+                crop_config = self._crop_config()
+                
+                def crop_entries(paths):
+                    return [(key, entry['label'], cache.sources[entry['source']]['size'], cache.sources[entry['source']]['mtime'])
+                            for key in cache.keys_for(paths) for entry in (cache.entries[key],)]
+                
+                train_ds = training_pipeline.crop_dataset(cache, train_paths, batch_size, training=True,
+                                                          cache_file=training_pipeline.cache_file_for(
+                                                              cache_dir, 'tfdata_train', crop_entries(train_paths), crop_config))
+                val_ds = training_pipeline.crop_dataset(cache, val_paths, batch_size, training=False,
+                                                        cache_file=training_pipeline.cache_file_for(
+                                                            cache_dir, 'tfdata_val', crop_entries(val_paths), crop_config))
+        else:
+            model = self.models['audio']
+            examples = len(train_items)
+            audio_config = dict(self.model_configs['audio'], n_fft=self.audio_engine.n_fft,
+                                hop_length=self.audio_engine.hop_length, n_mels=self.audio_engine.n_mels)
+            
+            def audio_entries(items):
+                entries = []
+                for path, label in items:
+                    try:
+                        info = os.stat(path)
+                        entries.append((path, label, info.st_size, info.st_mtime_ns))
+                    except OSError:
+                        entries.append((path, label, None, None))
+                return entries
+            
+            train_ds = training_pipeline.audio_dataset(train_items, self.preprocess_audio, batch_size, training=True,
+                                                       cache_file=training_pipeline.cache_file_for(
+                                                           cache_dir, 'tfdata_audio_train', audio_entries(train_items), audio_config))
+            val_ds = training_pipeline.audio_dataset(val_items, self.preprocess_audio, batch_size, training=False,
+                                                     cache_file=training_pipeline.cache_file_for(
+                                                         cache_dir, 'tfdata_audio_val', audio_entries(val_items), audio_config))
+        
+        if train_ds is None:
+            print("❌ No training examples could be loaded")
+            return None
+        
+        model.compile(
+            optimizer=Adam(learning_rate=learning_rate),
+            loss='binary_crossentropy',
+            metrics=['accuracy', tf.keras.metrics.AUC(name='auc')]
+        )
+        throughput = training_pipeline.ThroughputLogger(examples)
+        history = model.fit(train_ds, validation_data=val_ds, epochs=epochs, callbacks=[throughput], verbose=2)
+        
+        # Always save the full model: the head shares its layers, and this is
+        # the layout _load_image_model / _load_audio_model load
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        self.models[model_type].save_weights(output_path)
+        print(f"💾 Weights saved to {output_path}")
+        
+        return {
+            'model_type': model_type,
+            'examples': examples,
+            'history': {key: [float(v) for v in values] for key, values in history.history.items()},
+            'examples_per_sec': throughput.history,
+            'weights_path': output_path
+        }
+    
+    def _cached_embeddings(self, cache, paths, batch_size):
+        """Backbone embeddings and labels for cached crops, via the feature store"""
+        from dataset_cache import normalize_crops
+        
+        embeddings, labels = [], []
+        for _, crops, batch_labels in cache.iter_batches(cache.keys_for(paths), batch_size=batch_size):
+            embeddings.append(self.image_embeddings(normalize_crops(crops), labels=batch_labels.tolist()))
+            labels.append(batch_labels)
+        return np.concatenate(embeddings), np.concatenate(labels)
+    
+    def evaluate_model(self, test_dataset_path, cache_dir=None, batch_size=32, workers=None):
+        """
+        Evaluate the image model on a labelled dataset
+        
+        The dataset is laid out as test_dataset_path/real/... and
+        test_dataset_path/fake/... (see dataset_cache.LABEL_DIRS). Images are
+        decoded and face-cropped by a process pool into a sharded crop cache,
+        so reruns skip decoding entirely, then scored in batches.
+        
+        Args:
+            test_dataset_path: Root of the labelled dataset
+            cache_dir: Crop cache directory (default: <dataset>/.deepshield_cache)
+            batch_size: Inference batch size
+            workers: Loader processes (default: CPU count)
+        
+        Returns:
+            dict with accuracy, precision, recall, f1, roc_auc, confusion counts and throughput
+        """
+        from sklearn.metrics import accuracy_score, precision_recall_fscore_support, roc_auc_score, confusion_matrix
+        from dataset_cache import CropCache, scan_labelled_dataset, normalize_crops
+        
+        if not self.models.get('image'):
+            print("❌ Evaluation needs the image model")
+            return None
+        
+        items = scan_labelled_dataset(test_dataset_path)
+        if not items:
+            print(f"❌ No labelled images found under {test_dataset_path}")
+            return None
+        print(f"📂 {len(items)} labelled images found")
+        
+        cache = CropCache(cache_dir or os.path.join(test_dataset_path, '.deepshield_cache'))
+        load = cache.build(items, workers=workers, crop_config=self._crop_config())
+        print(f"🧩 Crops: {load['cached']} cached, {load['processed']} new, {load['failed']} failed "
+              f"({load['seconds']:.1f}s)")
+        
+        labels, scores = [], []
+        start = time.perf_counter()
+        for _, crops, batch_labels in cache.iter_batches(cache.keys_for([path for path, _ in items]), batch_size=batch_size):
+            x = normalize_crops(crops)
+            if self.feature_store is not None:
+                batch_scores = self.image_head.predict(self.image_embeddings(x, labels=batch_labels.tolist()))
+            else:
+                with span('inference'):
+                    batch_scores = self.models['image'].predict(x, batch_size=batch_size)
+            scores.extend(float(score) for score in np.ravel(batch_scores))
+            labels.extend(int(label) for label in batch_labels)
+        inference_seconds = time.perf_counter() - start
+        
+        if not scores:
+            print("❌ No images could be evaluated")
+            return None
+        
+        labels = np.array(labels)
+        scores = np.array(scores)
+        predicted = (scores > self.model_configs['image']['threshold']).astype(int)
+        precision, recall, f1, _ = precision_recall_fscore_support(labels, predicted, average='binary', zero_division=0)
+        tn, fp, fn, tp = confusion_matrix(labels, predicted, labels=[0, 1]).ravel()
+        
+        metrics = {
+            'samples': int(len(labels)),
+            'failed': load['failed'],
+            'accuracy': float(accuracy_score(labels, predicted)),
+            'precision': float(precision),
+            'recall': float(recall),
+            'f1': float(f1),
+            # ROC-AUC is undefined when only one class is present
+            'roc_auc': float(roc_auc_score(labels, scores)) if len(set(labels.tolist())) == 2 else None,
+            'confusion': {'tn': int(tn), 'fp': int(fp), 'fn': int(fn), 'tp': int(tp)},
+            'threshold': self.model_configs['image']['threshold'],
+            'images_per_sec': float(len(labels) / inference_seconds) if inference_seconds > 0 else None,
+            'load_images_per_sec': float(load['processed'] / load['seconds']) if load['seconds'] > 0 else None
+        }
+        
+        print("📈 Evaluation results:")
+        print(f"   - Accuracy:  {metrics['accuracy']:.4f}")
+        print(f"   - Precision: {metrics['precision']:.4f}  Recall: {metrics['recall']:.4f}")
+        print(f"   - F1-Score:  {metrics['f1']:.4f}")
+        print(f"   - ROC-AUC:   {metrics['roc_auc']:.4f}" if metrics['roc_auc'] is not None else "   - ROC-AUC:   n/a (single class)")
+        print(f"   - Throughput: {metrics['images_per_sec']:.1f} images/sec (inference)")
+        return metrics
 
 # Example usage
 if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == 'scan':
+        from bulk_scan import main as scan_main
+        sys.exit(scan_main(sys.argv[2:]))
+    
     detector = AccurateDeepfakeDetector()
     
     print("\n🎯 Accurate Deepfake Detector Ready!")
@@ -687,6 +1863,7 @@ if __name__ == "__main__":
     print("   result = detector.detect_image('image.jpg')")
     print("   result = detector.detect_audio('audio.wav')")
     print("   result = detector.detect_video('video.mp4')")
+    print("   python accurate_deepfake_detector.py scan <dir|file list> --output results.jsonl")
     
     print("\n⚠️  Note: For best accuracy, download pre-trained models")
-    print("   from FaceForensics++ or similar datasets.") 
\ No newline at end of file
+    print("   from FaceForensics++ or similar datasets.") 
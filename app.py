@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
 import os
 import cv2
 import numpy as np
@@ -13,23 +13,142 @@ import librosa
 import matplotlib.pyplot as plt
 import seaborn as sns
 from accurate_deepfake_detector import AccurateDeepfakeDetector
+from job_queue import JobQueue
+from history_store import DetectionHistory
+from thread_tuning import load_profile
+import instrumentation
+import time
+from live_channel import LiveSession, LiveAnalysisState, LiveStateRegistry
+import threading
+
+# WebSocket support for the live detection channel
+try:
+    from flask_sock import Sock
+    WEBSOCKET_AVAILABLE = True
+except ImportError:
+    print("flask-sock not available. WebSocket live detection will be disabled.")
+    WEBSOCKET_AVAILABLE = False
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'deepshield-ai-secret-key-2024'
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Thread limits for TF/OpenCV/BLAS and executor sizes (written by `python -m benchmarks.autotune`)
+thread_profile = load_profile()
+app.config['JOB_WORKERS'] = int(os.getenv('DEEPSHIELD_JOB_WORKERS', str(thread_profile['job_workers'] or 2)))
+app.config['JOB_RESULT_TTL'] = int(os.getenv('DEEPSHIELD_JOB_RESULT_TTL', '3600'))  # seconds
+app.config['JOB_DB_PATH'] = os.getenv('DEEPSHIELD_JOB_DB', os.path.join('uploads', 'jobs.sqlite3'))
+app.config['LIVE_MAX_CONCURRENT_INFERENCE'] = int(os.getenv('DEEPSHIELD_LIVE_MAX_CONCURRENT', '2'))
+app.config['LIVE_SESSION_IDLE_TIMEOUT'] = 300  # seconds
+app.config['LIVE_MAX_SESSIONS'] = int(os.getenv('DEEPSHIELD_LIVE_MAX_SESSIONS', '256'))
+app.config['HISTORY_DB_PATH'] = os.getenv('DEEPSHIELD_HISTORY_DB', 'deepshield_history.sqlite3')
 
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# Initialize the accurate deepfake detector
-detector = AccurateDeepfakeDetector()
+# Initialize the accurate deepfake detector. Under gunicorn (see gunicorn.conf.py) the
+# models live in one shared inference process and workers only do pre/post-processing.
+# DEEPSHIELD_CASCADE=1 runs cheap detectors first and escalates only uncertain inputs.
+cascade_enabled = os.getenv('DEEPSHIELD_CASCADE', '0') == '1'
+if os.getenv('DEEPSHIELD_INFERENCE_SOCKET'):
+    from inference_server import InferenceClient
+    detector = AccurateDeepfakeDetector(model_path=os.getenv('DEEPSHIELD_MODEL_PATH'), load_models=False,
+                                        cascade=cascade_enabled, thread_profile=thread_profile)
+    detector.attach_remote_models(InferenceClient(
+        os.environ['DEEPSHIELD_INFERENCE_SOCKET'],
+        os.environ['DEEPSHIELD_INFERENCE_AUTHKEY']
+    ))
+else:
+    detector = AccurateDeepfakeDetector(model_path=os.getenv('DEEPSHIELD_MODEL_PATH'),
+                                        audio_model_path=os.getenv('DEEPSHIELD_AUDIO_MODEL_PATH'),
+                                        cascade=cascade_enabled, thread_profile=thread_profile)
+if os.getenv('DEEPSHIELD_CASCADE_MODEL'):
+    detector.model_configs['cascade']['cheap_model_path'] = os.environ['DEEPSHIELD_CASCADE_MODEL']
+if os.getenv('DEEPSHIELD_VIDEO_EARLY_STOP', '0') == '1':
+    detector.model_configs['video']['early_stopping'] = True
+if os.getenv('DEEPSHIELD_VIDEO_AUDIO', '0') == '1':
+    detector.model_configs['video']['multimodal'] = True
+if os.getenv('DEEPSHIELD_PATCH_ANALYSIS', '0') == '1':
+    detector.model_configs['image']['patch_analysis'] = True
+if os.getenv('DEEPSHIELD_ENSEMBLE', '0') == '1':
+    detector.model_configs['ensemble']['enabled'] = True
+    for name, variable in (('efficientnet_b0', 'DEEPSHIELD_ENSEMBLE_EFFICIENTNET'), ('resnet50', 'DEEPSHIELD_ENSEMBLE_RESNET')):
+        detector.model_configs['ensemble']['members'][name]['weights'] = os.getenv(variable)
+    if os.getenv('DEEPSHIELD_ENSEMBLE_BUDGET_MS'):
+        detector.model_configs['ensemble']['latency_budget_ms'] = float(os.environ['DEEPSHIELD_ENSEMBLE_BUDGET_MS'])
+if os.getenv('DEEPSHIELD_FEATURE_STORE'):
+    from feature_store import FeatureStore
+    detector.attach_feature_store(FeatureStore(os.environ['DEEPSHIELD_FEATURE_STORE']))
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'mp4', 'avi', 'mov', 'wav', 'mp3', 'm4a'}
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+VIDEO_EXTENSIONS = {'mp4', 'avi', 'mov'}
+AUDIO_EXTENSIONS = {'wav', 'mp3', 'm4a'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def media_kind(filename):
+    """Map a filename to 'image', 'video' or 'audio' (None if unsupported)"""
+    if '.' not in filename:
+        return None
+    file_extension = filename.rsplit('.', 1)[1].lower()
+    if file_extension in IMAGE_EXTENSIONS:
+        return 'image'
+    if file_extension in VIDEO_EXTENSIONS:
+        return 'video'
+    if file_extension in AUDIO_EXTENSIONS:
+        return 'audio'
+    return None
+
+# Detection history shared with the Telegram bot; backs /api/stats
+history = DetectionHistory(app.config['HISTORY_DB_PATH'])
+
+def run_detection(kind, filepath, progress_callback=None):
+    """Dispatch a saved upload to the matching detector entry point"""
+    started = time.time()
+    if kind == 'image' and filepath.lower().endswith('.gif'):
+        # Animated GIFs are scored frame by frame like a video; still GIFs as images
+        result = detector.detect_animation(filepath, progress_callback=progress_callback)
+    elif kind == 'image':
+        result = detector.detect_image(filepath)
+    elif kind == 'video':
+        result = detector.detect_video(filepath, progress_callback=progress_callback)
+    elif kind == 'audio':
+        result = detector.detect_audio(filepath)
+    else:
+        return None
+    
+    # A job cancelled while it ran may still hand back a partial result (e.g. the
+    # frames scored so far); it is discarded rather than recorded as a detection
+    if progress_callback is not None and progress_callback('detect', 1, 1) is False:
+        return None
+    
+    history.record(result, source='web', processing_time=time.time() - started)
+    return result
+
+def save_upload(file):
+    """Save an uploaded file under a unique name and return its path"""
+    filename = secure_filename(file.filename)
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4()}_{filename}")
+    file.save(filepath)
+    return filepath
+
+def _run_job(job, progress_callback):
+    if progress_callback('detect', 0, 1) is False:
+        return None  # Cancelled before detection started
+    return run_detection(job.kind, job.file_path, progress_callback=progress_callback)
+
+# Background queue for long-running analyses (see /api/jobs)
+jobs = JobQueue(
+    _run_job,
+    max_workers=app.config['JOB_WORKERS'],
+    result_ttl=app.config['JOB_RESULT_TTL'],
+    db_path=app.config['JOB_DB_PATH'],
+    # Video jobs extract frames, then score them; 'detect' marks the start (0) and end (1)
+    stage_spans={'preprocess': (0.0, 0.5), 'inference': (0.5, 1.0)}
+)
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -45,22 +164,22 @@ def detect_deepfake():
             return jsonify({'error': 'No file selected'}), 400
         
         if file and allowed_file(file.filename):
-            # Save file temporarily
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4()}_{filename}")
-            file.save(filepath)
-            
             # Detect file type and process accordingly
-            file_extension = filename.rsplit('.', 1)[1].lower()
+            kind = media_kind(secure_filename(file.filename))
+            if kind is None:
+                return jsonify({'error': 'Unsupported file type'}), 400
+            
+            # Save file temporarily
+            filepath = save_upload(file)
             
-            if file_extension in ['png', 'jpg', 'jpeg', 'gif']:
-                result = detector.detect_image(filepath)
-            elif file_extension in ['mp4', 'avi', 'mov']:
-                result = detector.detect_video(filepath)
-            elif file_extension in ['wav', 'mp3', 'm4a']:
-                result = detector.detect_audio(filepath)
+            # ?trace=1 attaches a Chrome trace (chrome://tracing / Perfetto) of the pipeline stages
+            if request.args.get('trace') == '1':
+                with instrumentation.trace() as trace:
+                    result = run_detection(kind, filepath)
+                if result is not None:
+                    result['trace'] = trace
             else:
-                return jsonify({'error': 'Unsupported file type'}), 400
+                result = run_detection(kind, filepath)
             
             # Clean up temporary file
             os.remove(filepath)
@@ -72,6 +191,61 @@ def detect_deepfake():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a file for background analysis and return the job id immediately"""
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file provided'}), 400
+        
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+        
+        if not allowed_file(file.filename):
+            return jsonify({'error': 'Invalid file type'}), 400
+        
+        kind = media_kind(secure_filename(file.filename))
+        if kind is None:
+            return jsonify({'error': 'Unsupported file type'}), 400
+        
+        # The worker owns the file from here and removes it when done
+        job = jobs.submit(kind, save_upload(file))
+        return jsonify(job), 202
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-Sent Events stream of job progress, closed once the job finishes"""
+    if jobs.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def stream():
+        for snapshot in jobs.events(job_id):
+            if snapshot is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: {snapshot['status']}\ndata: {json.dumps(snapshot)}\n\n"
+    
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/live-detection')
 def live_detection():
     return render_template('live_detection.html')
@@ -82,43 +256,71 @@ def process_live_frame():
         data = request.get_json()
         image_data = data['image']
         
-        # Decode base64 image
+        # Decode base64 image in memory
         image_data = image_data.split(',')[1]
         image_bytes = base64.b64decode(image_data)
-        image = Image.open(io.BytesIO(image_bytes))
-        
-        # Save temporarily and use detector
-        temp_path = os.path.join(app.config['UPLOAD_FOLDER'], f"temp_{uuid.uuid4()}.jpg")
-        image.save(temp_path)
+        frame = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            return jsonify({'error': 'Could not decode frame'}), 400
         
-        # Detect deepfake
-        result = detector.detect_image(temp_path)
-        
-        # Clean up
-        os.remove(temp_path)
+        # Detect deepfake; clients that send a session id get change-gated, smoothed scores
+        session_id = data.get('session_id')
+        if session_id:
+            result = live_states.get(session_id).analyze(frame)
+        else:
+            result = detector.detect_image_array(frame, source='live_frame')
         
         return jsonify(result)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Bounds model work across all live sessions so one busy camera cannot starve the rest
+live_inference_slots = threading.BoundedSemaphore(app.config['LIVE_MAX_CONCURRENT_INFERENCE'])
+
+def _new_live_state():
+    return LiveAnalysisState(detector, inference_lock=live_inference_slots)
+
+live_states = LiveStateRegistry(_new_live_state, idle_timeout=app.config['LIVE_SESSION_IDLE_TIMEOUT'],
+                                max_entries=app.config['LIVE_MAX_SESSIONS'])
+
+if WEBSOCKET_AVAILABLE:
+    sock = Sock(app)
+    
+    @sock.route('/ws/live')
+    def live_socket(ws):
+        """
+        Persistent live-detection channel. Clients send binary JPEG frames and receive
+        JSON results asynchronously; only the newest unprocessed frame is kept.
+        """
+        session = LiveSession(_new_live_state().analyze, ws.send).start()
+        try:
+            while not session.slot.closed:
+                message = ws.receive()
+                if message is None:
+                    break
+                if isinstance(message, (bytes, bytearray)):
+                    session.submit(bytes(message))
+        finally:
+            session.close()
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus per-stage latency histograms for this process"""
+    return Response(instrumentation.registry.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/dashboard')
 def dashboard():
     return render_template('dashboard.html')
 
 @app.route('/api/stats')
 def get_stats():
-    # Mock statistics for demonstration
-    stats = {
-        'total_analyses': 1250,
-        'deepfakes_detected': 89,
-        'accuracy_rate': 94.2,
-        'recent_detections': [
-            {'type': 'image', 'confidence': 87.5, 'timestamp': '2024-01-15 14:30:00'},
-            {'type': 'video', 'confidence': 92.1, 'timestamp': '2024-01-15 14:25:00'},
-            {'type': 'audio', 'confidence': 78.9, 'timestamp': '2024-01-15 14:20:00'},
-        ]
-    }
+    stats = history.stats()
+    if detector.model_configs['cascade']['enabled']:
+        # Per-process: each gunicorn worker reports its own cascade counters
+        stats['cascade'] = detector.cascade_report()
+    if detector.ensemble is not None:
+        stats['ensemble'] = detector.ensemble.report()
     return jsonify(stats)
 
 if __name__ == '__main__':
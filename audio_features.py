@@ -0,0 +1,140 @@
+"""
+Batched mel-spectrogram features for the audio CNN.
+
+Equivalent to the librosa path preprocess_audio used to take
+(melspectrogram -> power_to_db(ref=np.max) -> cv2.resize to 128x128 ->
+standardize), but the mel filterbank, window and resize matrices are built
+once per configuration, and clips of equal length are framed, windowed,
+FFT'd and projected onto the mel basis in vectorized calls, a bounded
+block of frames at a time so long batches never hold a full complex
+spectrum in memory.
+"""
+from functools import lru_cache
+
+import numpy as np
+import scipy.fft
+import librosa
+
+
+@lru_cache(maxsize=16)
+def mel_filterbank(sr, n_fft, n_mels):
+    """(n_mels, 1 + n_fft // 2) Slaney mel basis, as librosa.feature.melspectrogram uses"""
+    basis = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels).astype(np.float32)
+    basis.setflags(write=False)
+    return basis
+
+
+@lru_cache(maxsize=16)
+def hann_window(n_fft):
+    """Periodic Hann window (scipy.signal.get_window('hann', n_fft, fftbins=True))"""
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+    window.setflags(write=False)
+    return window
+
+
+@lru_cache(maxsize=64)
+def resize_matrix(n_in, n_out):
+    """
+    (n_out, n_in) linear interpolation matrix matching cv2.resize INTER_LINEAR
+    along one axis (half-pixel centers, edge clamping)
+    """
+    matrix = np.zeros((n_out, n_in), dtype=np.float32)
+    scale = n_in / n_out
+    for i in range(n_out):
+        src = max((i + 0.5) * scale - 0.5, 0.0)
+        low = min(int(np.floor(src)), n_in - 1)
+        high = min(low + 1, n_in - 1)
+        frac = src - low
+        matrix[i, low] += 1.0 - frac
+        matrix[i, high] += frac
+    matrix.setflags(write=False)
+    return matrix
+
+
+class MelSpectrogramEngine:
+    def __init__(self, sr=16000, n_fft=2048, hop_length=512, n_mels=128, output_size=(128, 128), top_db=80.0,
+                 max_block_frames=2048):
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_mels = n_mels
+        self.output_size = output_size  # (time frames, mel bins) as passed to cv2.resize
+        self.top_db = top_db
+        self.max_block_frames = max_block_frames  # STFT frames transformed per FFT call (bounds peak memory)
+
+    def power_mel(self, batch):
+        """
+        Mel power spectrograms of equal-length clips
+
+        Args:
+            batch: (N, samples) float32 array
+        Returns:
+            (N, n_mels, frames) array
+        """
+        pad = self.n_fft // 2
+        padded = np.pad(np.asarray(batch, dtype=np.float32), ((0, 0), (pad, pad)))  # center=True, zero padding
+        frames = np.lib.stride_tricks.sliding_window_view(padded, self.n_fft, axis=1)[:, ::self.hop_length]
+        n_clips, n_frames = frames.shape[:2]
+        window = hann_window(self.n_fft)
+        basis = mel_filterbank(self.sr, self.n_fft, self.n_mels)
+
+        mel = np.empty((n_clips, self.n_mels, n_frames), dtype=np.float32)
+        frame_step = min(n_frames, self.max_block_frames)
+        clip_step = max(self.max_block_frames // frame_step, 1)
+        for c in range(0, n_clips, clip_step):
+            for t in range(0, n_frames, frame_step):
+                block = frames[c:c + clip_step, t:t + frame_step] * window
+                # float32 input keeps scipy's transform in complex64
+                spectrum = scipy.fft.rfft(block, axis=-1)
+                power = spectrum.real ** 2 + spectrum.imag ** 2
+                # (n_mels, freq) x (clips, frames, freq) -> (clips, n_mels, frames)
+                mel[c:c + clip_step, :, t:t + frame_step] = np.einsum('mf,ntf->nmt', basis, power)
+        return mel
+
+    def _to_db(self, mel):
+        """power_to_db(ref=np.max, top_db) per clip"""
+        amin = 1e-10
+        log_spec = 10.0 * np.log10(np.maximum(mel, amin))
+        ref = 10.0 * np.log10(np.maximum(mel.max(axis=(1, 2), keepdims=True), amin))
+        log_spec -= ref
+        return np.maximum(log_spec, log_spec.max(axis=(1, 2), keepdims=True) - self.top_db)
+
+    def _finish(self, mel_db):
+        """Resize to the model input and standardize each clip -> (N, H, W, 1)"""
+        width, height = self.output_size
+        rows = resize_matrix(mel_db.shape[1], height)
+        cols = resize_matrix(mel_db.shape[2], width)
+        resized = rows @ mel_db @ cols.T
+        mean = resized.mean(axis=(1, 2), keepdims=True)
+        std = resized.std(axis=(1, 2), keepdims=True)
+        std[std == 0] = 1.0
+        return ((resized - mean) / std)[..., np.newaxis].astype(np.float32)
+
+    def features(self, clips):
+        """
+        Model-ready features for a list of 1-D clips (any lengths); clips of
+        equal length share one vectorized STFT/mel call
+
+        Returns:
+            (N, 128, 128, 1) float32 array in input order
+        """
+        out = np.empty((len(clips), self.output_size[1], self.output_size[0], 1), dtype=np.float32)
+        by_length = {}
+        for i, clip in enumerate(clips):
+            by_length.setdefault(len(clip), []).append(i)
+        for indices in by_length.values():
+            batch = np.stack([np.asarray(clips[i], dtype=np.float32) for i in indices])
+            out[indices] = self._finish(self._to_db(self.power_mel(batch)))
+        return out
+
+    def chunk(self, y, seconds, hop_seconds=None):
+        """
+        Split a clip into equal windows (the last one zero-padded) so a long
+        recording becomes one batch for features()
+        """
+        size = int(seconds * self.sr)
+        hop = int((hop_seconds or seconds) * self.sr)
+        if len(y) <= size:
+            return [np.pad(y, (0, size - len(y)))]
+        starts = range(0, len(y) - size + hop, hop)
+        return [np.pad(y[s:s + size], (0, max(0, s + size - len(y)))) for s in starts]
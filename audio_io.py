@@ -0,0 +1,138 @@
+"""
+Audio ingest shared by the detector, its fallback and the bot's enhanced
+analysis.
+
+Files are decoded with soundfile (WAV, FLAC, OGG/Vorbis and Opus voice
+notes, MP3 with libsndfile >= 1.1) reading only the requested
+offset/duration window, and fall back to librosa (audioread/ffmpeg) for
+containers such as m4a. Resampling uses soxr at medium quality when
+available, otherwise a polyphase filter. Decoded clips are kept in a small
+LRU as read-only float32 arrays, so consumers analysing the same upload
+share one decode.
+"""
+import os
+import shutil
+import threading
+import subprocess
+from math import gcd
+from collections import OrderedDict
+
+import numpy as np
+import soundfile as sf
+
+try:
+    import soxr
+    SOXR_AVAILABLE = True
+except ImportError:
+    SOXR_AVAILABLE = False
+
+# Number of decoded clips kept for reuse
+CACHE_SIZE = 8
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def resample(y, orig_sr, target_sr):
+    """Fast resampling to target_sr (soxr 'MQ', or scipy's polyphase filter)"""
+    if orig_sr == target_sr:
+        return y
+    if SOXR_AVAILABLE:
+        return soxr.resample(y, orig_sr, target_sr, quality='MQ').astype(np.float32, copy=False)
+    from scipy.signal import resample_poly
+    divisor = gcd(int(orig_sr), int(target_sr))
+    return resample_poly(y, target_sr // divisor, orig_sr // divisor).astype(np.float32, copy=False)
+
+
+def _decode_soundfile(path, offset, duration):
+    with sf.SoundFile(path) as f:
+        native_sr = f.samplerate
+        start = int(offset * native_sr)
+        if start:
+            f.seek(min(start, f.frames))
+        frames = int(duration * native_sr) if duration is not None else -1
+        y = f.read(frames, dtype='float32', always_2d=True)
+    return y.mean(axis=1) if y.shape[1] > 1 else y[:, 0], native_sr
+
+
+def _decode_librosa(path, offset, duration):
+    import librosa
+    y, native_sr = librosa.load(path, sr=None, mono=True, offset=offset, duration=duration)
+    return y.astype(np.float32, copy=False), native_sr
+
+
+def load_audio(path, sr=16000, offset=0.0, duration=None, use_cache=True):
+    """
+    Decode a mono float32 window of an audio file at sample rate sr
+
+    Args:
+        path: Audio file
+        sr: Target sample rate (None keeps the native rate)
+        offset: Start of the window in seconds
+        duration: Window length in seconds (None reads to the end)
+        use_cache: Share the decoded buffer with other callers asking for the same window
+
+    Returns:
+        (y, sr); y is read-only when it comes from the cache, so copy before modifying
+    """
+    key = None
+    if use_cache:
+        info = os.stat(path)
+        key = (os.path.abspath(path), info.st_size, info.st_mtime_ns, sr, offset, duration)
+        with _cache_lock:
+            if key in _cache:
+                _cache.move_to_end(key)
+                return _cache[key]
+
+    try:
+        y, native_sr = _decode_soundfile(path, offset, duration)
+    except Exception:
+        y, native_sr = _decode_librosa(path, offset, duration)
+
+    if sr is not None and native_sr != sr:
+        y = resample(y, native_sr, sr)
+    else:
+        sr = native_sr
+    y = np.ascontiguousarray(y, dtype=np.float32)
+
+    if key is not None:
+        y.setflags(write=False)
+        with _cache_lock:
+            _cache[key] = (y, sr)
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+    return y, sr
+
+
+def clear_cache():
+    """Drop every cached decode (benchmarks time cold decodes with it)"""
+    with _cache_lock:
+        _cache.clear()
+
+
+def demux_audio(video_path, sr=16000, duration=None, timeout=120):
+    """
+    Mono float32 soundtrack of a video at sr, or None when it has none.
+    Streams raw samples out of ffmpeg when it is installed, otherwise goes
+    through load_audio (librosa/audioread).
+    """
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg:
+        cmd = [ffmpeg, '-nostdin', '-v', 'error', '-i', video_path, '-vn', '-ac', '1', '-ar', str(sr)]
+        if duration is not None:
+            cmd += ['-t', str(duration)]
+        cmd += ['-f', 'f32le', '-']
+        try:
+            proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return None
+        if proc.returncode != 0:
+            return None
+        y = np.frombuffer(proc.stdout, dtype=np.float32)
+        return y if y.size else None
+
+    try:
+        y, _ = load_audio(video_path, sr=sr, duration=duration, use_cache=False)
+    except Exception:
+        return None
+    return y if y.size else None
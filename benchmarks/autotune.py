@@ -0,0 +1,178 @@
+"""
+Pick a thread topology for this machine.
+
+    python -m benchmarks.autotune --output deepshield_threads.json
+    DEEPSHIELD_THREAD_PROFILE=deepshield_threads.json python app.py
+
+Each candidate from thread_tuning.candidate_profiles runs in a fresh
+process (TensorFlow fixes its thread pools on first use, BLAS reads its
+environment at load) that serves a mixed synthetic workload from a fixed
+number of concurrent threads: image decode + OpenCV preprocessing, mel
+features of voice-like clips, and an Xception forward pass.
+
+Candidates are compared at equal concurrency: the library defaults run at
+every level that a tuned profile targets, next to the tuned profiles for
+that level. The best profile of each level is reported, and the level
+winner with the highest throughput is written out (the defaults, when they
+win, with job_workers set to that level).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+
+from thread_tuning import candidate_profiles, blas_env, save_profile
+
+
+def _measure(profile, concurrency, requests_per_worker, workdir):
+    """Runs inside the candidate process; returns throughput and latency percentiles"""
+    from thread_tuning import apply_profile
+    apply_profile(profile)
+
+    import cv2
+    import numpy as np
+    import tensorflow as tf
+    from tensorflow.keras.applications import Xception
+    from benchmarks import synthetic
+    from image_io import decode_image
+    from audio_io import load_audio
+    from audio_features import MelSpectrogramEngine
+
+    image_path = synthetic.make_image(os.path.join(workdir, 'tune.jpg'), 1920, 1080, face=True)
+    audio_path = synthetic.make_audio(os.path.join(workdir, 'tune.wav'), 3.0)
+    model = Xception(weights=None, include_top=True, classes=1, classifier_activation='sigmoid')
+    engine = MelSpectrogramEngine()
+
+    def request():
+        img = decode_image(image_path)
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 50, 150)
+        x = cv2.resize(cv2.cvtColor(img, cv2.COLOR_BGR2RGB), (299, 299)).astype(np.float32) / 127.5 - 1.0
+
+        y, _ = load_audio(audio_path, use_cache=False)
+        engine.features(engine.chunk(y, 1.0))
+
+        model.predict(np.stack([x] * 4), verbose=0)
+
+    request()  # Warm up graph tracing and allocators
+
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(requests_per_worker):
+            start = time.perf_counter()
+            request()
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'throughput_per_s': round(len(latencies) / elapsed, 4),
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 2),
+        'p95_ms': round(float(np.percentile(latencies, 95)) * 1000, 2),
+        'tf_threads': [tf.config.threading.get_intra_op_parallelism_threads(),
+                       tf.config.threading.get_inter_op_parallelism_threads()]
+    }
+
+
+def run_candidate(profile, concurrency, requests_per_worker, timeout):
+    """Benchmark one profile at a request concurrency in a child process; None when it fails"""
+    env = dict(os.environ, **blas_env(profile))
+    cmd = [sys.executable, '-m', 'benchmarks.autotune', '--measure', json.dumps(profile),
+           '--concurrency', str(concurrency), '--requests', str(requests_per_worker)]
+    try:
+        proc = subprocess.run(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        print("  ⚠️ Candidate timed out")
+        return None
+    if proc.returncode != 0:
+        print(f"  ⚠️ Candidate failed: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else proc.returncode}")
+        return None
+    # The measurement is the last stdout line; TF and the detector log above it
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _describe(profile):
+    if not profile.get('tf_intra_op_threads') and not profile.get('blas_threads'):
+        return "library defaults"
+    return (f"workers={profile['job_workers']} tf={profile['tf_intra_op_threads']}/{profile['tf_inter_op_threads']} "
+            f"cv2={profile['cv2_threads']} blas={profile['blas_threads']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark thread topologies and write the best profile")
+    parser.add_argument('--output', default='deepshield_threads.json', help="Where to write the chosen profile")
+    parser.add_argument('--requests', type=int, default=6, help="Timed requests per worker thread")
+    parser.add_argument('--timeout', type=int, default=900, help="Seconds allowed per candidate")
+    parser.add_argument('--measure', default=None, help=argparse.SUPPRESS)  # Child mode: JSON profile to measure
+    parser.add_argument('--concurrency', type=int, default=1, help=argparse.SUPPRESS)  # Child mode: request threads
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        with tempfile.TemporaryDirectory(prefix='deepshield-tune-') as workdir:
+            result = _measure(json.loads(args.measure), args.concurrency, args.requests, workdir)
+        print(json.dumps(result))
+        return 0
+
+    candidates = candidate_profiles()
+    defaults = [profile for profile in candidates if not profile.get('job_workers')]
+    levels = sorted({profile['job_workers'] for profile in candidates if profile.get('job_workers')}) or [1]
+    print(f"🧪 Benchmarking {len(candidates)} thread profiles at concurrency {levels} on {os.cpu_count()} CPUs")
+
+    results = []
+    winners = []
+    for level in levels:
+        print(f"👥 {level} concurrent request(s)")
+        level_results = []
+        tuned = [profile for profile in candidates if profile.get('job_workers') == level]
+        for profile in defaults + tuned:
+            result = run_candidate(profile, level, args.requests, args.timeout)
+            if result is None:
+                continue
+            if not profile.get('job_workers'):
+                # Deploying the defaults still means serving this many requests at once
+                profile = dict(profile, job_workers=level, bot_executor_workers=level)
+            level_results.append((profile, result))
+            print(f"  {_describe(profile):<48} {result['throughput_per_s']:>7.2f} req/s  "
+                  f"p50 {result['p50_ms']:>8.1f} ms  p95 {result['p95_ms']:>8.1f} ms")
+        if level_results:
+            winner = max(level_results, key=lambda item: item[1]['throughput_per_s'])
+            print(f"  🏁 Best at {level}: {_describe(winner[0])}")
+            winners.append(winner)
+        results.extend({'concurrency': level, 'profile': profile, 'result': result}
+                       for profile, result in level_results)
+
+    if not winners:
+        print("❌ No candidate completed")
+        return 1
+
+    best_profile, best = max(winners, key=lambda item: item[1]['throughput_per_s'])
+    save_profile(best_profile, args.output, meta={
+        'cpu_count': os.cpu_count(),
+        'concurrency': best_profile['job_workers'],
+        'throughput_per_s': best['throughput_per_s'],
+        'p50_ms': best['p50_ms'],
+        'p95_ms': best['p95_ms'],
+        'candidates': results
+    })
+    print(f"✅ Best: {_describe(best_profile)} at {best_profile['job_workers']} concurrent "
+          f"({best['throughput_per_s']:.2f} req/s)")
+    print(f"💾 Profile written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+Minimal local stand-in for the Telegram Bot API, enough to drive
+DeepShieldTelegramBot end to end without network access.
+
+Serves getMe/getFile and file downloads, accepts sendMessage,
+editMessageText, deleteMessage and answerCallbackQuery, and records
+when each chat received its messages so a load test can compute
+per-update latencies.
+"""
+import json
+import time
+import threading
+from urllib.parse import parse_qs, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeTelegramServer:
+    def __init__(self, host='127.0.0.1', port=0):
+        self.files = {}  # file_id -> local path
+        self.messages = {}  # chat_id -> [(timestamp, method, text)]
+        self.calls = {}  # method -> count
+        self._message_id = 0
+        self._lock = threading.Lock()
+        self._chat_events = {}
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server._handle(self, 'GET')
+
+            def do_POST(self):
+                server._handle(self, 'POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.host, self.port = self.httpd.server_address[:2]
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/bot"
+
+    @property
+    def base_file_url(self):
+        return f"http://{self.host}:{self.port}/file/bot"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-telegram", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def add_file(self, file_id, path):
+        self.files[file_id] = path
+
+    def watch_chat(self, chat_id, predicate):
+        """Return an Event set once a message to chat_id satisfies predicate(text)"""
+        event = threading.Event()
+        with self._lock:
+            self._chat_events[chat_id] = (predicate, event)
+        return event
+
+    # ------------------------------------------------------------------
+    def _handle(self, handler, verb):
+        path = urlparse(handler.path).path
+        if path.startswith('/file/bot'):
+            self._serve_file(handler, path.split('/', 4)[-1])
+            return
+
+        # /bot<token>/<method>
+        method = path.rsplit('/', 1)[-1]
+        params = self._read_params(handler) if verb == 'POST' else {}
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+
+        api = getattr(self, f"_api_{method}", None)
+        if api is None:
+            self._reply(handler, 404, {'ok': False, 'error_code': 404, 'description': f'Unknown method {method}'})
+            return
+        result = api(params)
+        if result is None:
+            self._reply(handler, 400, {'ok': False, 'error_code': 400, 'description': 'Bad Request'})
+        else:
+            self._reply(handler, 200, {'ok': True, 'result': result})
+
+    def _read_params(self, handler):
+        length = int(handler.headers.get('Content-Length') or 0)
+        body = handler.rfile.read(length) if length else b''
+        content_type = handler.headers.get('Content-Type', '')
+        if 'application/json' in content_type:
+            return json.loads(body or b'{}')
+        if 'application/x-www-form-urlencoded' in content_type:
+            params = {}
+            for key, values in parse_qs(body.decode()).items():
+                value = values[0]
+                try:
+                    params[key] = json.loads(value)
+                except ValueError:
+                    params[key] = value
+            return params
+        return {}
+
+    def _reply(self, handler, status, payload):
+        body = json.dumps(payload).encode()
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _serve_file(self, handler, file_path):
+        local = self.files.get(file_path)
+        if local is None:
+            handler.send_error(404)
+            return
+        with open(local, 'rb') as f:
+            body = f.read()
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/octet-stream')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _record(self, chat_id, method, text):
+        with self._lock:
+            self.messages.setdefault(chat_id, []).append((time.perf_counter(), method, text))
+            self._message_id += 1
+            message_id = self._message_id
+            watch = self._chat_events.get(chat_id)
+        if watch is not None and text is not None and watch[0](text):
+            watch[1].set()
+        return message_id
+
+    # ------------------------------------------------------------------
+    # Bot API methods
+    # ------------------------------------------------------------------
+    def _api_getMe(self, params):
+        return {'id': 1, 'is_bot': True, 'first_name': 'DeepShield Load Test', 'username': 'deepshield_load_bot',
+                'can_join_groups': False, 'can_read_all_group_messages': False, 'supports_inline_queries': False}
+
+    def _api_getFile(self, params):
+        file_id = params.get('file_id')
+        if file_id not in self.files:
+            return None
+        return {'file_id': file_id, 'file_unique_id': file_id, 'file_path': file_id}
+
+    def _message(self, chat_id, text):
+        return {'message_id': self._record(chat_id, 'sendMessage', text), 'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'}, 'text': text}
+
+    def _api_sendMessage(self, params):
+        return self._message(int(params.get('chat_id')), params.get('text', ''))
+
+    def _api_editMessageText(self, params):
+        chat_id = params.get('chat_id')
+        if chat_id is None:
+            return True
+        return self._message(int(chat_id), params.get('text', ''))
+
+    def _api_deleteMessage(self, params):
+        return True
+
+    def _api_answerCallbackQuery(self, params):
+        return True
+
+    def _api_deleteWebhook(self, params):
+        return True
+
+    def _api_getUpdates(self, params):
+        return []
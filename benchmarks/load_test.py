@@ -0,0 +1,294 @@
+"""
+End-to-end load generation for the Telegram bot and the Flask app.
+
+Bot mode replays photo/video/voice updates through the real
+DeepShieldTelegramBot handlers. A local Bot API stand-in serves the files
+and receives the replies:
+
+    python -m benchmarks.load_test bot --updates 60 --rate 4 --mix photo=0.6,video=0.2,voice=0.2
+
+HTTP mode drives concurrent /detect and /api/live-frame traffic at a running app.py:
+
+    python -m benchmarks.load_test http --url http://127.0.0.1:5000 --users 8 --requests 25 --mix detect=0.3,live=0.7
+
+Both report throughput and tail latency, optionally as JSON (--output). Bot
+mode also reports queueing delay (update sent to first bot reply); HTTP mode
+reports client-observed latency only, since /detect is served synchronously
+and exposes no enqueue-to-start time.
+"""
+import os
+import sys
+import json
+import time
+import base64
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks import synthetic
+
+
+def _parse_mix(text):
+    """'photo=0.6,video=0.4' -> {'photo': 0.6, 'video': 0.4}"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def _pick(mix, rng):
+    names = list(mix)
+    return rng.choices(names, weights=[mix[n] for n in names])[0]
+
+
+def _summary(values_s):
+    """Latency summary in milliseconds"""
+    if not values_s:
+        return None
+    values = np.array(values_s) * 1000
+    return {
+        'count': int(len(values)),
+        'mean_ms': round(float(values.mean()), 2),
+        'p50_ms': round(float(np.percentile(values, 50)), 2),
+        'p95_ms': round(float(np.percentile(values, 95)), 2),
+        'p99_ms': round(float(np.percentile(values, 99)), 2),
+        'max_ms': round(float(values.max()), 2)
+    }
+
+
+def _print_report(title, report):
+    print(f"\n📈 {title}")
+    print(f"   completed {report['completed']}/{report['submitted']}  errors {report['errors']}  "
+          f"throughput {report['throughput_per_s']:.2f}/s over {report['wall_time_s']:.1f}s")
+    for name, summary in report['latency'].items():
+        if summary:
+            print(f"   {name:<28} p50 {summary['p50_ms']:>9.1f}  p95 {summary['p95_ms']:>9.1f}  "
+                  f"p99 {summary['p99_ms']:>9.1f}  max {summary['max_ms']:>9.1f} ms")
+
+
+# ----------------------------------------------------------------------
+# Bot mode
+# ----------------------------------------------------------------------
+def _make_update(update_id, chat_id, kind, file_id):
+    message = {
+        'message_id': update_id,
+        'date': int(time.time()),
+        'chat': {'id': chat_id, 'type': 'private'},
+        'from': {'id': chat_id, 'is_bot': False, 'first_name': f'load{chat_id}'}
+    }
+    if kind == 'photo':
+        message['photo'] = [{'file_id': file_id, 'file_unique_id': file_id, 'width': 1280, 'height': 960}]
+    elif kind == 'video':
+        message['video'] = {'file_id': file_id, 'file_unique_id': file_id, 'width': 640, 'height': 360, 'duration': 4}
+    elif kind == 'voice':
+        message['voice'] = {'file_id': file_id, 'file_unique_id': file_id, 'duration': 5}
+    return {'update_id': update_id, 'message': message}
+
+
+def _bot_media(workdir):
+    media = {'photo': synthetic.make_image(os.path.join(workdir, 'photo.jpg'), 1280, 960, face=True),
+             'video': synthetic.make_video(os.path.join(workdir, 'video.mp4'), 640, 360, 4)}
+    voice = os.path.join(workdir, 'voice.ogg')
+    try:
+        import soundfile as sf
+        wav = synthetic.make_audio(os.path.join(workdir, 'voice.wav'), 5, sr=48000)
+        y, sr = sf.read(wav, dtype='float32')
+        try:
+            sf.write(voice, y, sr, format='OGG', subtype='OPUS')  # what Telegram voice notes use
+        except Exception:
+            sf.write(voice, y, sr, format='OGG', subtype='VORBIS')
+    except Exception as e:
+        print(f"⚠️ Could not encode an OGG voice note ({e}); using WAV")
+        voice = synthetic.make_audio(voice.replace('.ogg', '.wav'), 5)
+    media['voice'] = voice
+    return media
+
+
+async def _run_bot_load(args):
+    from telegram import Update
+    from telegram_bot import DeepShieldTelegramBot
+    from benchmarks.fake_telegram import FakeTelegramServer
+
+    rng = random.Random(args.seed)
+    mix = _parse_mix(args.mix)
+
+    with tempfile.TemporaryDirectory(prefix='deepshield-load-') as workdir:
+        server = FakeTelegramServer().start()
+        for kind, path in _bot_media(workdir).items():
+            server.add_file(kind, path)
+
+        bot = DeepShieldTelegramBot(token='123456:LOADTEST', base_url=server.base_url,
+                                    base_file_url=server.base_file_url)
+        application = bot.application
+        await application.initialize()
+        await application.start()
+
+        def finished(text):
+            return 'Detection Report' in text or text.startswith('❌')
+
+        submitted, pending = {}, {}
+        started = time.perf_counter()
+        for i in range(args.updates):
+            chat_id = 10_000 + i
+            kind = _pick(mix, rng)
+            pending[chat_id] = server.watch_chat(chat_id, finished)
+            submitted[chat_id] = (time.perf_counter(), kind)
+            update = Update.de_json(_make_update(i + 1, chat_id, kind, kind), application.bot)
+            await application.update_queue.put(update)
+            if args.rate > 0:
+                # Poisson arrivals at the requested mean rate
+                await asyncio.sleep(rng.expovariate(args.rate))
+
+        deadline = time.perf_counter() + args.timeout
+        while time.perf_counter() < deadline and not all(e.is_set() for e in pending.values()):
+            await asyncio.sleep(0.05)
+        wall = time.perf_counter() - started
+
+        await application.stop()
+        await application.shutdown()
+        server.stop()
+
+    latency = {'end_to_end': [], 'queueing_delay': []}
+    by_kind = {}
+    completed = errors = 0
+    for chat_id, (t_submit, kind) in submitted.items():
+        messages = server.messages.get(chat_id, [])
+        done = [m for m in messages if m[2] is not None and finished(m[2])]
+        if not done:
+            continue
+        completed += 1
+        if done[-1][2].startswith('❌'):
+            errors += 1
+        end_to_end = done[-1][0] - t_submit
+        latency['end_to_end'].append(end_to_end)
+        by_kind.setdefault(kind, []).append(end_to_end)
+        # The "Processing..." acknowledgement marks when a handler picked the update up
+        latency['queueing_delay'].append(messages[0][0] - t_submit)
+
+    report = {
+        'mode': 'bot',
+        'submitted': len(submitted),
+        'completed': completed,
+        'errors': errors,
+        'wall_time_s': round(wall, 3),
+        'throughput_per_s': round(completed / wall, 3) if wall else 0.0,
+        'latency': {name: _summary(values) for name, values in latency.items()},
+        'api_calls': server.calls
+    }
+    for kind, values in by_kind.items():
+        report['latency'][f'end_to_end/{kind}'] = _summary(values)
+    return report
+
+
+# ----------------------------------------------------------------------
+# HTTP mode
+# ----------------------------------------------------------------------
+def _run_http_load(args):
+    import requests
+
+    rng = random.Random(args.seed)
+    mix = _parse_mix(args.mix)
+
+    with tempfile.TemporaryDirectory(prefix='deepshield-load-') as workdir:
+        image_path = synthetic.make_image(os.path.join(workdir, 'upload.jpg'), 1280, 960, face=True)
+        with open(image_path, 'rb') as f:
+            upload_bytes = f.read()
+        frame_path = synthetic.make_image(os.path.join(workdir, 'frame.jpg'), 640, 480, face=True)
+        with open(frame_path, 'rb') as f:
+            frame_url = 'data:image/jpeg;base64,' + base64.b64encode(f.read()).decode()
+
+    plan = [[_pick(mix, rng) for _ in range(args.requests)] for _ in range(args.users)]
+    latencies = {name: [] for name in mix}
+    errors = [0]
+    lock = threading.Lock()
+
+    def user(user_id, kinds):
+        local = requests.Session()
+        for kind in kinds:
+            t0 = time.perf_counter()
+            try:
+                if kind == 'detect':
+                    response = local.post(f"{args.url}/detect", files={'file': ('upload.jpg', upload_bytes, 'image/jpeg')},
+                                          timeout=args.timeout)
+                else:
+                    response = local.post(f"{args.url}/api/live-frame",
+                                          json={'image': frame_url, 'session_id': f'load-{user_id}'},
+                                          timeout=args.timeout)
+                ok = response.status_code == 200
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - t0
+            with lock:
+                latencies[kind].append(elapsed)
+                if not ok:
+                    errors[0] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        for user_id, kinds in enumerate(plan):
+            pool.submit(user, user_id, kinds)
+    wall = time.perf_counter() - started
+
+    all_latencies = [v for values in latencies.values() for v in values]
+    submitted = args.users * args.requests
+
+    report = {
+        'mode': 'http',
+        'url': args.url,
+        'users': args.users,
+        'submitted': submitted,
+        'completed': len(all_latencies) - errors[0],
+        'errors': errors[0],
+        'wall_time_s': round(wall, 3),
+        'throughput_per_s': round(len(all_latencies) / wall, 3) if wall else 0.0,
+        'latency': {name: _summary(values) for name, values in latencies.items()}
+    }
+    report['latency']['all'] = _summary(all_latencies)
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the DeepShield bot and web app")
+    sub = parser.add_subparsers(dest='mode', required=True)
+
+    bot = sub.add_parser('bot', help="Replay updates through the bot against a local Bot API stand-in")
+    bot.add_argument('--updates', type=int, default=30, help="Number of updates to replay")
+    bot.add_argument('--rate', type=float, default=2.0, help="Mean arrival rate in updates/s (0 = all at once)")
+    bot.add_argument('--mix', default='photo=0.6,video=0.2,voice=0.2', help="Update mix weights")
+    bot.add_argument('--timeout', type=float, default=600, help="Seconds to wait for all replies")
+
+    http = sub.add_parser('http', help="Drive concurrent /detect and /api/live-frame traffic at app.py")
+    http.add_argument('--url', default='http://127.0.0.1:5000', help="Base URL of the running app")
+    http.add_argument('--users', type=int, default=4, help="Concurrent clients")
+    http.add_argument('--requests', type=int, default=20, help="Requests per client")
+    http.add_argument('--mix', default='detect=0.3,live=0.7', help="Request mix weights")
+    http.add_argument('--timeout', type=float, default=120, help="Per-request timeout in seconds")
+
+    for p in (bot, http):
+        p.add_argument('--seed', type=int, default=0)
+        p.add_argument('--output', default=None, help="Write the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.mode == 'bot':
+        report = asyncio.run(_run_bot_load(args))
+        _print_report("Telegram bot load test", report)
+    else:
+        report = _run_http_load(args)
+        _print_report(f"HTTP load test against {args.url}", report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""
+Offline benchmark of the detection pipeline on synthetic media.
+
+    python -m benchmarks.pipeline_bench --output bench.json
+    python -m benchmarks.pipeline_bench --quick --compare bench.json
+
+Each case reports throughput, p50/p95 latency, peak RSS and the per-stage
+time breakdown from the instrumentation spans. With --compare, cases whose
+p50 latency regressed beyond --tolerance fail the run (exit code 1).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from benchmarks import synthetic
+from image_io import decode_image
+from audio_io import load_audio, clear_cache
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _current_rss():
+    """Resident set size of this process in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        if resource is not None:
+            # ru_maxrss is the lifetime peak (KiB on Linux, bytes on macOS)
+            scale = 1 if sys.platform == 'darwin' else 1024
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+        return 0
+
+
+class PeakRSSSampler:
+    """Samples RSS on a background thread and keeps the maximum"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.peak = _current_rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _current_rss())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _current_rss())
+
+
+def _stage_delta(before, after):
+    """Difference of two instrumentation.registry snapshots: {modality/stage: seconds per call}"""
+    stages = {}
+    for modality, by_stage in after.items():
+        for stage, entry in by_stage.items():
+            prev = before.get(modality, {}).get(stage, {'count': 0, 'sum': 0.0})
+            count = entry['count'] - prev['count']
+            if count > 0:
+                stages[f"{modality}/{stage}"] = {
+                    'calls': count,
+                    'total_s': round(entry['sum'] - prev['sum'], 6)
+                }
+    return stages
+
+
+def run_case(name, fn, iterations, warmup=1):
+    """Time `fn` over `iterations` runs after `warmup` untimed runs"""
+    from instrumentation import registry
+
+    for _ in range(warmup):
+        fn()
+
+    latencies = []
+    before = registry.snapshot()
+    with PeakRSSSampler() as rss:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - started
+    stages = _stage_delta(before, registry.snapshot())
+
+    latencies = np.array(latencies)
+    result = {
+        'iterations': iterations,
+        'throughput_per_s': round(iterations / elapsed, 4) if elapsed > 0 else None,
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)) * 1000, 3),
+        'mean_ms': round(float(latencies.mean()) * 1000, 3),
+        'peak_rss_mb': round(rss.peak / (1024 * 1024), 1),
+        'stages': stages
+    }
+    print(f"  {name:<40} p50 {result['p50_ms']:>9.1f} ms  p95 {result['p95_ms']:>9.1f} ms  "
+          f"{result['throughput_per_s']:>8.2f}/s  peak {result['peak_rss_mb']:.0f} MB")
+    return result
+
+
+def build_media(workdir, quick=False):
+    """Generate the synthetic corpus; returns {label: path}"""
+    media = {}
+    image_sizes = [(640, 480), (1920, 1080)] if quick else [(640, 480), (1920, 1080), (4000, 3000)]
+    for width, height in image_sizes:
+        for face in (False, True):
+            label = f"image_{width}x{height}_{'face' if face else 'noface'}"
+            media[label] = synthetic.make_image(os.path.join(workdir, f"{label}.jpg"), width, height, face=face)
+
+    video_specs = [(320, 240, 2), (1280, 720, 2)] if quick else [(320, 240, 2), (1280, 720, 2), (1280, 720, 10)]
+    for width, height, seconds in video_specs:
+        label = f"video_{width}x{height}_{seconds}s"
+        media[label] = synthetic.make_video(os.path.join(workdir, f"{label}.mp4"), width, height, seconds)
+
+    for seconds in ([3, 10] if quick else [3, 10, 60]):
+        label = f"audio_{seconds}s"
+        media[label] = synthetic.make_audio(os.path.join(workdir, f"{label}.wav"), seconds)
+
+    # Telegram voice notes: OGG/Opus at 48 kHz
+    for seconds in ([10] if quick else [10, 60]):
+        label = f"audio_voicenote_{seconds}s"
+        media[label] = synthetic.make_voice_note(os.path.join(workdir, f"{label}.ogg"), seconds)
+
+    return media
+
+
+def _librosa_load(path, sr):
+    import librosa
+    return librosa.load(path, sr=sr)
+
+
+def _load_audio(path, detector):
+    y, _ = load_audio(path, sr=detector.model_configs['audio']['sample_rate'], use_cache=False)
+    return y
+
+
+def _librosa_features(clips, detector):
+    """The per-clip librosa path preprocess_audio used before the batched engine"""
+    import librosa
+    sr = detector.model_configs['audio']['sample_rate']
+    out = []
+    for y in clips:
+        mel_db = librosa.power_to_db(librosa.feature.melspectrogram(y=y, sr=sr, n_mels=128), ref=np.max)
+        resized = cv2.resize(mel_db, (128, 128))
+        out.append((resized - resized.mean()) / resized.std())
+    return np.stack(out)[..., np.newaxis]
+
+
+def _cold(fn):
+    """Run fn with an empty decoded-audio cache, so every timed run pays for its decode"""
+    def run():
+        clear_cache()
+        return fn()
+    return run
+
+
+def build_cases(detector, media, bot=None):
+    """Map case names to zero-argument callables"""
+    cases = {}
+    for label, path in media.items():
+        kind = label.split('_', 1)[0]
+        if kind == 'image':
+            cases[f"decode_full/{label}"] = lambda p=path: cv2.imread(p)
+            cases[f"decode_reduced/{label}"] = lambda p=path: decode_image(p, detector.model_configs['image']['decode_min_side'])
+            cases[f"detect_image/{label}"] = lambda p=path: detector.detect_image(p)
+            cases[f"fallback_image/{label}"] = lambda p=path: detector._fallback_image_prediction(p)
+            if bot is not None:
+                cases[f"bot_enhanced_image/{label}"] = lambda p=path: bot._analyze_image_enhanced(p, None)
+        elif kind == 'video':
+            cases[f"detect_video/{label}"] = lambda p=path: detector.detect_video(p)
+            cases[f"fallback_video/{label}"] = lambda p=path: detector._fallback_video_prediction(p)
+            if bot is not None:
+                cases[f"bot_enhanced_video/{label}"] = lambda p=path: bot._analyze_video_enhanced(p, None)
+        elif kind == 'audio':
+            sr = detector.model_configs['audio']['sample_rate']
+            cases[f"audio_decode_librosa/{label}"] = lambda p=path: _librosa_load(p, sr)
+            cases[f"audio_decode_fast/{label}"] = lambda p=path: load_audio(p, sr=sr, use_cache=False)
+            y = _load_audio(path, detector)
+            cases[f"audio_features_librosa/{label}"] = lambda y=y: _librosa_features([y], detector)
+            cases[f"audio_features_engine/{label}"] = lambda y=y: detector.audio_engine.features([y])
+            cases[f"audio_features_librosa_x16/{label}"] = lambda y=y: _librosa_features([y] * 16, detector)
+            cases[f"audio_features_engine_x16/{label}"] = lambda y=y: detector.audio_engine.features([y] * 16)
+            cases[f"detect_audio/{label}"] = _cold(lambda p=path: detector.detect_audio(p))
+            cases[f"fallback_audio/{label}"] = _cold(lambda p=path: detector._fallback_audio_prediction(p))
+            if bot is not None:
+                cases[f"bot_enhanced_audio/{label}"] = _cold(lambda p=path: bot._analyze_audio_enhanced(p, None))
+    return cases
+
+
+def _enhanced_analyzer(detector):
+    """
+    DeepShieldTelegramBot instance for the _analyze_*_enhanced heuristics only.
+    Those methods only read the detector's configuration, so the Telegram
+    application and second detector built by __init__ are skipped.
+    """
+    try:
+        from telegram_bot import DeepShieldTelegramBot
+    except ImportError as e:
+        print(f"⚠️ Skipping bot enhanced-analysis cases: {e}")
+        return None
+    bot = DeepShieldTelegramBot.__new__(DeepShieldTelegramBot)
+    bot.detector = detector
+    return bot
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Print per-case p50 deltas against a baseline run; returns the list of regressions"""
+    regressions = []
+    print(f"\n📊 Comparison against {baseline['meta'].get('commit') or 'baseline'} (tolerance {tolerance:.0%})")
+    for name, current in results['cases'].items():
+        previous = baseline['cases'].get(name)
+        if previous is None:
+            continue
+        delta = (current['p50_ms'] - previous['p50_ms']) / previous['p50_ms'] if previous['p50_ms'] else 0.0
+        marker = '❌' if delta > tolerance else ('✅' if delta < -tolerance else '  ')
+        print(f"  {marker} {name:<40} {previous['p50_ms']:>9.1f} -> {current['p50_ms']:>9.1f} ms ({delta:+.1%})")
+        if delta > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the DeepShield detection pipeline on synthetic media")
+    parser.add_argument('--output', default='bench_results.json', help="Where to write the JSON results")
+    parser.add_argument('--iterations', type=int, default=5, help="Timed runs per case")
+    parser.add_argument('--quick', action='store_true', help="Smaller corpus for a fast smoke run")
+    parser.add_argument('--filter', default=None, help="Only run cases whose name contains this string")
+    parser.add_argument('--model-path', default=None, help="Custom deepfake weights for the image model")
+    parser.add_argument('--compare', default=None, help="Baseline JSON to compare p50 latencies against")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="Allowed p50 slowdown before failing")
+    args = parser.parse_args(argv)
+
+    from accurate_deepfake_detector import AccurateDeepfakeDetector, TENSORFLOW_AVAILABLE, FACE_DETECTION_AVAILABLE
+
+    detector = AccurateDeepfakeDetector(model_path=args.model_path)
+    bot = _enhanced_analyzer(detector)
+
+    results = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'tensorflow': TENSORFLOW_AVAILABLE,
+            'face_detection': FACE_DETECTION_AVAILABLE,
+            'iterations': args.iterations,
+            'quick': args.quick
+        },
+        'cases': {}
+    }
+
+    with tempfile.TemporaryDirectory(prefix='deepshield-bench-') as workdir:
+        print("🧪 Generating synthetic media...")
+        media = build_media(workdir, quick=args.quick)
+        cases = build_cases(detector, media, bot=bot)
+
+        print(f"⏱️  Running {len(cases)} cases x {args.iterations} iterations")
+        for name, fn in cases.items():
+            if args.filter and args.filter not in name:
+                continue
+            results['cases'][name] = run_case(name, fn, args.iterations)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
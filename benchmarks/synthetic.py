@@ -0,0 +1,79 @@
+"""
+Deterministic synthetic media for benchmarks: images with and without a
+face-like subject, short videos and audio clips, all generated locally.
+"""
+import os
+
+import cv2
+import numpy as np
+import soundfile as sf
+
+
+def _rng(seed):
+    return np.random.default_rng(seed)
+
+
+def make_image(path, width, height, face=False, seed=0):
+    """Textured background, optionally with a drawn face-like subject in the middle"""
+    rng = _rng(seed)
+    img = rng.integers(0, 256, size=(height // 8 + 1, width // 8 + 1, 3), dtype=np.uint8)
+    img = cv2.resize(img, (width, height), interpolation=cv2.INTER_CUBIC)
+    img = cv2.GaussianBlur(img, (5, 5), 0)
+
+    if face:
+        cx, cy = width // 2, height // 2
+        fw, fh = max(width // 6, 20), max(height // 4, 28)
+        cv2.ellipse(img, (cx, cy), (fw, fh), 0, 0, 360, (140, 170, 215), -1)
+        eye_dy, eye_dx = fh // 4, fw // 2
+        for dx in (-eye_dx, eye_dx):
+            cv2.ellipse(img, (cx + dx, cy - eye_dy), (fw // 6, fh // 12), 0, 0, 360, (255, 255, 255), -1)
+            cv2.circle(img, (cx + dx, cy - eye_dy), max(fh // 16, 2), (40, 30, 20), -1)
+        cv2.line(img, (cx, cy - eye_dy // 2), (cx, cy + fh // 5), (110, 130, 180), max(fw // 20, 1))
+        cv2.ellipse(img, (cx, cy + fh // 2), (fw // 3, fh // 10), 0, 0, 180, (60, 60, 150), max(fw // 25, 1))
+
+    cv2.imwrite(path, img, [cv2.IMWRITE_JPEG_QUALITY, 92])
+    return path
+
+
+def make_video(path, width, height, seconds, fps=25, face=True, seed=0):
+    """Slowly panning synthetic scene, mp4v encoded"""
+    frame = cv2.imread(make_image(path + '.seed.jpg', width + 64, height + 64, face=face, seed=seed))
+    os.remove(path + '.seed.jpg')
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    rng = _rng(seed)
+    for i in range(int(seconds * fps)):
+        # Small pan plus sensor-like noise so consecutive frames differ slightly
+        dx, dy = (i % 64), (i // 2) % 64
+        view = frame[dy:dy + height, dx:dx + width].astype(np.int16)
+        view += rng.integers(-3, 4, size=view.shape, dtype=np.int16)
+        writer.write(np.clip(view, 0, 255).astype(np.uint8))
+    writer.release()
+    return path
+
+
+def _voice(seconds, sr, seed):
+    rng = _rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    f0 = 140 + 20 * np.sin(2 * np.pi * 3 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    y = sum(np.sin(k * phase) / k for k in range(1, 6))
+    y *= 0.5 * (1 + np.sin(2 * np.pi * 2 * t))  # syllable-like envelope
+    y += 0.02 * rng.standard_normal(len(t))
+    return (0.3 * y / np.max(np.abs(y))).astype(np.float32)
+
+
+def make_audio(path, seconds, sr=16000, seed=0):
+    """Voice-like harmonic tone with vibrato and background noise"""
+    sf.write(path, _voice(seconds, sr, seed), sr)
+    return path
+
+
+def make_voice_note(path, seconds, sr=48000, seed=0):
+    """The voice-like signal as a Telegram-style OGG/Opus voice note (Vorbis if Opus is unsupported)"""
+    y = _voice(seconds, sr, seed)
+    try:
+        sf.write(path, y, sr, format='OGG', subtype='OPUS')
+    except (RuntimeError, ValueError, TypeError):
+        sf.write(path, y, sr, format='OGG', subtype='VORBIS')
+    return path
@@ -0,0 +1,218 @@
+"""
+Bulk scan of a directory tree or file list across a process pool.
+
+    python accurate_deepfake_detector.py scan /data/uploads --output results.jsonl --workers 4
+    python accurate_deepfake_detector.py scan files.txt --output results.jsonl   # one path per line
+
+Each worker loads its own detector. Images and audio are grouped into
+batches and scored with one model call each (detect_images /
+detect_audios); videos go through detect_video. Results are appended to
+the JSONL output as they arrive, and every finished file is recorded in
+<output>.manifest (path, size, mtime, status). Rerunning the same command skips files the
+manifest lists as unchanged, so an interrupted sweep resumes where it
+stopped.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp'}
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm'}
+AUDIO_EXTENSIONS = {'.wav', '.mp3', '.m4a', '.flac', '.ogg'}
+
+
+def media_kind(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in IMAGE_EXTENSIONS:
+        return 'image'
+    if extension in VIDEO_EXTENSIONS:
+        return 'video'
+    if extension in AUDIO_EXTENSIONS:
+        return 'audio'
+    return None
+
+
+def iter_inputs(source):
+    """Media paths from a directory tree or a text file listing one path per line"""
+    if os.path.isdir(source):
+        for dirpath, dirnames, filenames in os.walk(source):
+            dirnames.sort()
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                if media_kind(path):
+                    yield path
+    else:
+        with open(source) as f:
+            for line in f:
+                path = line.strip()
+                if path and media_kind(path):
+                    yield path
+
+
+def _signature(path):
+    try:
+        info = os.stat(path)
+        return info.st_size, int(info.st_mtime)
+    except OSError:
+        return None, None
+
+
+def load_manifest(manifest_path):
+    """{path: (size, mtime)} of files finished by earlier runs"""
+    done = {}
+    if not os.path.exists(manifest_path):
+        return done
+    with open(manifest_path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # Torn last line from an interrupted run
+            done[entry['path']] = (entry['size'], entry['mtime'])
+    return done
+
+
+def build_tasks(paths, batch_size):
+    """Group images and audio into batches of batch_size; videos are one task each"""
+    pending = {'image': [], 'audio': []}
+    for path in paths:
+        kind = media_kind(path)
+        if kind in pending:
+            pending[kind].append(path)
+            if len(pending[kind]) == batch_size:
+                yield (kind, pending[kind])
+                pending[kind] = []
+        else:
+            yield (kind, [path])
+    for kind, batch in pending.items():
+        if batch:
+            yield (kind, batch)
+
+
+# ----------------------------------------------------------------------
+# Worker side
+# ----------------------------------------------------------------------
+_worker_detector = None
+
+
+def _init_worker(model_path, audio_model_path):
+    global _worker_detector
+    import cv2
+    from accurate_deepfake_detector import AccurateDeepfakeDetector
+    cv2.setNumThreads(1)  # Parallelism comes from the pool
+    _worker_detector = AccurateDeepfakeDetector(model_path=model_path, audio_model_path=audio_model_path)
+
+
+def _run_task(task):
+    """Returns [(path, result or None, error or None, seconds)]"""
+    kind, paths = task
+    start = time.perf_counter()
+    try:
+        if kind == 'image':
+            results = _worker_detector.detect_images(paths)
+        elif kind == 'audio':
+            results = _worker_detector.detect_audios(paths)
+        else:
+            results = [_worker_detector.detect_video(paths[0])]
+        seconds = (time.perf_counter() - start) / len(paths)
+        return [(path, result, None if result is not None else 'detection failed', seconds)
+                for path, result in zip(paths, results)]
+    except Exception as e:
+        seconds = (time.perf_counter() - start) / len(paths)
+        return [(path, None, str(e), seconds) for path in paths]
+
+
+# ----------------------------------------------------------------------
+# Main process
+# ----------------------------------------------------------------------
+def scan(source, output, workers=2, batch_size=16, model_path=None, audio_model_path=None, retry_failed=False):
+    """
+    Scan every media file under source, appending results to output
+
+    Returns:
+        dict with 'scanned', 'skipped', 'failed' counts and 'seconds'
+    """
+    manifest_path = output + '.manifest'
+    done = load_manifest(manifest_path)
+    failed_before = set()
+    if retry_failed and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry['status'] != 'ok':
+                    failed_before.add(entry['path'])
+                elif entry['path'] in failed_before:
+                    failed_before.discard(entry['path'])
+
+    summary = {'scanned': 0, 'skipped': 0, 'failed': 0, 'seconds': 0.0}
+
+    # Decided here rather than in the generator the pool's task thread consumes,
+    # so only the main thread ever touches summary
+    pending = []
+    for path in iter_inputs(source):
+        if done.get(path) == _signature(path) and path not in failed_before:
+            summary['skipped'] += 1
+        else:
+            pending.append(path)
+
+    start = time.perf_counter()
+    context = multiprocessing.get_context('spawn')
+    with open(output, 'a') as results_file, open(manifest_path, 'a') as manifest_file, \
+            context.Pool(workers, initializer=_init_worker, initargs=(model_path, audio_model_path)) as pool:
+        for finished in pool.imap_unordered(_run_task, build_tasks(pending, batch_size)):
+            for path, result, error, seconds in finished:
+                record = {'path': path, 'kind': media_kind(path), 'seconds': round(seconds, 4)}
+                if result is not None:
+                    record['result'] = result['result']
+                else:
+                    record['error'] = error
+                    summary['failed'] += 1
+                results_file.write(json.dumps(record, default=str) + "\n")
+
+                size, mtime = _signature(path)
+                manifest_file.write(json.dumps({'path': path, 'size': size, 'mtime': mtime,
+                                                'status': 'ok' if result is not None else 'failed'}) + "\n")
+                summary['scanned'] += 1
+
+            # Results are flushed before the manifest so a crash can only re-scan, never lose, a file
+            results_file.flush()
+            manifest_file.flush()
+            if summary['scanned'] % 100 < len(finished):
+                elapsed = time.perf_counter() - start
+                print(f"   🔍 {summary['scanned']} scanned ({summary['scanned'] / elapsed:.1f} files/sec), "
+                      f"{summary['skipped']} skipped, {summary['failed']} failed")
+
+    summary['seconds'] = time.perf_counter() - start
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='accurate_deepfake_detector.py scan',
+                                     description="Scan a directory or file list for deepfakes")
+    parser.add_argument('source', help="Directory to walk, or a text file with one media path per line")
+    parser.add_argument('--output', default='scan_results.jsonl', help="JSONL results file (appended)")
+    parser.add_argument('--workers', type=int, default=2, help="Detector processes (each loads its own models)")
+    parser.add_argument('--batch-size', type=int, default=16, help="Images per batched model call")
+    parser.add_argument('--model-path', default=None, help="Custom deepfake weights for the image model")
+    parser.add_argument('--audio-model-path', default=None, help="Weights for the audio CNN")
+    parser.add_argument('--retry-failed', action='store_true', help="Re-scan files that failed in earlier runs")
+    args = parser.parse_args(argv)
+
+    summary = scan(args.source, args.output, workers=args.workers, batch_size=args.batch_size,
+                   model_path=args.model_path, audio_model_path=args.audio_model_path,
+                   retry_failed=args.retry_failed)
+    rate = summary['scanned'] / summary['seconds'] if summary['seconds'] > 0 else 0.0
+    print(f"✅ {summary['scanned']} files scanned ({rate:.1f} files/sec), "
+          f"{summary['skipped']} already done, {summary['failed']} failed")
+    print(f"📄 Results: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,11 +5,15 @@ interface LiveCameraProps {
   isActive?: boolean;
 }
 
+const LIVE_SOCKET_URL = (process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5000')
+  .replace(/^http/, 'ws') + '/ws/live';
+
 const LiveCamera: React.FC<LiveCameraProps> = ({ onAnalysisComplete, isActive = true }) => {
   const videoRef = useRef<HTMLVideoElement>(null);
   const canvasRef = useRef<HTMLCanvasElement>(null);
   const streamRef = useRef<MediaStream | null>(null);
   const animationRef = useRef<number>();
+  const socketRef = useRef<WebSocket | null>(null);
   
   const [isStreaming, setIsStreaming] = useState(false);
   const [detectionResult, setDetectionResult] = useState<any>(null);
@@ -18,33 +22,68 @@ const LiveCamera: React.FC<LiveCameraProps> = ({ onAnalysisComplete, isActive =
   const [error, setError] = useState<string | null>(null);
   const [isCameraSupported, setIsCameraSupported] = useState(true);
 
-  const analyzeFrame = useCallback(async (imageBlob: Blob) => {
-    if (isAnalyzing) return;
+  const openSocket = useCallback(() => {
+    if (socketRef.current && socketRef.current.readyState <= WebSocket.OPEN) return;
+
+    const socket = new WebSocket(LIVE_SOCKET_URL);
+    socket.binaryType = 'arraybuffer';
+
+    socket.onmessage = (event) => {
+      try {
+        const message = JSON.parse(event.data);
+        setIsAnalyzing(false);
+        if (message.error || !message.result) return;
+
+        const prediction = message.result.result;
+        const liveResult = {
+          is_deepfake: prediction.is_deepfake,
+          confidence: prediction.confidence,
+          score: prediction.raw_score,
+          timestamp: message.result.timestamp,
+          frame_number: message.frame,
+          frames_dropped: message.dropped,
+          latency_ms: message.latency_ms
+        };
+
+        setDetectionResult(liveResult);
+        onAnalysisComplete(liveResult);
+      } catch (error) {
+        console.error('Frame analysis error:', error);
+      }
+    };
 
-    setIsAnalyzing(true);
-    setFrameCount(prev => prev + 1);
+    socket.onerror = () => {
+      setError('Live detection connection failed');
+    };
 
-    try {
-      // Simulate frame analysis (replace with real API call)
-      await new Promise(resolve => setTimeout(resolve, 500));
-      
-      const mockResult = {
-        is_deepfake: Math.random() > 0.8,
-        confidence: Math.random() * 100,
-        score: Math.random(),
-        features_analyzed: Math.floor(Math.random() * 10) + 5,
-        timestamp: new Date().toISOString(),
-        frame_number: frameCount + 1
-      };
-
-      setDetectionResult(mockResult);
-      onAnalysisComplete(mockResult);
-    } catch (error) {
-      console.error('Frame analysis error:', error);
-    } finally {
+    socket.onclose = () => {
       setIsAnalyzing(false);
+      if (socketRef.current === socket) {
+        socketRef.current = null;
+      }
+    };
+
+    socketRef.current = socket;
+  }, [onAnalysisComplete]);
+
+  const closeSocket = useCallback(() => {
+    if (socketRef.current) {
+      socketRef.current.close();
+      socketRef.current = null;
     }
-  }, [isAnalyzing, frameCount, onAnalysisComplete]);
+  }, []);
+
+  const analyzeFrame = useCallback((imageBlob: Blob) => {
+    const socket = socketRef.current;
+    if (!socket || socket.readyState !== WebSocket.OPEN) return;
+
+    // Don't queue frames behind a slow uplink; the server also keeps only the newest frame
+    if (socket.bufferedAmount > 0) return;
+
+    socket.send(imageBlob);
+    setIsAnalyzing(true);
+    setFrameCount(prev => prev + 1);
+  }, []);
 
   const startCamera = useCallback(async () => {
     try {
@@ -118,9 +157,9 @@ const LiveCamera: React.FC<LiveCameraProps> = ({ onAnalysisComplete, isActive =
     ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
 
     // Convert canvas to blob for analysis
-    canvas.toBlob(async (blob) => {
+    canvas.toBlob((blob) => {
       if (blob) {
-        await analyzeFrame(blob);
+        analyzeFrame(blob);
       }
     }, 'image/jpeg', 0.8);
   }, [isStreaming, analyzeFrame]);
@@ -154,20 +193,23 @@ const LiveCamera: React.FC<LiveCameraProps> = ({ onAnalysisComplete, isActive =
 
   useEffect(() => {
     if (isActive && isStreaming) {
+      openSocket();
       startAnalysis();
     } else {
       stopAnalysis();
+      closeSocket();
     }
 
     return () => stopAnalysis();
-  }, [isActive, isStreaming, startAnalysis, stopAnalysis]);
+  }, [isActive, isStreaming, startAnalysis, stopAnalysis, openSocket, closeSocket]);
 
   useEffect(() => {
     return () => {
       stopCamera();
       stopAnalysis();
+      closeSocket();
     };
-  }, [stopCamera, stopAnalysis]);
+  }, [stopCamera, stopAnalysis, closeSocket]);
 
   // Auto-start camera when component mounts
   useEffect(() => {
@@ -0,0 +1,359 @@
+"""
+Sharded on-disk cache of preprocessed face crops for offline evaluation
+and training.
+
+    cache_dir/manifest.jsonl     one line per written shard
+    cache_dir/shard_00000.npy    uint8 (N, 299, 299, 3) RGB face crops
+
+Crops are stored as uint8 and normalized when batches are read, so a
+cache is a quarter of the float32 size. Each crop is keyed by its source
+path (images) or "path#frame" (sampled video frames). A source is skipped
+on later runs while its size and mtime match the manifest; changed files
+are re-cropped into a new shard and the newer manifest line wins.
+
+Precompute crops for a dataset ahead of evaluation/training runs:
+
+    python dataset_cache.py datasets/train --workers 8
+    python dataset_cache.py datasets/train --video-frames 20   # resume / pick up new files
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+
+import cv2
+import numpy as np
+
+from image_io import decode_image, DEFAULT_MIN_SIDE
+from face_crop import DEFAULT_INPUT_SIZE, DEFAULT_FACE_SCALE, load_face_detector, crop_face
+
+# Directory names understood as labels by scan_labelled_dataset
+LABEL_DIRS = {
+    'real': 0, 'authentic': 0, 'original': 0, 'pristine': 0, '0': 0,
+    'fake': 1, 'deepfake': 1, 'manipulated': 1, 'synthetic': 1, '1': 1
+}
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.webp'}
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm'}
+
+MANIFEST_NAME = 'manifest.jsonl'
+
+
+def top_level_label(root, path):
+    """
+    Label of a file from the first directory below root (LABEL_DIRS), or
+    None. Deeper folders never relabel, so real/1/x.jpg stays real.
+    """
+    parts = os.path.relpath(path, root).split(os.sep)
+    return LABEL_DIRS.get(parts[0].lower()) if len(parts) > 1 else None
+
+
+def scan_labelled_dataset(root, extensions=IMAGE_EXTENSIONS):
+    """
+    Walk a dataset laid out as root/<label dir>/**/file and return sorted
+    (path, label) pairs; label dirs are matched against LABEL_DIRS
+    """
+    items = []
+    for entry in sorted(os.listdir(root)):
+        label = LABEL_DIRS.get(entry.lower())
+        label_dir = os.path.join(root, entry)
+        if label is None or not os.path.isdir(label_dir):
+            continue
+        for dirpath, _, filenames in os.walk(label_dir):
+            for name in sorted(filenames):
+                if os.path.splitext(name)[1].lower() in extensions:
+                    items.append((os.path.join(dirpath, name), label))
+    return items
+
+
+def scan_media(root, extensions=IMAGE_EXTENSIONS | VIDEO_EXTENSIONS):
+    """
+    Every image/video under root as (path, label); the label follows the
+    same top-level rule as scan_labelled_dataset, None for unlabelled files
+    """
+    items = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1].lower() in extensions:
+                path = os.path.join(dirpath, name)
+                items.append((path, top_level_label(root, path)))
+    return items
+
+
+def _file_signature(path):
+    info = os.stat(path)
+    return info.st_size, int(info.st_mtime)
+
+
+# ----------------------------------------------------------------------
+# Worker side: one face detector per process
+# ----------------------------------------------------------------------
+# Crop settings when the caller passes none; the detector passes its model_configs['image'] values
+DEFAULT_CROP_CONFIG = {
+    'input_size': DEFAULT_INPUT_SIZE,
+    'face_scale': DEFAULT_FACE_SCALE,
+    'decode_min_side': DEFAULT_MIN_SIDE
+}
+
+_worker_face_detector = None
+_worker_crop_config = DEFAULT_CROP_CONFIG
+_worker_video_frames = 10
+
+
+def _init_worker(video_frames, crop_config):
+    # Only OpenCV and dlib: workers never import TensorFlow
+    global _worker_face_detector, _worker_crop_config, _worker_video_frames
+    cv2.setNumThreads(1)  # Parallelism comes from the pool
+    _worker_face_detector = load_face_detector()
+    _worker_crop_config = crop_config
+    _worker_video_frames = video_frames
+
+
+def _crop(img):
+    """FaceForensics-style crop (face_crop.crop_face with the configured face_scale), resized to the model input"""
+    face = crop_face(_worker_face_detector, img, scale=_worker_crop_config['face_scale'])
+    # Same resize as preprocess_image_array so cached crops match live inference
+    return cv2.resize(cv2.cvtColor(face, cv2.COLOR_BGR2RGB), tuple(_worker_crop_config['input_size']))
+
+
+def _video_crops(path):
+    """Crops of frames sampled evenly across the video"""
+    cap = cv2.VideoCapture(path)
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total <= 0:
+            return []
+        positions = np.unique(np.linspace(0, total - 1, min(_worker_video_frames, total)).astype(int))
+        crops = []
+        for position in positions:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(position))
+            ret, frame = cap.read()
+            if ret:
+                crops.append((f"{path}#{position}", _crop(frame)))
+        return crops
+    finally:
+        cap.release()
+
+
+def _crop_source(item):
+    """Decode and face-crop one source file; returns (path, label, [(key, crop)])"""
+    path, label = item
+    try:
+        if os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS:
+            return path, label, _video_crops(path)
+        img = decode_image(path, _worker_crop_config['decode_min_side'])
+        if img is None:
+            return path, label, []
+        return path, label, [(path, _crop(img))]
+    except Exception as e:
+        print(f"❌ Error cropping {path}: {e}")
+        return path, label, []
+
+
+# ----------------------------------------------------------------------
+# Cache
+# ----------------------------------------------------------------------
+class CropCache:
+    """Sharded face-crop cache; see the module docstring for the layout"""
+
+    def __init__(self, cache_dir, shard_size=1024):
+        self.cache_dir = cache_dir
+        self.shard_size = shard_size
+        os.makedirs(cache_dir, exist_ok=True)
+        self.entries = {}  # key -> {'source', 'label', 'shard', 'index'}
+        self.sources = {}  # source path -> {'size', 'mtime', 'label', 'keys'}
+        self._shard_counter = 0
+        self._load_manifest()
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.cache_dir, MANIFEST_NAME)
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line from an interrupted run
+                if not os.path.exists(os.path.join(self.cache_dir, record['shard'])):
+                    continue
+                self._shard_counter = max(self._shard_counter, record['shard_id'] + 1)
+                self._register(record)
+
+    def _register(self, record):
+        # A source re-cropped into a later shard replaces all of its earlier crops
+        touched = set()
+        for index, item in enumerate(record['items']):
+            # Manifests written before video support carry 'path' (one crop per image, keyed by path)
+            source = item.get('source', item.get('path'))
+            key = item.get('key', source)
+            if source not in touched:
+                touched.add(source)
+                for old_key in self.sources.get(source, {}).get('keys', ()):
+                    self.entries.pop(old_key, None)
+                self.sources[source] = {'size': item['size'], 'mtime': item['mtime'], 'label': item['label'], 'keys': []}
+            self.entries[key] = {'source': source, 'label': item['label'], 'shard': record['shard'], 'index': index}
+            self.sources[source]['keys'].append(key)
+
+    def is_current(self, path, label=None):
+        """True when the source file is cached and unchanged since (and, if given, cached with label)"""
+        cached = self.sources.get(path)
+        if cached is None or (label is not None and cached['label'] != label):
+            return False
+        try:
+            size, mtime = _file_signature(path)
+        except OSError:
+            return False
+        return cached['size'] == size and cached['mtime'] == mtime
+
+    def _write_shard(self, items, crops):
+        shard_id = self._shard_counter
+        self._shard_counter += 1
+        name = f"shard_{shard_id:05d}.npy"
+        tmp_path = os.path.join(self.cache_dir, name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.stack(crops))
+        os.replace(tmp_path, os.path.join(self.cache_dir, name))
+
+        # The manifest line is appended only once the shard is complete
+        record = {'shard': name, 'shard_id': shard_id, 'items': items}
+        with open(self.manifest_path, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+        self._register(record)
+
+    def build(self, items, workers=None, video_frames=10, progress=True, crop_config=None):
+        """
+        Face-crop every (path, label) source not already cached, in a process pool.
+        A source's crops always land in one shard, so a resumed run never sees
+        half of a video. Workers load only OpenCV and dlib (see face_crop).
+
+        Args:
+            crop_config: input_size, face_scale and decode_min_side overrides
+                of DEFAULT_CROP_CONFIG (the detector passes its own)
+
+        Returns:
+            dict with 'cached', 'processed', 'failed', 'crops' counts and 'seconds'
+        """
+        todo = [item for item in items if not self.is_current(item[0], item[1])]
+        summary = {'cached': len(items) - len(todo), 'processed': 0, 'failed': 0, 'crops': 0, 'seconds': 0.0}
+        if not todo:
+            return summary
+
+        workers = workers or os.cpu_count() or 1
+        start = time.perf_counter()
+        pending_items, pending_crops = [], []
+        # Spawned workers so the pool never inherits TensorFlow state from the parent
+        context = multiprocessing.get_context('spawn')
+        crop_config = dict(DEFAULT_CROP_CONFIG, **(crop_config or {}))
+        with context.Pool(workers, initializer=_init_worker, initargs=(video_frames, crop_config)) as pool:
+            for path, label, crops in pool.imap_unordered(_crop_source, todo, chunksize=4):
+                if not crops:
+                    summary['failed'] += 1
+                    continue
+                size, mtime = _file_signature(path)
+                for key, crop in crops:
+                    pending_items.append({'key': key, 'source': path, 'label': label, 'size': size, 'mtime': mtime})
+                    pending_crops.append(crop)
+                summary['processed'] += 1
+                summary['crops'] += len(crops)
+                if len(pending_crops) >= self.shard_size:
+                    self._write_shard(pending_items, pending_crops)
+                    pending_items, pending_crops = [], []
+                    if progress:
+                        print(f"   💾 {summary['processed']}/{len(todo)} files cropped")
+        if pending_crops:
+            self._write_shard(pending_items, pending_crops)
+
+        summary['seconds'] = time.perf_counter() - start
+        return summary
+
+    def keys_for(self, sources):
+        """Crop keys of the given source files, in order"""
+        keys = []
+        for source in sources:
+            keys.extend(self.sources.get(source, {}).get('keys', ()))
+        return keys
+
+    def iter_batches(self, keys, batch_size=32):
+        """
+        Yield (keys, crops uint8 (B, H, W, 3), labels) for the cached
+        keys, reading each shard through a memmap in shard order
+        """
+        batch_keys, batch_crops, batch_labels = [], [], []
+        for shard, indices, labels, shard_keys in self._groups(keys):
+            crops = np.load(shard, mmap_mode='r')
+            for index, label, key in zip(indices, labels, shard_keys):
+                batch_keys.append(key)
+                batch_crops.append(crops[index])
+                batch_labels.append(label)
+                if len(batch_keys) == batch_size:
+                    yield batch_keys, np.stack(batch_crops), np.array(batch_labels)
+                    batch_keys, batch_crops, batch_labels = [], [], []
+        if batch_keys:
+            yield batch_keys, np.stack(batch_crops), np.array(batch_labels)
+
+    def _groups(self, keys):
+        by_shard = {}
+        for key in keys:
+            entry = self.entries.get(key)
+            if entry is not None:
+                by_shard.setdefault(entry['shard'], []).append((entry['index'], entry['label'], key))
+        groups = []
+        for shard, rows in sorted(by_shard.items()):
+            rows.sort()
+            groups.append((os.path.join(self.cache_dir, shard),
+                           [index for index, _, _ in rows],
+                           [label for _, label, _ in rows],
+                           [key for _, _, key in rows]))
+        return groups
+
+    def shard_groups(self, keys):
+        """
+        Group cached keys by shard: [(shard file, row indices, labels)],
+        rows in file order so shards are read sequentially
+        """
+        return [(shard, indices, labels) for shard, indices, labels, _ in self._groups(keys)]
+
+
+def normalize_crops(crops):
+    """uint8 RGB crops -> float32 in [-1, 1] (FaceForensics++ normalization)"""
+    return crops.astype(np.float32) / 127.5 - 1.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute FaceForensics-style face crops for a dataset")
+    parser.add_argument('dataset', help="Dataset root (label folders such as real/ and fake/ are optional)")
+    parser.add_argument('--cache-dir', default=None, help="Cache directory (default: <dataset>/.deepshield_cache)")
+    parser.add_argument('--workers', type=int, default=None, help="Crop processes (default: CPU count)")
+    parser.add_argument('--shard-size', type=int, default=1024, help="Crops per .npy shard")
+    parser.add_argument('--video-frames', type=int, default=10, help="Frames sampled per video")
+    parser.add_argument('--images-only', action='store_true', help="Skip video files")
+    args = parser.parse_args(argv)
+
+    extensions = IMAGE_EXTENSIONS if args.images_only else IMAGE_EXTENSIONS | VIDEO_EXTENSIONS
+    items = scan_media(args.dataset, extensions=extensions)
+    if not items:
+        print(f"❌ No images or videos found under {args.dataset}")
+        return 1
+
+    cache = CropCache(args.cache_dir or os.path.join(args.dataset, '.deepshield_cache'), shard_size=args.shard_size)
+    print(f"📂 {len(items)} files found, {sum(cache.is_current(path) for path, _ in items)} already cached")
+    summary = cache.build(items, workers=args.workers, video_frames=args.video_frames)
+
+    rate = summary['processed'] / summary['seconds'] if summary['seconds'] > 0 else 0.0
+    print(f"✅ {summary['processed']} files cropped ({summary['crops']} crops, {rate:.1f} files/sec), "
+          f"{summary['cached']} unchanged, {summary['failed']} failed")
+    print(f"📁 Cache: {cache.cache_dir} ({len(cache.entries)} crops)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
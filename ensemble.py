@@ -0,0 +1,214 @@
+"""
+Multi-backbone image ensemble.
+
+Each member wraps one classifier (Xception, EfficientNetB0, ResNet50, ...)
+together with its input size and normalization. An input is converted to
+RGB and resized once per distinct input size into a shared uint8 buffer;
+members only apply their normalization to that view. Required members run
+in the calling thread and optional ones on a bounded thread pool
+(TensorFlow releases the GIL inside predict), so a busy pool never delays
+the required score; scores are fused as a weighted mean.
+
+A latency budget keeps the ensemble responsive under load: optional
+members whose recent latency exceeds the budget, or that cannot start
+because every worker is busy, are skipped, and members still running when
+the budget expires are dropped from the fused score.
+"""
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import cv2
+import numpy as np
+
+from instrumentation import span
+
+# ImageNet channel means (BGR) subtracted by the Caffe-style ResNet50 preprocessing
+_CAFFE_MEAN_BGR = np.array([103.939, 116.779, 123.68], dtype=np.float32)
+
+
+def normalize(rgb, mode):
+    """
+    Model input from an RGB uint8 batch (N, H, W, 3)
+
+    Modes: 'xception' ([-1, 1], FaceForensics++ style), 'efficientnet'
+    (float [0, 255]; the model rescales internally) and 'caffe' (BGR minus
+    the ImageNet mean, as ResNet50 expects)
+    """
+    x = rgb.astype(np.float32)
+    if mode == 'xception':
+        return x / 127.5 - 1.0
+    if mode == 'efficientnet':
+        return x
+    if mode == 'caffe':
+        return x[..., ::-1] - _CAFFE_MEAN_BGR
+    raise ValueError(f"Unknown normalization: {mode}")
+
+
+def shared_views(images, sizes):
+    """
+    RGB uint8 batches of BGR images, resized once per distinct (width, height)
+
+    Returns:
+        {size: (N, height, width, 3) uint8 array}
+    """
+    rgb = [cv2.cvtColor(img, cv2.COLOR_BGR2RGB) for img in images]
+    views = {}
+    for size in set(sizes):
+        views[size] = np.stack([cv2.resize(img, size) for img in rgb])
+    return views
+
+
+class EnsembleMember:
+    """One backbone of the ensemble: a model plus how to feed it"""
+
+    def __init__(self, name, model, input_size=(299, 299), normalization='xception', weight=1.0, required=False):
+        self.name = name
+        self.model = model
+        self.input_size = input_size  # (width, height) as passed to cv2.resize
+        self.normalization = normalization
+        self.weight = weight
+        self.required = required  # Always awaited, whatever the latency budget
+        self.latency_ema = None
+
+    def predict(self, view):
+        """Scores (N,) for the shared uint8 view matching this member's input size"""
+        x = normalize(view, self.normalization)
+        with span('inference'):
+            return np.asarray(self.model.predict(x)).reshape(-1)
+
+    def record_latency(self, seconds, alpha=0.2):
+        """Update the latency EMA; callers hold the ensemble lock"""
+        self.latency_ema = seconds if self.latency_ema is None else alpha * seconds + (1 - alpha) * self.latency_ema
+
+
+class ModelEnsemble:
+    def __init__(self, max_workers=3, latency_budget_ms=None):
+        """
+        Args:
+            max_workers: Optional members scored at the same time (across all requests)
+            latency_budget_ms: Wall-time budget per request; None waits for every member
+        """
+        self.members = []
+        self.latency_budget_ms = latency_budget_ms
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="deepshield-ensemble")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {}
+
+    def register(self, member):
+        self.members.append(member)
+        with self._lock:
+            self._stats[member.name] = {'runs': 0, 'skipped': 0, 'dropped': 0, 'failed': 0}
+        return member
+
+    def _schedule(self, member):
+        """Whether an optional member should run for this request; claims a worker when it does"""
+        budget = self.latency_budget_ms
+        with self._lock:
+            if budget is not None:
+                if member.latency_ema is not None and member.latency_ema * 1000 > budget:
+                    return False
+                if self._in_flight >= self.max_workers:
+                    return False  # Every worker is busy: under load, optional members give way
+            self._in_flight += 1
+            return True
+
+    def _run(self, member, view, pooled=True):
+        start = time.perf_counter()
+        try:
+            return member.predict(view)
+        finally:
+            with self._lock:
+                member.record_latency(time.perf_counter() - start)
+                if pooled:
+                    self._in_flight -= 1
+
+    def predict(self, images):
+        """
+        Fused scores of a list of BGR images (face crops)
+
+        Returns:
+            (scores, members) where scores is an (N,) array of weighted mean
+            scores and members maps each member name to its (N,) scores, or
+            to 'skipped'/'dropped'/'failed'
+        """
+        if not self.members:
+            raise RuntimeError("Ensemble has no members")
+        with span('preprocess'):
+            views = shared_views(images, [member.input_size for member in self.members])
+
+        start = time.perf_counter()
+        futures = {}
+        outcome = {}
+        for member in self.members:
+            if member.required:
+                continue
+            if self._schedule(member):
+                # Copied context keeps the worker's spans attributed to this request
+                future = self._executor.submit(contextvars.copy_context().run, self._run, member, views[member.input_size])
+                futures[future] = member
+            else:
+                outcome[member.name] = 'skipped'
+
+        weighted = np.zeros(len(images), dtype=np.float64)
+        total_weight = 0.0
+
+        # Required members run here, never queued behind optional ones still holding workers
+        for member in self.members:
+            if not member.required:
+                continue
+            try:
+                scores = self._run(member, views[member.input_size], pooled=False)
+            except Exception as e:
+                print(f"❌ Ensemble member {member.name} failed: {e}")
+                outcome[member.name] = 'failed'
+                continue
+            outcome[member.name] = scores
+            weighted += member.weight * scores
+            total_weight += member.weight
+
+        if self.latency_budget_ms is None:
+            wait(futures)
+        else:
+            remaining = self.latency_budget_ms / 1000 - (time.perf_counter() - start)
+            wait(futures, timeout=max(remaining, 0))
+
+        for future, member in futures.items():
+            if not future.done():
+                outcome[member.name] = 'dropped'  # Still running; its latency is recorded when it finishes
+                continue
+            if future.exception() is not None:
+                print(f"❌ Ensemble member {member.name} failed: {future.exception()}")
+                outcome[member.name] = 'failed'
+                continue
+            scores = future.result()
+            outcome[member.name] = scores
+            weighted += member.weight * scores
+            total_weight += member.weight
+
+        with self._lock:
+            for name, value in outcome.items():
+                stats = self._stats[name]
+                if isinstance(value, str):
+                    stats[value] += 1
+                else:
+                    stats['runs'] += 1
+
+        if total_weight == 0:
+            raise RuntimeError("No ensemble member finished within the latency budget")
+        return weighted / total_weight, outcome
+
+    def report(self):
+        """Per-member run/skip/drop counts and recent latency"""
+        with self._lock:
+            return {
+                member.name: dict(self._stats[member.name],
+                                  latency_ms=round(member.latency_ema * 1000, 2) if member.latency_ema else None)
+                for member in self.members
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
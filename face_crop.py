@@ -0,0 +1,78 @@
+"""
+FaceForensics++ style face cropping, without TensorFlow.
+
+The detector and the crop-cache workers share these helpers, so a spawned
+crop process only loads OpenCV and dlib.
+"""
+import cv2
+
+try:
+    import dlib
+    FACE_DETECTION_AVAILABLE = True
+except ImportError:
+    print("dlib not available. Face detection will be disabled.")
+    FACE_DETECTION_AVAILABLE = False
+
+# Model input (width, height) and face box scale shared by inference and the crop cache
+DEFAULT_INPUT_SIZE = (299, 299)
+DEFAULT_FACE_SCALE = 1.3
+
+
+def load_face_detector():
+    """dlib's frontal face detector, or None when dlib is unavailable"""
+    if not FACE_DETECTION_AVAILABLE:
+        return None
+    try:
+        detector = dlib.get_frontal_face_detector()
+        print("✅ Face detector loaded (dlib)")
+        return detector
+    except Exception as e:
+        print(f"❌ Error loading face detector: {e}")
+        return None
+
+
+def get_boundingbox(face, width, height, scale=DEFAULT_FACE_SCALE, minsize=None):
+    """
+    Generate bounding box for face detection (from FaceForensics++)
+    """
+    x1 = face.left()
+    y1 = face.top()
+    x2 = face.right()
+    y2 = face.bottom()
+    size_bb = int(max(x2 - x1, y2 - y1) * scale)
+    if minsize:
+        if size_bb < minsize:
+            size_bb = minsize
+    center_x, center_y = (x1 + x2) // 2, (y1 + y2) // 2
+
+    # Check for out of bounds
+    x1 = max(int(center_x - size_bb // 2), 0)
+    y1 = max(int(center_y - size_bb // 2), 0)
+    size_bb = min(width - x1, size_bb)
+    size_bb = min(height - y1, size_bb)
+
+    return x1, y1, size_bb
+
+
+def crop_face(face_detector, image, scale=DEFAULT_FACE_SCALE, keep_image=True):
+    """
+    Detect a face and crop it with proper scaling
+
+    Args:
+        face_detector: dlib detector, or None
+        keep_image: Return the whole image when no face is found (None when False)
+    """
+    if face_detector is None:
+        return image if keep_image else None  # Return original if no face detector
+
+    # Convert to grayscale for face detection
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    faces = face_detector(gray, 1)
+
+    if len(faces) > 0:
+        # Take the biggest face
+        face = faces[0]
+        height, width = image.shape[:2]
+        x, y, size = get_boundingbox(face, width, height, scale=scale)
+        return image[y:y+size, x:x+size]
+    return image if keep_image else None  # Return original if no face detected
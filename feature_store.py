@@ -0,0 +1,155 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+
+import numpy as np
+
+
+def content_key(x, namespace=''):
+    """
+    Content hash of a preprocessed input tensor. The namespace (backbone
+    weights, preprocessing settings) is part of the key so embeddings from
+    different backbones never collide.
+    """
+    x = np.ascontiguousarray(x)
+    digest = hashlib.sha1(namespace.encode())
+    digest.update(str((x.shape, x.dtype.str)).encode())
+    digest.update(x.data)
+    return digest.hexdigest()
+
+
+class FeatureStore:
+    """
+    On-disk store of fixed-size embeddings (e.g. 2048-d Xception pooled
+    features) keyed by content hash.
+
+    Vectors live in a flat float32 file mapped with np.memmap and grown by
+    doubling; a SQLite index maps keys to rows and carries optional labels
+    for fine-tuning. Row allocation happens inside an IMMEDIATE transaction,
+    so several processes can append to the same store.
+    """
+
+    def __init__(self, directory, dim=2048, initial_capacity=1024):
+        self.directory = directory
+        self.dim = dim
+        os.makedirs(directory, exist_ok=True)
+
+        self._vectors_path = os.path.join(directory, 'embeddings.f32')
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._capacity = 0
+
+        self._db = sqlite3.connect(os.path.join(directory, 'index.sqlite3'),
+                                   check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                row INTEGER NOT NULL UNIQUE,
+                label INTEGER
+            );
+            """
+        )
+
+        stored = self._db.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        if stored is None:
+            self._db.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('dim', ?)", (json.dumps(dim),))
+        elif json.loads(stored[0]) != dim:
+            raise ValueError(f"Feature store at {directory} holds {json.loads(stored[0])}-d vectors, not {dim}-d")
+
+        if not os.path.exists(self._vectors_path):
+            with open(self._vectors_path, 'ab'):
+                pass
+        self._ensure_capacity(initial_capacity)
+
+    def _file_rows(self):
+        return os.path.getsize(self._vectors_path) // (self.dim * 4)
+
+    def _ensure_capacity(self, rows):
+        """Grow the vector file to hold at least `rows` rows and (re)map it"""
+        file_rows = self._file_rows()
+        if file_rows < rows:
+            new_rows = max(rows, 2 * file_rows)
+            with open(self._vectors_path, 'r+b') as f:
+                f.truncate(new_rows * self.dim * 4)
+            file_rows = new_rows
+        if self._vectors is None or self._capacity < file_rows:
+            # Other processes may have grown the file since it was last mapped
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode='r+', shape=(file_rows, self.dim))
+            self._capacity = file_rows
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM embeddings WHERE key = ?", (key,)).fetchone() is not None
+
+    def get(self, key):
+        """Stored vector for key (a copy), or None"""
+        vectors, _ = self.get_many([key])
+        return vectors[0]
+
+    def get_many(self, keys):
+        """Returns ([vector or None per key], [indices of missing keys])"""
+        with self._lock:
+            rows = {}
+            for key in keys:
+                found = self._db.execute("SELECT row FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if found is not None:
+                    rows[key] = found[0]
+            if rows:
+                self._ensure_capacity(max(rows.values()) + 1)
+            vectors = [np.array(self._vectors[rows[key]]) if key in rows else None for key in keys]
+        return vectors, [i for i, vector in enumerate(vectors) if vector is None]
+
+    def put(self, key, vector, label=None):
+        self.put_many([key], np.asarray(vector)[None, :], labels=None if label is None else [label])
+
+    def put_many(self, keys, vectors, labels=None):
+        """Store vectors (N, dim); existing keys keep their vector and only update a given label"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(keys), self.dim)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                next_row = self._db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM embeddings").fetchone()[0]
+                for i, key in enumerate(keys):
+                    label = None if labels is None else labels[i]
+                    existing = self._db.execute("SELECT row FROM embeddings WHERE key = ?", (key,)).fetchone()
+                    if existing is not None:
+                        if label is not None:
+                            self._db.execute("UPDATE embeddings SET label = ? WHERE key = ?", (int(label), key))
+                        continue
+                    self._ensure_capacity(next_row + 1)
+                    self._vectors[next_row] = vectors[i]
+                    self._db.execute("INSERT INTO embeddings (key, row, label) VALUES (?, ?, ?)",
+                                     (key, next_row, None if label is None else int(label)))
+                    next_row += 1
+                self._vectors.flush()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def labelled(self):
+        """All labelled embeddings as (keys, vectors (N, dim), labels (N,)) for head training/evaluation"""
+        with self._lock:
+            rows = self._db.execute("SELECT key, row, label FROM embeddings WHERE label IS NOT NULL ORDER BY row").fetchall()
+            if not rows:
+                return [], np.zeros((0, self.dim), dtype=np.float32), np.zeros((0,), dtype=np.int64)
+            self._ensure_capacity(rows[-1][1] + 1)
+            vectors = np.array(self._vectors[[row for _, row, _ in rows]])
+        return [key for key, _, _ in rows], vectors, np.array([label for _, _, label in rows], dtype=np.int64)
+
+    def close(self):
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._vectors = None
+            self._db.close()
@@ -0,0 +1,44 @@
+"""
+Production serving config: gunicorn -c gunicorn.conf.py app:app
+
+The master spawns a single inference process that loads the models once;
+web workers attach to it over a Unix socket and hand tensors over through
+shared memory, so adding workers does not add model copies.
+"""
+import os
+import secrets
+
+from inference_server import start_inference_process
+
+bind = os.getenv('DEEPSHIELD_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('DEEPSHIELD_WEB_WORKERS', '4'))
+# Threaded workers keep WebSocket/SSE connections from pinning a whole process
+worker_class = 'gthread'
+threads = int(os.getenv('DEEPSHIELD_WEB_THREADS', '8'))
+timeout = 120
+
+_inference_process = None
+
+
+def on_starting(server):
+    global _inference_process
+    socket_path = os.environ.setdefault('DEEPSHIELD_INFERENCE_SOCKET', '/tmp/deepshield-inference.sock')
+    authkey = os.environ.setdefault('DEEPSHIELD_INFERENCE_AUTHKEY', secrets.token_hex(16))
+    server.log.info("Starting DeepShield inference process on %s", socket_path)
+    ensemble_weights = {name: os.environ[variable]
+                        for name, variable in (('efficientnet_b0', 'DEEPSHIELD_ENSEMBLE_EFFICIENTNET'),
+                                               ('resnet50', 'DEEPSHIELD_ENSEMBLE_RESNET'))
+                        if os.getenv(variable)}
+    _inference_process = start_inference_process(socket_path, authkey,
+                                                  model_path=os.getenv('DEEPSHIELD_MODEL_PATH'),
+                                                  audio_model_path=os.getenv('DEEPSHIELD_AUDIO_MODEL_PATH'),
+                                                  cheap_model_path=os.getenv('DEEPSHIELD_CASCADE_MODEL'),
+                                                  ensemble_weights=ensemble_weights,
+                                                  max_batch=int(os.getenv('DEEPSHIELD_INFERENCE_MAX_BATCH', '32')),
+                                                  batch_wait_ms=float(os.getenv('DEEPSHIELD_INFERENCE_BATCH_WAIT_MS', '2')))
+
+
+def on_exit(server):
+    if _inference_process is not None and _inference_process.is_alive():
+        _inference_process.terminate()
+        _inference_process.join(timeout=10)
@@ -0,0 +1,307 @@
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+from datetime import datetime
+
+# Rolling windows reported by stats(), in seconds
+ROLLING_WINDOWS = {
+    'last_hour': 3600,
+    'last_24h': 86400
+}
+
+
+class DetectionHistory:
+    """
+    Append-only SQLite history of detection results with incrementally
+    maintained aggregates.
+
+    record() never blocks the caller: results are queued and a background
+    writer inserts them in batches, updating in the same transaction the
+    per-(type, source) counters, per-minute and per-day buckets and a fixed
+    size ring buffer of recent detections. stats() only reads those small
+    tables, so its cost does not grow with the history. Several processes
+    (gunicorn workers, the Telegram bot) can share one database file.
+    """
+
+    def __init__(self, db_path, recent_size=50, batch_size=200, flush_interval=1.0,
+                 max_pending=10000, cache_ttl=2.0, daily_days=90):
+        self.db_path = db_path
+        self.recent_size = recent_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.cache_ttl = cache_ttl
+        self.daily_days = daily_days
+
+        self.dropped = 0
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._stop = threading.Event()
+        self._db_lock = threading.Lock()
+        self._cache = None
+        self._cache_time = 0.0
+        self._last_prune = 0.0
+
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+
+        self._writer = threading.Thread(target=self._writer_loop, name="deepshield-history-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _create_tables(self):
+        with self._db_lock:
+            self._db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS detections (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ts REAL NOT NULL,
+                    type TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    is_deepfake INTEGER NOT NULL,
+                    confidence REAL,
+                    raw_score REAL,
+                    model_used TEXT,
+                    processing_time REAL
+                );
+                CREATE TABLE IF NOT EXISTS aggregates (
+                    type TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    deepfakes INTEGER NOT NULL DEFAULT 0,
+                    confidence_sum REAL NOT NULL DEFAULT 0,
+                    processing_time_sum REAL NOT NULL DEFAULT 0,
+                    processing_time_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (type, source)
+                );
+                CREATE TABLE IF NOT EXISTS minute_buckets (
+                    minute INTEGER PRIMARY KEY,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    deepfakes INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS daily_buckets (
+                    day TEXT PRIMARY KEY,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    deepfakes INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS recent (
+                    slot INTEGER PRIMARY KEY,
+                    event_id INTEGER NOT NULL,
+                    ts REAL NOT NULL,
+                    type TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    is_deepfake INTEGER NOT NULL,
+                    confidence REAL,
+                    model_used TEXT
+                );
+                """
+            )
+            self._db.commit()
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+    def record(self, result, source='web', processing_time=None):
+        """
+        Queue a detect_* result for storage without blocking the caller
+
+        Args:
+            result: Dict returned by AccurateDeepfakeDetector.detect_* (None is ignored)
+            source: Where the request came from ('web', 'telegram', ...)
+            processing_time: Optional wall time of the analysis in seconds
+        """
+        if not result or 'result' not in result:
+            return False
+
+        prediction = result['result']
+        event = (
+            time.time(),
+            result.get('type', 'unknown'),
+            source,
+            1 if prediction.get('is_deepfake') else 0,
+            float(prediction.get('confidence', 0.0)),
+            float(prediction.get('raw_score', 0.0)),
+            prediction.get('model_used'),
+            float(processing_time) if processing_time is not None else None
+        )
+        try:
+            self._pending.put_nowait(event)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _writer_loop(self):
+        while not self._stop.is_set() or not self._pending.empty():
+            batch = []
+            try:
+                batch.append(self._pending.get(timeout=self.flush_interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self._pending.get_nowait())
+            except queue.Empty:
+                pass
+
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    print(f"❌ Error writing detection history: {e}")
+                finally:
+                    # Only after the commit, so flush() waits for the batch in flight too
+                    for _ in batch:
+                        self._pending.task_done()
+
+    def _write_batch(self, batch):
+        with self._db_lock:
+            cursor = self._db.cursor()
+            for ts, kind, source, is_deepfake, confidence, raw_score, model_used, processing_time in batch:
+                cursor.execute(
+                    "INSERT INTO detections (ts, type, source, is_deepfake, confidence, raw_score, "
+                    "model_used, processing_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (ts, kind, source, is_deepfake, confidence, raw_score, model_used, processing_time)
+                )
+                event_id = cursor.lastrowid
+
+                cursor.execute(
+                    "INSERT INTO aggregates (type, source, total, deepfakes, confidence_sum, "
+                    "processing_time_sum, processing_time_count) VALUES (?, ?, 1, ?, ?, ?, ?) "
+                    "ON CONFLICT(type, source) DO UPDATE SET total = total + 1, "
+                    "deepfakes = deepfakes + excluded.deepfakes, "
+                    "confidence_sum = confidence_sum + excluded.confidence_sum, "
+                    "processing_time_sum = processing_time_sum + excluded.processing_time_sum, "
+                    "processing_time_count = processing_time_count + excluded.processing_time_count",
+                    (kind, source, is_deepfake, confidence, processing_time or 0.0,
+                     1 if processing_time is not None else 0)
+                )
+                cursor.execute(
+                    "INSERT INTO minute_buckets (minute, total, deepfakes) VALUES (?, 1, ?) "
+                    "ON CONFLICT(minute) DO UPDATE SET total = total + 1, deepfakes = deepfakes + excluded.deepfakes",
+                    (int(ts // 60), is_deepfake)
+                )
+                cursor.execute(
+                    "INSERT INTO daily_buckets (day, total, deepfakes) VALUES (?, 1, ?) "
+                    "ON CONFLICT(day) DO UPDATE SET total = total + 1, deepfakes = deepfakes + excluded.deepfakes",
+                    (datetime.fromtimestamp(ts).strftime('%Y-%m-%d'), is_deepfake)
+                )
+                # Fixed-size ring buffer: the event id picks the slot it overwrites
+                cursor.execute(
+                    "INSERT OR REPLACE INTO recent (slot, event_id, ts, type, source, is_deepfake, confidence, "
+                    "model_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (event_id % self.recent_size, event_id, ts, kind, source, is_deepfake, confidence, model_used)
+                )
+
+            now = time.time()
+            if now - self._last_prune > 600:
+                # Minute buckets only feed the rolling windows
+                cursor.execute("DELETE FROM minute_buckets WHERE minute < ?",
+                               (int((now - max(ROLLING_WINDOWS.values())) // 60),))
+                self._last_prune = now
+
+            self._db.commit()
+
+    def flush(self, timeout=5.0):
+        """
+        Wait until every queued result has been committed (mainly for
+        tests/benchmarks); queue.join() with a deadline. Returns False on timeout.
+        """
+        deadline = time.time() + timeout
+        with self._pending.all_tasks_done:
+            while self._pending.unfinished_tasks:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._pending.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._writer.join(timeout=10)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+    def stats(self):
+        """
+        Current statistics, served from the aggregate tables (cached for
+        cache_ttl seconds). Each call gets its own top-level dict, so callers
+        may add keys without touching the cache.
+        """
+        now = time.time()
+        if self._cache is not None and now - self._cache_time < self.cache_ttl:
+            return dict(self._cache)
+
+        with self._db_lock:
+            aggregates = self._db.execute(
+                "SELECT type, source, total, deepfakes, confidence_sum, processing_time_sum, "
+                "processing_time_count FROM aggregates"
+            ).fetchall()
+            minutes = self._db.execute(
+                "SELECT minute, total, deepfakes FROM minute_buckets WHERE minute >= ?",
+                (int((now - max(ROLLING_WINDOWS.values())) // 60),)
+            ).fetchall()
+            daily = self._db.execute(
+                "SELECT day, total, deepfakes FROM daily_buckets ORDER BY day DESC LIMIT ?",
+                (self.daily_days,)
+            ).fetchall()
+            recent = self._db.execute(
+                "SELECT ts, type, source, is_deepfake, confidence, model_used FROM recent ORDER BY event_id DESC"
+            ).fetchall()
+
+        total = deepfakes = 0
+        confidence_sum = processing_time_sum = 0.0
+        processing_time_count = 0
+        by_type, by_source = {}, {}
+        for kind, source, t, d, c_sum, p_sum, p_count in aggregates:
+            total += t
+            deepfakes += d
+            confidence_sum += c_sum
+            processing_time_sum += p_sum
+            processing_time_count += p_count
+            for key, bucket in ((kind, by_type), (source, by_source)):
+                entry = bucket.setdefault(key, {'total': 0, 'deepfakes': 0})
+                entry['total'] += t
+                entry['deepfakes'] += d
+
+        windows = {}
+        for name, seconds in ROLLING_WINDOWS.items():
+            start = int((now - seconds) // 60)
+            w_total = sum(t for minute, t, d in minutes if minute >= start)
+            w_deepfakes = sum(d for minute, t, d in minutes if minute >= start)
+            windows[name] = {
+                'total': w_total,
+                'deepfakes': w_deepfakes,
+                'deepfake_rate': round(w_deepfakes / w_total * 100, 2) if w_total else 0.0
+            }
+
+        stats = {
+            'total_analyses': total,
+            'deepfakes_detected': deepfakes,
+            'deepfake_rate': round(deepfakes / total * 100, 2) if total else 0.0,
+            'accuracy_rate': None,  # Needs ground truth, which live traffic lacks; see evaluate_model()
+            'average_confidence': round(confidence_sum / total, 2) if total else 0.0,
+            'average_processing_time': round(processing_time_sum / processing_time_count, 3) if processing_time_count else 0.0,
+            'by_type': by_type,
+            'by_source': by_source,
+            'windows': windows,
+            'daily': [{'date': day, 'total': t, 'deepfakes': d} for day, t, d in reversed(daily)],
+            'recent_detections': [
+                {
+                    'type': kind,
+                    'source': source,
+                    'is_deepfake': bool(is_deepfake),
+                    'confidence': confidence,
+                    'model_used': model_used,
+                    'timestamp': datetime.fromtimestamp(ts).isoformat(timespec='seconds')
+                }
+                for ts, kind, source, is_deepfake, confidence, model_used in recent
+            ],
+            'pending_writes': self._pending.qsize(),
+            'dropped_writes': self.dropped
+        }
+
+        self._cache, self._cache_time = stats, now
+        return dict(stats)
@@ -0,0 +1,82 @@
+import cv2
+import numpy as np
+from PIL import Image, ImageSequence
+
+# Short side decoded images are reduced towards. A face spanning a third of the
+# frame still yields a crop above the 299x299 model input at this size.
+DEFAULT_MIN_SIDE = 1024
+
+# JPEG decoders scale by 1/2, 1/4 or 1/8 in the DCT domain, so reduced decodes
+# cost time and memory in proportion to the output size
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2)
+)
+
+
+def image_size(path):
+    """(width, height) read from the file header only, or None"""
+    try:
+        with Image.open(path) as img:
+            return img.size
+    except Exception:
+        return None
+
+
+def reduction_factor(width, height, min_side):
+    """Largest decoder reduction (1, 2, 4 or 8) that keeps the short side >= min_side"""
+    short_side = min(width, height)
+    for factor, _ in _REDUCED_FLAGS:
+        if short_side // factor >= min_side:
+            return factor
+    return 1
+
+
+def decode_image(path, min_side=DEFAULT_MIN_SIDE):
+    """
+    Decode an image as BGR at the smallest decoder scale whose short side
+    still covers min_side (full resolution when min_side is falsy or the
+    image is already small). Returns None when the file cannot be read.
+    """
+    if min_side:
+        size = image_size(path)
+        if size is not None:
+            factor = reduction_factor(size[0], size[1], min_side)
+            if factor > 1:
+                img = cv2.imread(path, dict(_REDUCED_FLAGS)[factor])
+                if img is not None:
+                    return img
+    img = cv2.imread(path)
+    if img is None:
+        img = _decode_pil(path)  # GIFs and other formats OpenCV's imread does not handle
+    return img
+
+
+def _decode_pil(path):
+    """First frame of an image decoded with PIL, as BGR, or None"""
+    try:
+        with Image.open(path) as img:
+            return cv2.cvtColor(np.asarray(img.convert('RGB')), cv2.COLOR_RGB2BGR)
+    except Exception:
+        return None
+
+
+def is_animated(path):
+    """Whether path is a multi-frame image (animated GIF, WebP or PNG)"""
+    try:
+        with Image.open(path) as img:
+            return bool(getattr(img, 'is_animated', False))
+    except Exception:
+        return False
+
+
+def iter_animation_frames(path):
+    """
+    Lazily decode the frames of an animated image as BGR arrays. PIL seeks
+    frame by frame, so only the current frame (plus the palette/disposal
+    state PIL keeps) is in memory, however long the animation.
+    """
+    with Image.open(path) as img:
+        for frame in ImageSequence.Iterator(img):
+            yield cv2.cvtColor(np.asarray(frame.convert('RGB')), cv2.COLOR_RGB2BGR)
@@ -0,0 +1,48 @@
+import cv2
+import numpy as np
+
+# Longest side of the proxy the statistics are computed on
+DEFAULT_PROXY_SIDE = 512
+
+
+def _proxy(img, max_side):
+    height, width = img.shape[:2]
+    scale = max_side / max(height, width)
+    if scale >= 1:
+        return img
+    return cv2.resize(img, (max(int(width * scale), 1), max(int(height * scale), 1)), interpolation=cv2.INTER_AREA)
+
+
+def compute_image_stats(img, max_side=DEFAULT_PROXY_SIDE):
+    """
+    Cheap global statistics of a decoded BGR image, used by the heuristic
+    fallback and the bot's enhanced analysis. Everything is computed on one
+    proxy whose longest side is at most max_side, so the cost is bounded
+    regardless of the source resolution.
+
+    Returns:
+        dict with brightness and contrast (gray mean/std, 0-255), saturation
+        (HSV S mean, 0-255), edge_density (Canny edge pixel fraction) and
+        noise_level (Laplacian variance)
+    """
+    proxy = _proxy(img, max_side)
+    gray = cv2.cvtColor(proxy, cv2.COLOR_BGR2GRAY)
+
+    mean, std = cv2.meanStdDev(gray)
+
+    # HSV saturation without the full HSV conversion: (max - min) / max per pixel
+    channel_max = proxy.max(axis=2).astype(np.float32)
+    channel_min = proxy.min(axis=2).astype(np.float32)
+    saturation = np.divide((channel_max - channel_min) * 255.0, channel_max,
+                           out=np.zeros_like(channel_max), where=channel_max > 0)
+
+    edges = cv2.Canny(gray, 50, 150)
+    _, laplacian_std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_64F))
+
+    return {
+        'brightness': float(mean[0][0]),
+        'contrast': float(std[0][0]),
+        'saturation': float(saturation.mean()),
+        'edge_density': float(cv2.countNonZero(edges) / edges.size),
+        'noise_level': float(laplacian_std[0][0] ** 2)
+    }
@@ -0,0 +1,279 @@
+import os
+import time
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import Future
+from multiprocessing import shared_memory, resource_tracker
+from multiprocessing.connection import Listener, Client
+
+import numpy as np
+
+# Detector models served by the inference process; the image backbone/head
+# (feature store) and optional ensemble members ('ensemble_<name>') are added when loaded
+MODEL_NAMES = ('image', 'video', 'audio', 'cascade_image')
+
+# Samples fused into one predict call, and how long a batch waits for more requests
+DEFAULT_MAX_BATCH = 32
+DEFAULT_BATCH_WAIT_MS = 2.0
+
+
+class InferenceClient:
+    """
+    Client side of the local inference process. Tensors are written into a
+    shared-memory segment owned by the calling thread; only the segment name,
+    shape and dtype travel over the socket, so the server reads them without
+    pickling or copying.
+    """
+
+    def __init__(self, address, authkey):
+        self.address = address
+        self.authkey = authkey if isinstance(authkey, bytes) else authkey.encode()
+        self._local = threading.local()
+
+    def _state(self):
+        """Per-thread connection and buffer, re-created after a fork"""
+        state = self._local
+        if getattr(state, 'pid', None) != os.getpid():
+            state.pid = os.getpid()
+            state.conn = None
+            state.shm = None
+        if state.conn is None:
+            state.conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+        return state
+
+    def _buffer(self, state, nbytes):
+        if state.shm is None or state.shm.size < nbytes:
+            size = max(nbytes, 2 * state.shm.size if state.shm is not None else nbytes)
+            if state.shm is not None:
+                state.shm.close()
+                state.shm.unlink()
+            state.shm = shared_memory.SharedMemory(create=True, size=size)
+        return state.shm
+
+    def _request(self, message):
+        state = self._state()
+        try:
+            state.conn.send(message)
+            status, payload = state.conn.recv()
+        except (EOFError, OSError):
+            state.conn = None
+            raise
+        if status == 'error':
+            raise RuntimeError(f"Inference server error: {payload}")
+        return payload
+
+    def available_models(self):
+        """Names of the models the server has loaded"""
+        return self._request(('models',))
+
+    def predict(self, model_name, x):
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        state = self._state()
+        shm = self._buffer(state, x.nbytes)
+        np.ndarray(x.shape, dtype=np.float32, buffer=shm.buf)[...] = x
+        return self._request(('predict', model_name, shm.name, x.shape, 'float32'))
+
+
+class RemoteModel:
+    """Keras-model stand-in whose predict() runs in the inference process"""
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def predict(self, x, **kwargs):
+        return self.client.predict(self.name, x)
+
+
+def _served_models(detector):
+    """{name: model} of everything the inference process hosts"""
+    models = {name: detector.models.get(name) for name in MODEL_NAMES}
+    models['image_backbone'] = detector.image_backbone
+    models['image_head'] = detector.image_head
+    if detector.ensemble is not None:
+        for member in detector.ensemble.members:
+            if not member.required:
+                models[f"ensemble_{member.name}"] = member.model
+    return {name: model for name, model in models.items() if model is not None}
+
+
+class ModelBatcher:
+    """
+    Fuses concurrent predict requests for one model into batched calls.
+
+    Connection threads enqueue their input and wait; a collector thread
+    takes the first pending request, gathers whatever else arrives within
+    batch_wait_ms (up to max_batch samples), runs one predict and hands each
+    caller its rows. Each model has its own collector, so different models
+    predict concurrently while one model never runs two predicts at once.
+    """
+
+    def __init__(self, name, model, max_batch=DEFAULT_MAX_BATCH, batch_wait_ms=DEFAULT_BATCH_WAIT_MS):
+        self.name = name
+        self.model = model
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait_ms / 1000
+        self.batches = 0
+        self.requests = 0
+        self._pending = queue.Queue()
+        threading.Thread(target=self._collect, name=f"deepshield-batch-{name}", daemon=True).start()
+
+    def predict(self, x):
+        """Predictions for x, computed in a batch shared with other callers"""
+        future = Future()
+        self._pending.put((x, future))
+        return future.result()
+
+    def _collect(self):
+        while True:
+            batch = [self._pending.get()]
+            samples = len(batch[0][0])
+            deadline = time.perf_counter() + self.batch_wait
+            while samples < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._pending.get(timeout=remaining) if remaining > 0 else self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                samples += len(item[0])
+
+            # Inputs of one model normally share a shape; anything else runs on its own
+            groups = {}
+            for x, future in batch:
+                groups.setdefault((x.shape[1:], x.dtype.str), []).append((x, future))
+            for group in groups.values():
+                self._run(group)
+
+    def _run(self, group):
+        try:
+            # A lone request is predicted straight from its shared-memory view, without a copy
+            x = group[0][0] if len(group) == 1 else np.concatenate([x for x, _ in group])
+            predictions = np.asarray(self.model.predict(x, verbose=0))
+        except Exception as e:
+            for _, future in group:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.requests += len(group)
+        start = 0
+        for x, future in group:
+            future.set_result(predictions[start:start + len(x)])
+            start += len(x)
+
+
+def _serve_connection(batchers, conn):
+    """Handle requests from one client thread until it disconnects"""
+    attached = {}
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+
+            try:
+                if message[0] == 'models':
+                    conn.send(('ok', list(batchers)))
+                    continue
+
+                _, model_name, shm_name, shape, dtype = message
+                batcher = batchers.get(model_name)
+                if batcher is None:
+                    conn.send(('error', f"Model '{model_name}' is not loaded"))
+                    continue
+
+                shm = attached.get(shm_name)
+                if shm is None:
+                    # The client grew its buffer; drop the stale mapping
+                    for old in attached.values():
+                        old.close()
+                    attached.clear()
+                    shm = shared_memory.SharedMemory(name=shm_name)
+                    # The client owns the segment; don't let our tracker unlink it on exit
+                    resource_tracker.unregister(shm._name, 'shared_memory')
+                    attached[shm_name] = shm
+
+                # The client blocks until the reply, so its buffer is stable while batched
+                x = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+                predictions = batcher.predict(x)
+                del x
+                conn.send(('ok', np.asarray(predictions)))
+
+            except Exception as e:
+                conn.send(('error', str(e)))
+    finally:
+        for shm in attached.values():
+            shm.close()
+        conn.close()
+
+
+def serve_inference(address, authkey, model_path=None, ready=None, audio_model_path=None, cheap_model_path=None,
+                    ensemble_weights=None, max_batch=DEFAULT_MAX_BATCH, batch_wait_ms=DEFAULT_BATCH_WAIT_MS):
+    """
+    Run the inference process: load the detector models once and answer
+    predict requests from web workers over a local Unix socket. Concurrent
+    requests for the same model are fused into batches (see ModelBatcher).
+
+    Args:
+        audio_model_path: Weights for the audio CNN
+        cheap_model_path: Trained EfficientNetB0 weights for the image cascade
+        ensemble_weights: {member name: weights path} of optional ensemble backbones
+        max_batch: Samples per fused predict call
+        batch_wait_ms: How long a batch waits for further requests
+    """
+    # Imported here so the parent (e.g. the gunicorn master) never loads TensorFlow
+    from accurate_deepfake_detector import AccurateDeepfakeDetector
+
+    detector = AccurateDeepfakeDetector(model_path=model_path, audio_model_path=audio_model_path)
+    if cheap_model_path:
+        detector.model_configs['cascade']['cheap_model_path'] = cheap_model_path
+        detector._cheap_image_model()
+    if ensemble_weights and detector.models.get('image'):
+        for name, weights in ensemble_weights.items():
+            detector.model_configs['ensemble']['members'][name]['weights'] = weights
+        detector._load_ensemble()
+    models = _served_models(detector)
+    batchers = {name: ModelBatcher(name, model, max_batch=max_batch, batch_wait_ms=batch_wait_ms)
+                for name, model in models.items()}
+    print(f"✅ Serving models: {', '.join(models)} (batches up to {max_batch}, {batch_wait_ms} ms wait)")
+
+    if os.path.exists(address):
+        os.unlink(address)
+    listener = Listener(address, family='AF_UNIX', authkey=authkey if isinstance(authkey, bytes) else authkey.encode())
+    print(f"✅ Inference server listening on {address}")
+    if ready is not None:
+        ready.set()
+
+    while True:
+        try:
+            conn = listener.accept()
+        except Exception as e:
+            print(f"❌ Inference server accept error: {e}")
+            continue
+        threading.Thread(target=_serve_connection, args=(batchers, conn), daemon=True).start()
+
+
+def start_inference_process(address, authkey, model_path=None, timeout=600, audio_model_path=None,
+                            cheap_model_path=None, ensemble_weights=None, max_batch=DEFAULT_MAX_BATCH,
+                            batch_wait_ms=DEFAULT_BATCH_WAIT_MS):
+    """Spawn the inference process and wait until its models are loaded"""
+    ctx = multiprocessing.get_context('spawn')
+    ready = ctx.Event()
+    process = ctx.Process(target=serve_inference, args=(address, authkey, model_path, ready),
+                          kwargs={'audio_model_path': audio_model_path, 'cheap_model_path': cheap_model_path,
+                                  'ensemble_weights': ensemble_weights, 'max_batch': max_batch,
+                                  'batch_wait_ms': batch_wait_ms},
+                          name='deepshield-inference', daemon=True)
+    process.start()
+
+    started = time.time()
+    while not ready.wait(timeout=1.0):
+        if not process.is_alive():
+            raise RuntimeError("Inference process exited during startup")
+        if time.time() - started > timeout:
+            process.terminate()
+            raise RuntimeError("Timed out waiting for inference process to load models")
+
+    return process
@@ -0,0 +1,153 @@
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Modality of the detection currently running in this context ('image', 'video', 'audio')
+_current_modality = contextvars.ContextVar('deepshield_modality', default='unknown')
+# Event list of the per-request trace being collected, if any
+_active_trace = contextvars.ContextVar('deepshield_trace', default=None)
+
+
+class Histogram:
+    """Cumulative latency histogram in the Prometheus sense"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class MetricsRegistry:
+    """Per-(modality, stage) latency histograms for the detection pipeline"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, modality, seconds):
+        key = (modality, stage)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def snapshot(self):
+        """Plain-dict summary: {modality: {stage: {'count', 'sum', 'mean'}}}"""
+        with self._lock:
+            summary = {}
+            for (modality, stage), histogram in self._histograms.items():
+                summary.setdefault(modality, {})[stage] = {
+                    'count': histogram.count,
+                    'sum': histogram.sum,
+                    'mean': histogram.sum / histogram.count if histogram.count else 0.0
+                }
+            return summary
+
+    def render_prometheus(self):
+        """Render all histograms in the Prometheus text exposition format"""
+        name = 'deepshield_stage_duration_seconds'
+        lines = [
+            f"# HELP {name} Wall time spent in each detection pipeline stage.",
+            f"# TYPE {name} histogram"
+        ]
+        with self._lock:
+            for (modality, stage), histogram in sorted(self._histograms.items()):
+                labels = f'modality="{modality}",stage="{stage}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+                lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by span()
+registry = MetricsRegistry()
+
+
+@contextmanager
+def span(stage, modality=None):
+    """
+    Time a pipeline stage. Passing a modality sets it for nested spans, so
+    inner stages (face detection, inference...) are attributed to the
+    detection that called them.
+    """
+    token = _current_modality.set(modality) if modality else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        current = _current_modality.get()
+        if token is not None:
+            _current_modality.reset(token)
+        registry.observe(stage, current, duration)
+
+        events = _active_trace.get()
+        if events is not None:
+            events.append({
+                'name': stage,
+                'cat': current,
+                'ph': 'X',
+                'ts': start * 1e6,
+                'dur': duration * 1e6,
+                'pid': os.getpid(),
+                'tid': threading.get_ident()
+            })
+
+
+@contextmanager
+def trace():
+    """
+    Collect every span in this context into a Chrome trace (chrome://tracing,
+    Perfetto). Yields a dict whose 'traceEvents' fill in as spans complete.
+    """
+    events = []
+    token = _active_trace.set(events)
+    try:
+        yield {'traceEvents': events, 'displayTimeUnit': 'ms'}
+    finally:
+        _active_trace.reset(token)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host='0.0.0.0'):
+    """Serve /metrics from a background thread (for processes without a web app, e.g. the bot)"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="deepshield-metrics", daemon=True).start()
+    print(f"📈 Metrics available at http://{host}:{port}/metrics")
+    return server
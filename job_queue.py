@@ -0,0 +1,445 @@
+import os
+import json
+import time
+import uuid
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+class Job:
+    """A single unit of detection work tracked by the JobQueue"""
+
+    def __init__(self, job_id, kind, file_path, created_at=None):
+        self.id = job_id
+        self.kind = kind
+        self.file_path = file_path
+        self.status = QUEUED
+        self.progress = 0.0
+        self.stage = None
+        self.result = None
+        self.error = None
+        self.created_at = created_at or time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.owner_pid = os.getpid()
+        self.version = 0
+        self.cancel_event = threading.Event()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': round(self.progress, 4),
+            'stage': self.stage,
+            'result': self.result,
+            'error': self.error,
+            'created_at': datetime.fromtimestamp(self.created_at).isoformat(),
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat() if self.started_at else None,
+            'finished_at': datetime.fromtimestamp(self.finished_at).isoformat() if self.finished_at else None
+        }
+
+
+class JobQueue:
+    def __init__(self, handler, max_workers=2, result_ttl=3600, db_path=None, stage_spans=None,
+                 sync_interval=0.5):
+        """
+        In-process job queue with a worker pool for long-running detections
+
+        Args:
+            handler: Callable (job, progress_callback) -> result dict run on a worker thread
+            max_workers: Number of worker threads pulling jobs off the queue
+            result_ttl: Seconds a finished job (and its result) is kept around
+            db_path: Optional SQLite file used to persist job state across restarts and
+                share it between worker processes (e.g. several gunicorn workers)
+            stage_spans: {stage: (start, end)} share of the overall progress each
+                stage covers; other stages report their own done/total
+            sync_interval: Minimum seconds between progress writes and cancel
+                checks against the SQLite store (stage changes always sync)
+        """
+        self.handler = handler
+        self.max_workers = max_workers
+        self.result_ttl = result_ttl
+        self.db_path = db_path
+        self.stage_spans = stage_spans or {}
+        self.sync_interval = sync_interval
+
+        self._jobs = {}
+        self._pending = queue.Queue()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._workers = []
+        self._db_lock = threading.Lock()
+        self._db = None
+
+        if self.db_path:
+            self._init_db()
+
+        for i in range(self.max_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"deepshield-job-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def _init_db(self):
+        """Open the SQLite store and recover jobs left over from a previous run"""
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT,
+                file_path TEXT,
+                status TEXT,
+                progress REAL,
+                stage TEXT,
+                result TEXT,
+                error TEXT,
+                created_at REAL,
+                started_at REAL,
+                finished_at REAL,
+                owner_pid INTEGER,
+                cancel_requested INTEGER DEFAULT 0
+            )"""
+        )
+        # Stores created before multi-process workers lack the ownership/cancel columns
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for name, declaration in (('owner_pid', 'INTEGER'), ('cancel_requested', 'INTEGER DEFAULT 0')):
+            if name not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {declaration}")
+        self._db.commit()
+
+        now = time.time()
+        rows = self._db.execute(self._SELECT + " WHERE status NOT IN (?, ?, ?)", FINISHED_STATES).fetchall()
+        recovered = 0
+        for row in rows:
+            job = self._job_from_row(row)
+
+            # Work that was in flight when its owning process died cannot be resumed;
+            # jobs owned by sibling worker processes that are still alive are left alone
+            if self._pid_alive(job.owner_pid):
+                continue
+            job.status = FAILED
+            job.error = 'Interrupted by server restart'
+            job.finished_at = now
+            self._remove_file(job.file_path)
+            self._persist(job)
+            recovered += 1
+
+        print(f"✅ Job store opened: {self.db_path} ({recovered} interrupted jobs recovered)")
+
+    _SELECT = ("SELECT id, kind, file_path, status, progress, stage, result, error, "
+               "created_at, started_at, finished_at, owner_pid FROM jobs")
+
+    @staticmethod
+    def _job_from_row(row):
+        job = Job(row[0], row[1], row[2], created_at=row[8])
+        job.status, job.progress, job.stage = row[3], row[4] or 0.0, row[5]
+        job.result = json.loads(row[6]) if row[6] else None
+        job.error = row[7]
+        job.started_at, job.finished_at = row[9], row[10]
+        job.owner_pid = row[11]
+        return job
+
+    @staticmethod
+    def _pid_alive(pid):
+        if not pid:
+            return False
+        if pid == os.getpid():
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def _load_persisted(self, job_id):
+        """Read a job owned by another worker process from the shared store"""
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute(self._SELECT + " WHERE id = ?", (job_id,)).fetchone()
+        return self._job_from_row(row) if row else None
+
+    def _cancel_requested(self, job_id):
+        if self._db is None:
+            return False
+        with self._db_lock:
+            row = self._db.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def _persist(self, job):
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, file_path, status, progress, stage, result, error, "
+                "created_at, started_at, finished_at, owner_pid) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET status = excluded.status, progress = excluded.progress, "
+                "stage = excluded.stage, result = excluded.result, error = excluded.error, "
+                "started_at = excluded.started_at, finished_at = excluded.finished_at",
+                (job.id, job.kind, job.file_path, job.status, job.progress, job.stage,
+                 json.dumps(job.result) if job.result is not None else None, job.error,
+                 job.created_at, job.started_at, job.finished_at, job.owner_pid)
+            )
+            self._db.commit()
+
+    def _delete_persisted(self, job_ids):
+        if self._db is None or not job_ids:
+            return
+        with self._db_lock:
+            self._db.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+            self._db.commit()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def submit(self, kind, file_path):
+        """Queue a detection job and return its initial state immediately"""
+        self.purge_expired()
+
+        job = Job(uuid.uuid4().hex, kind, file_path)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._persist(job)
+        self._pending.put(job.id)
+        return job.to_dict()
+
+    def get(self, job_id):
+        """Return a snapshot of the job, or None if unknown/expired"""
+        self.purge_expired()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return job.to_dict()
+
+        # Possibly queued on a sibling worker process sharing the same store
+        job = self._load_persisted(job_id)
+        return job.to_dict() if job else None
+
+    def cancel(self, job_id):
+        """
+        Cancel a job. Queued jobs never start; running jobs are signalled and
+        stop at the next progress checkpoint, their result is discarded.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return self._request_remote_cancel(job_id)
+
+        with self._lock:
+            if job.status in FINISHED_STATES:
+                return job.to_dict()
+
+            job.cancel_event.set()
+            if job.status == QUEUED:
+                self._finish(job, CANCELLED)
+            snapshot = job.to_dict()
+
+        if snapshot['status'] == CANCELLED:
+            self._persist(job)
+            self._remove_file(job.file_path)
+        return snapshot
+
+    def _request_remote_cancel(self, job_id):
+        """Flag a job owned by another worker process; its owner picks the flag up"""
+        job = self._load_persisted(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job.to_dict() if job else None
+        with self._db_lock:
+            self._db.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            self._db.commit()
+        return job.to_dict()
+
+    def events(self, job_id, heartbeat=15.0, poll_interval=1.0):
+        """
+        Yield job snapshots whenever the job changes, ending once it finishes.
+        Yields None as a keep-alive when nothing changed within `heartbeat` seconds.
+        """
+        with self._lock:
+            local = job_id in self._jobs
+        if not local:
+            yield from self._poll_persisted_events(job_id, heartbeat, poll_interval)
+            return
+
+        last_version = -1
+        while True:
+            with self._changed:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return
+                if job.version == last_version:
+                    self._changed.wait(timeout=heartbeat)
+                    job = self._jobs.get(job_id)
+                    if job is None:
+                        return
+                if job.version == last_version:
+                    snapshot = None
+                else:
+                    last_version = job.version
+                    snapshot = job.to_dict()
+
+            yield snapshot
+            if snapshot is not None and snapshot['status'] in FINISHED_STATES:
+                return
+
+    def _poll_persisted_events(self, job_id, heartbeat, poll_interval):
+        """events() for jobs owned by another worker process, by polling the shared store"""
+        last_state = None
+        last_emit = time.time()
+        while True:
+            job = self._load_persisted(job_id)
+            if job is None:
+                return
+            snapshot = job.to_dict()
+            state = (snapshot['status'], snapshot['progress'], snapshot['stage'])
+            if state != last_state:
+                last_state = state
+                last_emit = time.time()
+                yield snapshot
+                if snapshot['status'] in FINISHED_STATES:
+                    return
+            elif time.time() - last_emit >= heartbeat:
+                last_emit = time.time()
+                yield None
+            time.sleep(poll_interval)
+
+    def purge_expired(self):
+        """Drop finished jobs older than result_ttl"""
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.status in FINISHED_STATES and job.finished_at and job.finished_at < cutoff]
+            for job in expired:
+                del self._jobs[job.id]
+
+        self._delete_persisted([job.id for job in expired])
+        if self._db is not None:
+            # Also drop finished jobs of processes that are no longer around to purge them
+            with self._db_lock:
+                self._db.execute(
+                    "DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?",
+                    FINISHED_STATES + (cutoff,)
+                )
+                self._db.commit()
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        counts['pending'] = self._pending.qsize()
+        counts['workers'] = self.max_workers
+        return counts
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+    def _touch(self, job):
+        """Bump the job version and wake SSE listeners (caller holds the lock)"""
+        job.version += 1
+        self._changed.notify_all()
+
+    def _finish(self, job, status, result=None, error=None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        if status == COMPLETED:
+            job.progress = 1.0
+        self._touch(job)
+
+    def _worker_loop(self):
+        while True:
+            job_id = self._pending.get()
+            try:
+                self._run_job(job_id)
+            except Exception as e:
+                print(f"❌ Job worker error: {e}")
+            finally:
+                self._pending.task_done()
+
+    def _run_job(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return
+            if self._cancel_requested(job_id):
+                job.cancel_event.set()
+                self._finish(job, CANCELLED)
+        if job.status == CANCELLED:
+            self._persist(job)
+            self._remove_file(job.file_path)
+            return
+
+        with self._lock:
+            job.status = RUNNING
+            job.started_at = time.time()
+            self._touch(job)
+        self._persist(job)
+
+        last_sync = [time.monotonic()]
+
+        def progress_callback(stage, done, total):
+            """Report progress; returns False once the job has been cancelled"""
+            with self._lock:
+                stage_changed = stage != job.stage
+                job.stage = stage
+                if total:
+                    fraction = min(float(done) / float(total), 1.0)
+                    start, end = self.stage_spans.get(stage, (0.0, 1.0))
+                    # Overall progress never moves backwards when a new stage starts at 0
+                    job.progress = max(job.progress, start + (end - start) * fraction)
+                self._touch(job)
+            if self._db is not None:
+                # Every frame reports progress; hit SQLite only on stage changes or every sync_interval
+                now = time.monotonic()
+                if stage_changed or now - last_sync[0] >= self.sync_interval:
+                    last_sync[0] = now
+                    if self._cancel_requested(job.id):
+                        job.cancel_event.set()
+                    self._persist(job)
+            return not job.cancel_event.is_set()
+
+        result, error = None, None
+        try:
+            result = self.handler(job, progress_callback)
+            if result is None:
+                error = 'Detection failed'
+        except Exception as e:
+            error = str(e)
+
+        with self._lock:
+            if job.cancel_event.is_set():
+                self._finish(job, CANCELLED)
+            elif error:
+                self._finish(job, FAILED, error=error)
+            else:
+                self._finish(job, COMPLETED, result=result)
+        self._persist(job)
+        self._remove_file(job.file_path)
+
+    @staticmethod
+    def _remove_file(file_path):
+        if file_path and os.path.exists(file_path):
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
@@ -0,0 +1,257 @@
+import json
+import time
+import threading
+from datetime import datetime
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+class LatestFrameSlot:
+    """
+    Single-slot mailbox for live frames. Putting a new frame replaces any frame
+    that has not been picked up yet, so the consumer always sees the newest one.
+    """
+
+    def __init__(self):
+        self._frame = None
+        self._seq = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, frame):
+        """Store a frame, returns True if a stale pending frame was dropped"""
+        with self._cond:
+            dropped = self._frame is not None
+            if dropped:
+                self.dropped += 1
+            self._seq += 1
+            self.received += 1
+            self._frame = (self._seq, time.time(), frame)
+            self._cond.notify()
+            return dropped
+
+    def take(self, timeout=None):
+        """Wait for the newest pending frame; returns (seq, received_at, frame) or None when closed"""
+        with self._cond:
+            while self._frame is None and not self._closed:
+                if not self._cond.wait(timeout=timeout):
+                    return None
+            if self._frame is None:
+                return None
+            item, self._frame = self._frame, None
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class LiveSession:
+    """
+    One live-detection connection: frames are received on the socket thread and
+    analysed on a dedicated worker thread, with latest-frame-wins dropping between them.
+    """
+
+    def __init__(self, analyze, send):
+        """
+        Args:
+            analyze: Callable (bgr_frame) -> result dict, run on the worker thread
+            send: Callable (text) pushing a message back to the client
+        """
+        self.analyze = analyze
+        self.send = send
+        self.slot = LatestFrameSlot()
+        self.processed = 0
+        self._worker = threading.Thread(target=self._run, name="deepshield-live-session", daemon=True)
+
+    def start(self):
+        self._worker.start()
+        return self
+
+    def submit(self, jpeg_bytes):
+        """Queue raw JPEG bytes from the client (decoding happens on the worker)"""
+        return self.slot.put(jpeg_bytes)
+
+    def close(self):
+        self.slot.close()
+        if self._worker.is_alive() and self._worker is not threading.current_thread():
+            self._worker.join(timeout=5)
+
+    def _run(self):
+        while not self.slot.closed:
+            item = self.slot.take(timeout=1.0)
+            if item is None:
+                continue
+
+            seq, received_at, jpeg_bytes = item
+            message = {'frame': seq, 'dropped': self.slot.dropped}
+
+            frame = cv2.imdecode(np.frombuffer(jpeg_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                message['error'] = 'Could not decode frame'
+            else:
+                try:
+                    message['result'] = self.analyze(frame)
+                except Exception as e:
+                    message['error'] = str(e)
+
+            self.processed += 1
+            message['processed'] = self.processed
+            message['latency_ms'] = round((time.time() - received_at) * 1000.0, 1)
+
+            try:
+                self.send(json.dumps(message))
+            except Exception:
+                # Client went away; the socket thread will close the session
+                self.slot.close()
+
+
+class LiveAnalysisState:
+    """
+    Per-session live analysis. Frames that barely differ from the last analysed
+    frame reuse its score instead of running face detection and the model again,
+    and the reported score is an EMA over recent inferences rather than a
+    jittery per-frame verdict.
+    """
+
+    def __init__(self, detector, inference_lock=None):
+        """
+        Args:
+            detector: AccurateDeepfakeDetector used for fresh inferences
+            inference_lock: Optional semaphore bounding concurrent inference across sessions
+        """
+        self.detector = detector
+        self.inference_lock = inference_lock
+        self.config = detector.model_configs['live']
+
+        self.last_thumbnail = None
+        self.last_prediction = None
+        self.smoothed_score = None
+        self.frames_since_inference = 0
+
+        self.frames = 0
+        self.inferences = 0
+        self.last_seen = time.time()
+        self._lock = threading.Lock()
+
+    def _thumbnail(self, frame):
+        """Small grayscale proxy used for the change signal"""
+        small = cv2.resize(frame, self.config['thumbnail_size'], interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def _infer(self, frame):
+        if self.inference_lock is not None:
+            with self.inference_lock:
+                return self.detector.detect_image_array(frame, source='live_frame')
+        return self.detector.detect_image_array(frame, source='live_frame')
+
+    def analyze(self, frame):
+        """Analyse one BGR frame, returns a detect_image-style result dict"""
+        with self._lock:
+            self.frames += 1
+            self.last_seen = time.time()
+
+            thumbnail = self._thumbnail(frame)
+            change = None
+            if self.last_thumbnail is not None:
+                change = float(np.mean(cv2.absdiff(thumbnail, self.last_thumbnail)))
+
+            reuse = (
+                self.last_prediction is not None
+                and change is not None
+                and change < self.config['change_threshold']
+                and self.frames_since_inference < self.config['max_reuse_frames']
+            )
+
+            if reuse:
+                prediction = self.last_prediction
+                self.frames_since_inference += 1
+            else:
+                result = self._infer(frame)
+                if result is None:
+                    return None
+
+                prediction = result['result']
+                # Compare future frames against the last *analysed* frame so slow drift still triggers
+                self.last_thumbnail = thumbnail
+                self.last_prediction = prediction
+                self.frames_since_inference = 0
+                self.inferences += 1
+
+                alpha = self.config['ema_alpha']
+                if self.smoothed_score is None:
+                    self.smoothed_score = prediction['raw_score']
+                else:
+                    self.smoothed_score = alpha * prediction['raw_score'] + (1 - alpha) * self.smoothed_score
+
+            score = self.smoothed_score
+            is_deepfake = score > self.detector.model_configs['image']['threshold']
+
+            live_prediction = dict(prediction)
+            live_prediction.update({
+                'is_deepfake': bool(is_deepfake),
+                'confidence': float(score * 100 if is_deepfake else (1 - score) * 100),
+                'raw_score': float(score),
+                'frame_score': float(prediction['raw_score']),
+                'reused_previous': bool(reuse),
+                'frame_change': change
+            })
+
+            return {
+                'type': 'image',
+                'file_path': 'live_frame',
+                'timestamp': datetime.now().isoformat(),
+                'result': live_prediction,
+                'analysis_summary': self.detector._generate_summary(live_prediction, 'image'),
+                'live_session': {
+                    'frames': self.frames,
+                    'inferences': self.inferences,
+                    'inference_rate': round(self.inferences / self.frames, 4)
+                }
+            }
+
+
+class LiveStateRegistry:
+    """
+    LiveAnalysisState per client session id for the HTTP live-frame endpoint,
+    with idle expiry and a cap on the number of sessions (least recently used
+    evicted first), so a flood of fresh session ids cannot grow it unbounded
+    """
+
+    def __init__(self, factory, idle_timeout=300, max_entries=256):
+        self.factory = factory
+        self.idle_timeout = idle_timeout
+        self.max_entries = max_entries
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def get(self, session_id):
+        now = time.time()
+        with self._lock:
+            expired = [key for key, state in self._states.items() if now - state.last_seen > self.idle_timeout]
+            for key in expired:
+                del self._states[key]
+
+            state = self._states.get(session_id)
+            if state is None:
+                state = self.factory()
+                self._states[session_id] = state
+                while len(self._states) > self.max_entries:
+                    self._states.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._states.move_to_end(session_id)
+            return state
+
+    def __len__(self):
+        return len(self._states)
@@ -4,10 +4,35 @@ import StatCard from '../components/StatCard';
 import ChartCard from '../components/ChartCard';
 import RecentActivity from '../components/RecentActivity';
 
+const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5000';
+
+interface DailyBucket {
+  date: string;
+  total: number;
+  deepfakes: number;
+}
+
+interface StatsResponse {
+  total_analyses: number;
+  deepfakes_detected: number;
+  deepfake_rate: number;
+  average_processing_time: number;
+  windows: Record<'last_hour' | 'last_24h', { total: number; deepfakes: number; deepfake_rate: number }>;
+  daily: DailyBucket[];
+  recent_detections: {
+    type: 'image' | 'video' | 'audio';
+    source: string;
+    is_deepfake: boolean;
+    confidence: number;
+    model_used: string;
+    timestamp: string;
+  }[];
+}
+
 interface DashboardData {
   totalAnalyses: number;
   deepfakesDetected: number;
-  accuracyRate: number;
+  deepfakeRate: number;
   averageResponseTime: number;
   dailyAnalyses: number;
   weeklyGrowth: number;
@@ -30,7 +55,7 @@ const Dashboard: React.FC = () => {
   const [dashboardData, setDashboardData] = useState<DashboardData>({
     totalAnalyses: 0,
     deepfakesDetected: 0,
-    accuracyRate: 0,
+    deepfakeRate: 0,
     averageResponseTime: 0,
     dailyAnalyses: 0,
     weeklyGrowth: 0,
@@ -48,6 +73,7 @@ const Dashboard: React.FC = () => {
     datasets: []
   });
   const [notifications, setNotifications] = useState<string[]>([]);
+  const [dailyBuckets, setDailyBuckets] = useState<DailyBucket[]>([]);
 
   // Add notification function
   const addNotification = (message: string) => {
@@ -57,35 +83,23 @@ const Dashboard: React.FC = () => {
     }, 5000);
   };
 
-  // Generate mock activities with real-time updates
-  const generateMockActivities = useCallback(() => {
-    const activities = [];
-    const types = ['image', 'video', 'audio'] as const;
-    const results = ['authentic', 'deepfake', 'suspicious'] as const;
-    const statuses = ['completed', 'processing', 'error'] as const;
-    
-    for (let i = 0; i < 10; i++) {
-      const type = types[Math.floor(Math.random() * types.length)];
-      const result = results[Math.floor(Math.random() * results.length)];
-      const status = statuses[Math.floor(Math.random() * statuses.length)];
-      
-      activities.push({
-        id: `activity-${Date.now()}-${i}`,
-        type,
-        filename: `${type}_file_${i + 1}.${type === 'image' ? 'jpg' : type === 'video' ? 'mp4' : 'wav'}`,
-        result,
-        confidence: Math.random() * 100,
-        timestamp: new Date(Date.now() - Math.random() * 24 * 60 * 60 * 1000).toISOString(),
-        status
-      });
-    }
-    
-    return activities.sort((a, b) => new Date(b.timestamp).getTime() - new Date(a.timestamp).getTime());
+  // Map recent detections from /api/stats onto RecentActivity items
+  const toActivities = useCallback((detections: StatsResponse['recent_detections']) => {
+    return detections.map((detection, i) => ({
+      id: `activity-${detection.timestamp}-${i}`,
+      type: detection.type,
+      filename: `${detection.type} via ${detection.source}`,
+      result: detection.is_deepfake ? 'deepfake' as const : 'authentic' as const,
+      confidence: detection.confidence,
+      timestamp: detection.timestamp,
+      status: 'completed' as const
+    }));
   }, []);
 
-  // Generate chart data based on time range
-  const generateChartData = useCallback((range: '7d' | '30d' | '90d') => {
+  // Build chart data from the daily buckets for the selected time range
+  const generateChartData = useCallback((range: '7d' | '30d' | '90d', daily: DailyBucket[]) => {
     const days = range === '7d' ? 7 : range === '30d' ? 30 : 90;
+    const byDate = new Map(daily.map(bucket => [bucket.date, bucket]));
     const labels = [];
     const analysisData = [];
     const deepfakeData = [];
@@ -95,12 +109,10 @@ const Dashboard: React.FC = () => {
       date.setDate(date.getDate() - i);
       labels.push(date.toLocaleDateString('en-US', { month: 'short', day: 'numeric' }));
       
-      // Generate realistic data with some randomness
-      const baseAnalyses = range === '7d' ? 150 : range === '30d' ? 120 : 100;
-      const baseDeepfakes = range === '7d' ? 15 : range === '30d' ? 12 : 10;
-      
-      analysisData.push(Math.floor(baseAnalyses + Math.random() * 50));
-      deepfakeData.push(Math.floor(baseDeepfakes + Math.random() * 8));
+      const key = `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}-${String(date.getDate()).padStart(2, '0')}`;
+      const bucket = byDate.get(key);
+      analysisData.push(bucket ? bucket.total : 0);
+      deepfakeData.push(bucket ? bucket.deepfakes : 0);
     }
     
     return {
@@ -124,70 +136,74 @@ const Dashboard: React.FC = () => {
     };
   }, []);
 
+  // Growth of the last `days` days versus the `days` before them, in percent
+  const growth = (daily: DailyBucket[], days: number) => {
+    const totals = daily.map(bucket => bucket.total);
+    const current = totals.slice(-days).reduce((sum, value) => sum + value, 0);
+    const previous = totals.slice(-2 * days, -days).reduce((sum, value) => sum + value, 0);
+    return previous > 0 ? ((current - previous) / previous) * 100 : 0;
+  };
+
+  const fetchStats = useCallback(async () => {
+    const response = await fetch(`${API_URL}/api/stats`);
+    if (!response.ok) {
+      throw new Error(`Stats request failed: ${response.status}`);
+    }
+    const stats: StatsResponse = await response.json();
+    
+    setDashboardData(prev => {
+      if (prev.totalAnalyses > 0 && Math.floor(stats.total_analyses / 100) > Math.floor(prev.totalAnalyses / 100)) {
+        addNotification(`🎉 Milestone: ${stats.total_analyses.toLocaleString()} total analyses completed!`);
+      }
+      
+      return {
+        totalAnalyses: stats.total_analyses,
+        deepfakesDetected: stats.deepfakes_detected,
+        deepfakeRate: stats.deepfake_rate,
+        averageResponseTime: stats.average_processing_time,
+        dailyAnalyses: stats.windows.last_24h.total,
+        weeklyGrowth: growth(stats.daily, 7),
+        monthlyGrowth: growth(stats.daily, 30),
+        recentDetections: toActivities(stats.recent_detections)
+      };
+    });
+    setDailyBuckets(stats.daily);
+    
+    return stats;
+  }, [toActivities]);
+
   // Real-time data updates
   useEffect(() => {
-    const updateData = () => {
-      setDashboardData(prev => {
-        const newTotal = prev.totalAnalyses + Math.floor(Math.random() * 5);
-        const newDeepfakes = prev.deepfakesDetected + Math.floor(Math.random() * 2);
-        
-        // Add notifications for significant events
-        if (newTotal % 100 === 0) {
-          addNotification(`🎉 Milestone: ${newTotal.toLocaleString()} total analyses completed!`);
-        }
-        if (newDeepfakes % 50 === 0) {
-          addNotification(`🚨 Alert: ${newDeepfakes.toLocaleString()} deepfakes detected!`);
-        }
-        
-        return {
-          totalAnalyses: newTotal,
-          deepfakesDetected: newDeepfakes,
-          accuracyRate: Math.min(99.9, prev.accuracyRate + (Math.random() - 0.5) * 0.5),
-          averageResponseTime: Math.max(0.5, prev.averageResponseTime + (Math.random() - 0.5) * 0.1),
-          dailyAnalyses: prev.dailyAnalyses + Math.floor(Math.random() * 3),
-          weeklyGrowth: prev.weeklyGrowth + (Math.random() - 0.5) * 0.5,
-          monthlyGrowth: prev.monthlyGrowth + (Math.random() - 0.5) * 0.3,
-          recentDetections: generateMockActivities()
-        };
-      });
-    };
-
     if (liveUpdates) {
-      const interval = setInterval(updateData, 5000); // Update every 5 seconds
+      const interval = setInterval(() => {
+        fetchStats().catch(error => console.error('Stats update failed:', error));
+      }, 5000); // Update every 5 seconds
       return () => clearInterval(interval);
     }
-  }, [liveUpdates, generateMockActivities]);
+  }, [liveUpdates, fetchStats]);
 
   // Load initial data
   useEffect(() => {
     const loadDashboardData = async () => {
       setIsLoading(true);
       
-      // Simulate API call
-      await new Promise(resolve => setTimeout(resolve, 1000));
-      
-      setDashboardData({
-        totalAnalyses: 12547,
-        deepfakesDetected: 892,
-        accuracyRate: 94.2,
-        averageResponseTime: 1.8,
-        dailyAnalyses: 156,
-        weeklyGrowth: 12.5,
-        monthlyGrowth: 8.3,
-        recentDetections: generateMockActivities()
-      });
+      try {
+        await fetchStats();
+      } catch (error) {
+        console.error('Failed to load dashboard data:', error);
+        addNotification('⚠️ Could not reach the analysis server');
+      }
       
-      setChartData(generateChartData(timeRange));
       setIsLoading(false);
     };
 
     loadDashboardData();
-  }, [timeRange, generateMockActivities, generateChartData]);
+  }, [fetchStats]);
 
-  // Update chart data when time range changes
+  // Update chart data when time range or daily buckets change
   useEffect(() => {
-    setChartData(generateChartData(timeRange));
-  }, [timeRange, generateChartData]);
+    setChartData(generateChartData(timeRange, dailyBuckets));
+  }, [timeRange, dailyBuckets, generateChartData]);
 
   // Render interactive chart
   const renderChart = (type: 'line' | 'bar' | 'pie') => {
@@ -344,8 +360,8 @@ const Dashboard: React.FC = () => {
       
       // Create and download CSV
       const csvContent = [
-        'Date,Total Analyses,Deepfakes Detected,Accuracy Rate,Response Time',
-        `${new Date().toISOString()},${dashboardData.totalAnalyses},${dashboardData.deepfakesDetected},${dashboardData.accuracyRate}%,${dashboardData.averageResponseTime}s`
+        'Date,Total Analyses,Deepfakes Detected,Deepfake Rate,Response Time',
+        `${new Date().toISOString()},${dashboardData.totalAnalyses},${dashboardData.deepfakesDetected},${dashboardData.deepfakeRate}%,${dashboardData.averageResponseTime}s`
       ].join('\n');
       
       const blob = new Blob([csvContent], { type: 'text/csv' });
@@ -506,13 +522,13 @@ const Dashboard: React.FC = () => {
               description="Suspicious content identified"
             />
             <StatCard
-              title="Accuracy Rate"
-              value={`${dashboardData.accuracyRate.toFixed(1)}%`}
+              title="Deepfake Rate"
+              value={`${dashboardData.deepfakeRate.toFixed(1)}%`}
               change={2.1}
               changeType="increase"
               icon="🎯"
               color="green"
-              description="Detection accuracy"
+              description="Share of analyses flagged"
             />
             <StatCard
               title="Avg Response Time"
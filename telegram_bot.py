@@ -4,10 +4,18 @@ import requests
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes
 from accurate_deepfake_detector import AccurateDeepfakeDetector
+from history_store import DetectionHistory
+from instrumentation import span, start_metrics_server
+from image_io import decode_image
+from image_stats import compute_image_stats
+from audio_io import load_audio
 import tempfile
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from datetime import datetime
 import json
+import time
 
 # Configure logging
 logging.basicConfig(
@@ -21,16 +29,28 @@ BOT_TOKEN = "7280688427:AAGSDYkwgAwkwtoNKS4WrFjnBEnK-penwdQ"
 BOT_USERNAME = "@deepshield_ai_bot"
 
 class DeepShieldTelegramBot:
-    def __init__(self, token=None):
+    def __init__(self, token=None, base_url=None, base_file_url=None):
         """
         Initialize DeepShield Telegram Bot
         
         Args:
             token: Telegram Bot Token (optional, uses default if not provided)
+            base_url: Bot API base URL (optional, e.g. a local Bot API server or a test stand-in)
+            base_file_url: Bot API file download base URL (optional, pairs with base_url)
         """
         self.token = token or BOT_TOKEN
         self.detector = AccurateDeepfakeDetector()
-        self.application = Application.builder().token(self.token).build()
+        # Detection threads; None sizes the pool like asyncio's default executor
+        self.executor = ThreadPoolExecutor(max_workers=self.detector.thread_profile['bot_executor_workers'],
+                                           thread_name_prefix="deepshield-bot-detect")
+        # Shared with the Flask app so /api/stats includes bot traffic
+        self.history = DetectionHistory(os.getenv('DEEPSHIELD_HISTORY_DB', 'deepshield_history.sqlite3'))
+        builder = Application.builder().token(self.token)
+        if base_url:
+            builder = builder.base_url(base_url)
+        if base_file_url:
+            builder = builder.base_file_url(base_file_url)
+        self.application = builder.build()
         
         # Register handlers
         self._register_handlers()
@@ -252,11 +272,12 @@ _All systems operational_ 🟢
             # Download file to temporary location
             with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{media_type}') as temp_file:
                 file_path = temp_file.name
-                await file.download_to_drive(file_path)
+                with span('download', modality=media_type):
+                    await file.download_to_drive(file_path)
             
             # Run detection in background
             loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, self._run_detection, file_path, media_type)
+            result = await loop.run_in_executor(self.executor, self._run_detection, file_path, media_type)
             
             # Clean up temporary file
             os.unlink(file_path)
@@ -274,16 +295,28 @@ _All systems operational_ 🟢
     def _run_detection(self, file_path: str, media_type: str):
         """Run detection on file (blocking operation)"""
         try:
-            # Primary detection
-            if media_type == 'image':
-                primary_result = self.detector.detect_image(file_path)
-            elif media_type == 'video':
-                primary_result = self.detector.detect_video(file_path)
-            elif media_type == 'audio':
-                primary_result = self.detector.detect_audio(file_path)
+            started = time.time()
+            
+            with span('bot_detection', modality=media_type):
+                # Primary detection
+                decoded = None
+                if media_type == 'image':
+                    # Decoded once; the enhanced analysis reuses the same array
+                    with span('decode'):
+                        decoded = decode_image(file_path, self.detector.model_configs['image']['decode_min_side'])
+                    primary_result = None
+                    if decoded is not None:
+                        primary_result = self.detector.detect_image_array(decoded, source=file_path)
+                elif media_type == 'video':
+                    primary_result = self.detector.detect_video(file_path)
+                elif media_type == 'audio':
+                    primary_result = self.detector.detect_audio(file_path)
+                
+                # Enhanced analysis with multiple methods
+                with span('enhance'):
+                    enhanced_result = self._enhance_detection(primary_result, file_path, media_type, decoded)
             
-            # Enhanced analysis with multiple methods
-            enhanced_result = self._enhance_detection(primary_result, file_path, media_type)
+            self.history.record(enhanced_result, source='telegram', processing_time=time.time() - started)
             
             return enhanced_result
             
@@ -291,8 +324,8 @@ _All systems operational_ 🟢
             logger.error(f"Detection error: {e}")
             return None
     
-    def _enhance_detection(self, primary_result, file_path: str, media_type: str):
-        """Enhance detection with additional analysis methods"""
+    def _enhance_detection(self, primary_result, file_path: str, media_type: str, decoded=None):
+        """Enhance detection with additional analysis methods (decoded: the image array already scored)"""
         if primary_result is None:
             return None
         
@@ -304,7 +337,7 @@ _All systems operational_ 🟢
             additional_analysis = {}
             
             if media_type == 'image':
-                additional_analysis = self._analyze_image_enhanced(file_path, prediction)
+                additional_analysis = self._analyze_image_enhanced(file_path, prediction, decoded)
             elif media_type == 'video':
                 additional_analysis = self._analyze_video_enhanced(file_path, prediction)
             elif media_type == 'audio':
@@ -324,31 +357,27 @@ _All systems operational_ 🟢
             logger.error(f"Enhanced detection error: {e}")
             return primary_result
     
-    def _analyze_image_enhanced(self, file_path: str, primary_prediction):
-        """Enhanced image analysis"""
+    def _analyze_image_enhanced(self, file_path: str, primary_prediction, img=None):
+        """Enhanced image analysis of the decoded image (decoded from file_path when not given)"""
         try:
-            import cv2
-            import numpy as np
-            
-            img = cv2.imread(file_path)
+            if img is None:
+                img = decode_image(file_path)
             if img is None:
                 return {}
             
             analysis = {}
+            stats = compute_image_stats(img)
             
             # Color analysis
-            hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-            saturation = np.mean(hsv[:, :, 1])
+            saturation = stats['saturation']
             analysis['saturation_score'] = saturation / 255.0
             
             # Edge analysis
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 50, 150)
-            edge_density = np.sum(edges > 0) / (edges.shape[0] * edges.shape[1])
+            edge_density = stats['edge_density']
             analysis['edge_density'] = edge_density
             
             # Noise analysis
-            noise_level = cv2.Laplacian(gray, cv2.CV_64F).var()
+            noise_level = stats['noise_level']
             analysis['noise_level'] = noise_level
             
             # AI generation indicators
@@ -431,7 +460,9 @@ _All systems operational_ 🟢
         try:
             import librosa
             
-            y, sr = librosa.load(file_path, sr=None)
+            # Reuses the buffer the detector already decoded for this file
+            audio_config = self.detector.model_configs['audio']
+            y, sr = load_audio(file_path, sr=audio_config['sample_rate'], duration=audio_config['max_duration'])
             analysis = {}
             
             # Spectral analysis
@@ -748,6 +779,11 @@ if __name__ == "__main__":
     print(f"📱 Bot Username: {BOT_USERNAME}")
     print(f"🔑 Token: {BOT_TOKEN[:10]}...{BOT_TOKEN[-10:]}")
     
+    # Optional Prometheus endpoint for per-stage latency histograms
+    metrics_port = os.getenv('DEEPSHIELD_BOT_METRICS_PORT')
+    if metrics_port:
+        start_metrics_server(int(metrics_port))
+    
     # Create and run bot with hardcoded token
     bot = DeepShieldTelegramBot()
     bot.run() 
\ No newline at end of file
@@ -0,0 +1,78 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('scipy')
+librosa = pytest.importorskip('librosa')
+
+from audio_features import MelSpectrogramEngine, hann_window, resize_matrix
+
+SR = 16000
+
+
+def clips(n=3, seconds=1.5):
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * SR)) / SR
+    return [(np.sin(2 * np.pi * (220 + 110 * i) * t) + 0.1 * rng.standard_normal(len(t))).astype(np.float32)
+            for i in range(n)]
+
+
+def test_hann_window_matches_scipy():
+    from scipy.signal import get_window
+    np.testing.assert_allclose(hann_window(2048), get_window('hann', 2048, fftbins=True), atol=1e-6)
+
+
+def test_power_mel_matches_librosa():
+    engine = MelSpectrogramEngine(sr=SR)
+    batch = np.stack(clips())
+    ours = engine.power_mel(batch)
+    for y, mel in zip(batch, ours):
+        expected = librosa.feature.melspectrogram(y=y, sr=SR, n_fft=2048, hop_length=512, n_mels=128)
+        assert mel.shape == expected.shape
+        np.testing.assert_allclose(mel, expected, rtol=1e-3, atol=1e-5 * expected.max())
+
+
+def test_db_scale_matches_power_to_db():
+    engine = MelSpectrogramEngine(sr=SR)
+    mel = engine.power_mel(np.stack(clips()))
+    ours = engine._to_db(mel)
+    for clip_mel, clip_db in zip(mel, ours):
+        expected = librosa.power_to_db(clip_mel, ref=np.max)
+        np.testing.assert_allclose(clip_db, expected, atol=1e-3)
+
+
+@pytest.mark.parametrize('max_block_frames', [1, 7, 64, 4096])
+def test_block_size_does_not_change_the_result(max_block_frames):
+    batch = np.stack(clips())
+    reference = MelSpectrogramEngine(sr=SR).power_mel(batch)
+    blocked = MelSpectrogramEngine(sr=SR, max_block_frames=max_block_frames).power_mel(batch)
+    np.testing.assert_allclose(blocked, reference, rtol=1e-5, atol=1e-7 * reference.max())
+
+
+def test_resize_matrix_matches_cv2():
+    cv2 = pytest.importorskip('cv2')
+    image = np.random.default_rng(1).random((128, 47)).astype(np.float32)
+    expected = cv2.resize(image, (128, 128))
+    ours = resize_matrix(128, 128) @ image @ resize_matrix(47, 128).T
+    np.testing.assert_allclose(ours, expected, atol=1e-4)
+
+
+def test_features_match_the_librosa_pipeline():
+    cv2 = pytest.importorskip('cv2')
+    engine = MelSpectrogramEngine(sr=SR)
+    inputs = clips(2, 1.5) + clips(1, 0.75)  # Two lengths, batched separately
+    ours = engine.features(inputs)
+    assert ours.shape == (3, 128, 128, 1)
+    for y, feature in zip(inputs, ours):
+        mel = librosa.feature.melspectrogram(y=y, sr=SR, n_fft=2048, hop_length=512, n_mels=128)
+        resized = cv2.resize(librosa.power_to_db(mel, ref=np.max), (128, 128))
+        expected = (resized - resized.mean()) / resized.std()
+        np.testing.assert_allclose(feature[..., 0], expected, atol=1e-3)
+
+
+def test_chunk_pads_the_last_window():
+    engine = MelSpectrogramEngine(sr=SR)
+    y = np.ones(int(2.5 * SR), dtype=np.float32)
+    windows = engine.chunk(y, seconds=1.0)
+    assert [len(w) for w in windows] == [SR] * 3
+    assert windows[-1][SR // 2:].sum() == 0
+    assert len(engine.chunk(y[:100], seconds=1.0)) == 1
@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+sf = pytest.importorskip('soundfile')
+
+import audio_io
+from audio_io import load_audio, clear_cache
+
+SR = 16000
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_cache()
+    yield
+    clear_cache()
+
+
+@pytest.fixture
+def wav(tmp_path):
+    path = str(tmp_path / 'clip.wav')
+    # One second per value, so a window's content shows where it was read from
+    y = np.repeat(np.array([0.1, 0.2, 0.3], dtype=np.float32), SR)
+    sf.write(path, y, SR, subtype='FLOAT')
+    return path
+
+
+def test_decodes_mono_float32(wav):
+    y, sr = load_audio(wav, sr=SR)
+    assert sr == SR
+    assert y.dtype == np.float32
+    assert y.shape == (3 * SR,)
+
+
+def test_window_offset_and_duration(wav):
+    y, _ = load_audio(wav, sr=SR, offset=1.0, duration=1.0)
+    assert y.shape == (SR,)
+    np.testing.assert_allclose(y, 0.2)
+
+    tail, _ = load_audio(wav, sr=SR, offset=2.5)
+    assert tail.shape == (SR // 2,)
+    np.testing.assert_allclose(tail, 0.3)
+
+
+def test_native_rate_is_kept_when_sr_is_none(wav):
+    _, sr = load_audio(wav, sr=None)
+    assert sr == SR
+
+
+def test_resampled_length(wav):
+    y, sr = load_audio(wav, sr=8000, duration=1.0)
+    assert sr == 8000
+    assert abs(len(y) - 8000) <= 1
+
+
+def test_cached_decode_is_shared_and_read_only(wav):
+    first, _ = load_audio(wav, sr=SR)
+    second, _ = load_audio(wav, sr=SR)
+    assert first is second
+    assert not first.flags.writeable
+    with pytest.raises(ValueError):
+        first[0] = 1.0
+
+
+def test_cache_key_includes_rate_and_window(wav):
+    full, _ = load_audio(wav, sr=SR)
+    assert load_audio(wav, sr=8000)[0] is not full
+    assert load_audio(wav, sr=SR, offset=1.0)[0] is not full
+    assert load_audio(wav, sr=SR, duration=1.0)[0] is not full
+    assert len(audio_io._cache) == 4
+
+
+def test_rewritten_file_is_decoded_again(wav):
+    old, _ = load_audio(wav, sr=SR)
+    sf.write(wav, np.full(SR, 0.5, dtype=np.float32), SR, subtype='FLOAT')
+    stat = os.stat(wav)
+    os.utime(wav, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))  # Coarse mtime clocks
+    new, _ = load_audio(wav, sr=SR)
+    assert new is not old
+    np.testing.assert_allclose(new, 0.5)
+
+
+def test_uncached_decode_is_writable(wav):
+    y, _ = load_audio(wav, sr=SR, use_cache=False)
+    assert y.flags.writeable
+    assert not audio_io._cache
+
+
+def test_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_io, 'CACHE_SIZE', 2)
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / f'{i}.wav')
+        sf.write(path, np.zeros(SR, dtype=np.float32), SR)
+        paths.append(path)
+        load_audio(path, sr=SR)
+    assert len(audio_io._cache) == 2
+    assert os.path.abspath(paths[0]) not in {key[0] for key in audio_io._cache}
+
+
+def test_clear_cache(wav):
+    first, _ = load_audio(wav, sr=SR)
+    clear_cache()
+    assert load_audio(wav, sr=SR)[0] is not first
@@ -0,0 +1,129 @@
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from dataset_cache import CropCache, top_level_label, scan_media, _file_signature, MANIFEST_NAME
+
+
+def crop(value):
+    return np.full((8, 8, 3), value, dtype=np.uint8)
+
+
+def source(tmp_path, name, content=b'x'):
+    path = tmp_path / 'data' / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return str(path)
+
+
+def item(path, label, key=None):
+    size, mtime = _file_signature(path)
+    return {'key': key or path, 'source': path, 'label': label, 'size': size, 'mtime': mtime}
+
+
+def test_manifest_round_trip(tmp_path):
+    image = source(tmp_path, 'real/a.jpg')
+    video = source(tmp_path, 'fake/b.mp4')
+    cache = CropCache(str(tmp_path / 'cache'))
+    cache._write_shard([item(image, 0), item(video, 1, video + '#0'), item(video, 1, video + '#5')],
+                       [crop(1), crop(2), crop(3)])
+
+    reloaded = CropCache(str(tmp_path / 'cache'))
+    assert reloaded.entries == cache.entries
+    assert reloaded.keys_for([video, image]) == [video + '#0', video + '#5', image]
+    assert reloaded.is_current(image, 0) and reloaded.is_current(video)
+
+    keys, crops, labels = next(reloaded.iter_batches(reloaded.keys_for([image, video]), batch_size=8))
+    assert keys == [image, video + '#0', video + '#5']
+    assert crops[:, 0, 0, 0].tolist() == [1, 2, 3]
+    assert labels.tolist() == [0, 1, 1]
+
+
+def test_legacy_path_manifest(tmp_path):
+    image = source(tmp_path, 'real/a.jpg')
+    cache_dir = tmp_path / 'cache'
+    cache_dir.mkdir()
+    np.save(str(cache_dir / 'shard_00000.npy'), np.stack([crop(7)]))
+    size, mtime = _file_signature(image)
+    legacy = {'path': image, 'label': 0, 'size': size, 'mtime': mtime}
+    (cache_dir / MANIFEST_NAME).write_text(json.dumps({'shard': 'shard_00000.npy', 'shard_id': 0, 'items': [legacy]}) + "\n")
+
+    cache = CropCache(str(cache_dir))
+    assert cache.keys_for([image]) == [image]
+    assert cache.is_current(image, 0)
+    keys, crops, _ = next(cache.iter_batches([image]))
+    assert keys == [image] and crops[0, 0, 0, 0] == 7
+    # New shards continue the numbering
+    assert cache._shard_counter == 1
+
+
+def test_later_shard_replaces_a_recropped_source(tmp_path):
+    video = source(tmp_path, 'fake/b.mp4')
+    cache = CropCache(str(tmp_path / 'cache'))
+    cache._write_shard([item(video, 1, video + '#0'), item(video, 1, video + '#9')], [crop(1), crop(2)])
+    cache._write_shard([item(video, 1, video + '#4')], [crop(3)])
+
+    reloaded = CropCache(str(tmp_path / 'cache'))
+    assert reloaded.keys_for([video]) == [video + '#4']
+    assert set(reloaded.entries) == {video + '#4'}
+
+
+def test_torn_line_and_missing_shard_are_ignored(tmp_path):
+    image = source(tmp_path, 'real/a.jpg')
+    cache = CropCache(str(tmp_path / 'cache'))
+    cache._write_shard([item(image, 0)], [crop(1)])
+    with open(cache.manifest_path, 'a') as f:
+        f.write(json.dumps({'shard': 'shard_00009.npy', 'shard_id': 9, 'items': []}) + "\n")
+        f.write('{"shard": "shard_000')
+
+    reloaded = CropCache(str(tmp_path / 'cache'))
+    assert reloaded.keys_for([image]) == [image]
+    assert reloaded._shard_counter == 1
+
+
+def test_is_current_checks_label_and_signature(tmp_path):
+    image = source(tmp_path, 'real/a.jpg')
+    cache = CropCache(str(tmp_path / 'cache'))
+    cache._write_shard([item(image, 0)], [crop(1)])
+
+    assert cache.is_current(image, 0)
+    assert not cache.is_current(image, 1)
+    assert not cache.is_current(str(tmp_path / 'data' / 'missing.jpg'))
+
+    with open(image, 'ab') as f:
+        f.write(b'changed')
+    assert not cache.is_current(image)
+    os.remove(image)
+    assert not cache.is_current(image)
+
+
+def test_shard_groups_are_in_file_order(tmp_path):
+    paths = [source(tmp_path, f'real/{i}.jpg') for i in range(3)]
+    cache = CropCache(str(tmp_path / 'cache'))
+    cache._write_shard([item(p, 0) for p in paths], [crop(i) for i in range(3)])
+
+    ((shard, indices, labels),) = cache.shard_groups([paths[2], paths[0], 'unknown'])
+    assert shard.endswith('shard_00000.npy')
+    assert indices == [0, 2]
+    assert labels == [0, 0]
+
+
+def test_top_level_label(tmp_path):
+    root = str(tmp_path)
+    assert top_level_label(root, os.path.join(root, 'Fake', 'x.jpg')) == 1
+    assert top_level_label(root, os.path.join(root, 'real', '1', 'x.jpg')) == 0  # Nested folders never relabel
+    assert top_level_label(root, os.path.join(root, 'misc', 'x.jpg')) is None
+    assert top_level_label(root, os.path.join(root, 'x.jpg')) is None
+
+
+def test_scan_media_skips_hidden_dirs_and_other_files(tmp_path):
+    source(tmp_path, 'real/a.jpg')
+    source(tmp_path, 'fake/b.mp4')
+    source(tmp_path, 'notes.txt')
+    source(tmp_path, '.deepshield_cache/c.jpg')
+    items = scan_media(str(tmp_path / 'data'))
+    assert [(os.path.basename(path), label) for path, label in items] == [('b.mp4', 1), ('a.jpg', 0)]
@@ -0,0 +1,166 @@
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from ensemble import EnsembleMember, ModelEnsemble, normalize, shared_views
+
+
+class FakeModel:
+    def __init__(self, score, delay=0.0, gate=None, error=None):
+        self.score = score
+        self.delay = delay
+        self.gate = gate
+        self.error = error
+        self.calls = 0
+
+    def predict(self, x):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.delay:
+            time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return np.full((len(x), 1), self.score)
+
+
+def images(n=2):
+    return [np.full((40, 50, 3), 100 + i, dtype=np.uint8) for i in range(n)]
+
+
+def member(name, model, weight=1.0, required=False):
+    return EnsembleMember(name, model, input_size=(32, 32), weight=weight, required=required)
+
+
+def test_normalize_modes():
+    rgb = np.array([[[0, 127, 255]]], dtype=np.uint8)
+    assert normalize(rgb, 'xception')[0, 0].tolist() == pytest.approx([-1.0, 127 / 127.5 - 1, 1.0])
+    assert normalize(rgb, 'efficientnet')[0, 0].tolist() == [0.0, 127.0, 255.0]
+    # Caffe: RGB -> BGR minus the ImageNet mean
+    assert normalize(rgb, 'caffe')[0, 0].tolist() == pytest.approx([255 - 103.939, 127 - 116.779, 0 - 123.68])
+    with pytest.raises(ValueError):
+        normalize(rgb, 'unknown')
+
+
+def test_shared_views_resize_once_per_size():
+    views = shared_views(images(3), [(32, 32), (16, 24), (32, 32)])
+    assert set(views) == {(32, 32), (16, 24)}
+    assert views[(16, 24)].shape == (3, 24, 16, 3)
+
+
+def test_weighted_mean_without_budget():
+    ensemble = ModelEnsemble(max_workers=2)
+    ensemble.register(member('xception', FakeModel(0.2), weight=1.0, required=True))
+    ensemble.register(member('resnet', FakeModel(0.6), weight=3.0))
+    try:
+        scores, outcome = ensemble.predict(images())
+        assert scores.tolist() == pytest.approx([0.5, 0.5])
+        assert outcome['xception'].tolist() == pytest.approx([0.2, 0.2])
+        assert ensemble.report()['resnet']['runs'] == 1
+    finally:
+        ensemble.close()
+
+
+def test_slow_optional_member_is_skipped_under_budget():
+    slow = FakeModel(0.9)
+    ensemble = ModelEnsemble(max_workers=2, latency_budget_ms=50)
+    ensemble.register(member('xception', FakeModel(0.2), required=True))
+    optional = ensemble.register(member('resnet', slow))
+    optional.latency_ema = 0.5  # Recently 500 ms, over the 50 ms budget
+    try:
+        scores, outcome = ensemble.predict(images())
+        assert outcome['resnet'] == 'skipped'
+        assert slow.calls == 0
+        assert scores.tolist() == pytest.approx([0.2, 0.2])
+        assert ensemble.report()['resnet']['skipped'] == 1
+    finally:
+        ensemble.close()
+
+
+def test_member_still_running_at_the_deadline_is_dropped():
+    gate = threading.Event()
+    ensemble = ModelEnsemble(max_workers=2, latency_budget_ms=50)
+    ensemble.register(member('xception', FakeModel(0.2), required=True))
+    ensemble.register(member('resnet', FakeModel(0.9, gate=gate)))
+    try:
+        scores, outcome = ensemble.predict(images())
+        assert outcome['resnet'] == 'dropped'
+        assert scores.tolist() == pytest.approx([0.2, 0.2])
+    finally:
+        gate.set()
+        ensemble.close()
+
+
+def test_busy_pool_skips_optional_members_but_never_the_required_one():
+    gate = threading.Event()
+    required = FakeModel(0.2)
+    ensemble = ModelEnsemble(max_workers=1, latency_budget_ms=50)
+    ensemble.register(member('xception', required, required=True))
+    ensemble.register(member('resnet', FakeModel(0.9, gate=gate)))
+    try:
+        # The first request leaves resnet holding the only worker
+        assert ensemble.predict(images())[1]['resnet'] == 'dropped'
+
+        started = time.perf_counter()
+        scores, outcome = ensemble.predict(images())
+        assert outcome['resnet'] == 'skipped'
+        assert scores.tolist() == pytest.approx([0.2, 0.2])
+        assert required.calls == 2
+        # The required member ran inline instead of queueing behind the blocked worker
+        assert time.perf_counter() - started < 1.0
+    finally:
+        gate.set()
+        ensemble.close()
+
+
+def test_worker_is_released_when_a_dropped_member_finishes():
+    gate = threading.Event()
+    ensemble = ModelEnsemble(max_workers=1, latency_budget_ms=50)
+    ensemble.register(member('xception', FakeModel(0.2), required=True))
+    ensemble.register(member('resnet', FakeModel(0.9, gate=gate)))
+    try:
+        ensemble.predict(images())
+        assert ensemble._in_flight == 1
+        gate.set()
+        deadline = time.time() + 5
+        while ensemble._in_flight and time.time() < deadline:
+            time.sleep(0.01)
+        assert ensemble._in_flight == 0
+        assert ensemble.members[1].latency_ema is not None
+    finally:
+        ensemble.close()
+
+
+def test_failed_member_is_left_out_of_the_fused_score():
+    ensemble = ModelEnsemble(max_workers=2)
+    ensemble.register(member('xception', FakeModel(0.2), required=True))
+    ensemble.register(member('resnet', FakeModel(0.9, error=RuntimeError("out of memory"))))
+    try:
+        scores, outcome = ensemble.predict(images())
+        assert outcome['resnet'] == 'failed'
+        assert scores.tolist() == pytest.approx([0.2, 0.2])
+        assert ensemble.report()['resnet']['failed'] == 1
+    finally:
+        ensemble.close()
+
+
+def test_no_finished_member_raises():
+    ensemble = ModelEnsemble(max_workers=1)
+    ensemble.register(member('xception', FakeModel(0.2, error=RuntimeError("broken")), required=True))
+    try:
+        with pytest.raises(RuntimeError):
+            ensemble.predict(images())
+    finally:
+        ensemble.close()
+
+
+def test_latency_ema():
+    m = member('xception', FakeModel(0.2))
+    m.record_latency(1.0)
+    assert m.latency_ema == 1.0
+    m.record_latency(2.0, alpha=0.5)
+    assert m.latency_ema == 1.5
@@ -0,0 +1,141 @@
+import time
+
+import pytest
+
+from history_store import DetectionHistory
+
+
+def detection(kind='image', is_deepfake=False, confidence=80.0, raw_score=0.2, model_used='xception'):
+    return {
+        'type': kind,
+        'result': {'is_deepfake': is_deepfake, 'confidence': confidence, 'raw_score': raw_score,
+                   'model_used': model_used}
+    }
+
+
+@pytest.fixture
+def history(tmp_path):
+    store = DetectionHistory(str(tmp_path / 'history.sqlite3'), recent_size=3, flush_interval=0.05, cache_ttl=0)
+    yield store
+    store.close()
+
+
+def test_empty_stats(history):
+    stats = history.stats()
+    assert stats['total_analyses'] == 0
+    assert stats['deepfake_rate'] == 0.0
+    assert stats['accuracy_rate'] is None
+    assert stats['recent_detections'] == []
+
+
+def test_ignores_empty_results(history):
+    assert history.record(None) is False
+    assert history.record({'type': 'image'}) is False
+
+
+def test_aggregates_by_type_and_source(history):
+    history.record(detection('image', True, 90.0), source='web', processing_time=1.0)
+    history.record(detection('image', False, 70.0), source='telegram', processing_time=3.0)
+    history.record(detection('video', True, 80.0), source='web')
+    assert history.flush()
+
+    stats = history.stats()
+    assert stats['total_analyses'] == 3
+    assert stats['deepfakes_detected'] == 2
+    assert stats['deepfake_rate'] == round(2 / 3 * 100, 2)
+    assert stats['average_confidence'] == 80.0
+    assert stats['average_processing_time'] == 2.0  # Only results with a processing time count
+    assert stats['by_type'] == {'image': {'total': 2, 'deepfakes': 1}, 'video': {'total': 1, 'deepfakes': 1}}
+    assert stats['by_source'] == {'web': {'total': 2, 'deepfakes': 2}, 'telegram': {'total': 1, 'deepfakes': 0}}
+
+
+def test_rolling_windows_and_daily_buckets(history):
+    history.record(detection(is_deepfake=True))
+    history.record(detection(is_deepfake=False))
+    assert history.flush()
+
+    # An event from two hours ago only counts towards the 24 hour window
+    old = time.time() - 2 * 3600
+    history._write_batch([(old, 'image', 'web', 1, 50.0, 0.6, 'xception', None)])
+
+    windows = history.stats()['windows']
+    assert windows['last_hour'] == {'total': 2, 'deepfakes': 1, 'deepfake_rate': 50.0}
+    assert windows['last_24h'] == {'total': 3, 'deepfakes': 2, 'deepfake_rate': round(2 / 3 * 100, 2)}
+    assert sum(day['total'] for day in history.stats()['daily']) == 3
+
+
+def test_recent_detections_ring_buffer(history):
+    for i in range(5):
+        history.record(detection(confidence=float(i)))
+    assert history.flush()
+
+    recent = history.stats()['recent_detections']
+    assert [item['confidence'] for item in recent] == [4.0, 3.0, 2.0]  # recent_size=3, newest first
+
+
+def test_flush_waits_for_the_batch_in_flight(history):
+    committed = []
+    write_batch = history._write_batch
+
+    def slow_write(batch):
+        time.sleep(0.2)  # Queue already empty, batch not yet committed
+        write_batch(batch)
+        committed.extend(batch)
+
+    history._write_batch = slow_write
+    history.record(detection())
+    assert history.flush(timeout=5)
+    assert len(committed) == 1
+    assert history.stats()['total_analyses'] == 1
+
+
+def test_flush_times_out(history):
+    history._write_batch = lambda batch: time.sleep(1.0)
+    history.record(detection())
+    assert history.flush(timeout=0.05) is False
+
+
+def test_write_errors_do_not_block_flush(history):
+    def failing_write(batch):
+        raise RuntimeError("disk full")
+
+    history._write_batch = failing_write
+    history.record(detection())
+    assert history.flush(timeout=5)
+
+
+def test_stats_returns_a_copy_of_the_cache(tmp_path):
+    store = DetectionHistory(str(tmp_path / 'history.sqlite3'), cache_ttl=60)
+    try:
+        first = store.stats()
+        first['cascade'] = {'per_process': True}
+        assert 'cascade' not in store.stats()
+    finally:
+        store.close()
+
+
+def test_full_queue_drops_and_counts(tmp_path):
+    store = DetectionHistory(str(tmp_path / 'history.sqlite3'), max_pending=1, flush_interval=0.05)
+    try:
+        store._write_batch = lambda batch: time.sleep(0.5)
+        results = [store.record(detection()) for _ in range(5)]
+        assert results.count(False) == store.dropped
+        assert store.dropped >= 1
+    finally:
+        store.close()
+
+
+def test_history_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'history.sqlite3')
+    web = DetectionHistory(path, cache_ttl=0, flush_interval=0.05)
+    bot = DetectionHistory(path, cache_ttl=0, flush_interval=0.05)
+    try:
+        web.record(detection(), source='web')
+        bot.record(detection(), source='telegram')
+        assert web.flush() and bot.flush()
+        assert web.stats()['by_source'] == bot.stats()['by_source'] == {
+            'web': {'total': 1, 'deepfakes': 0}, 'telegram': {'total': 1, 'deepfakes': 0}
+        }
+    finally:
+        web.close()
+        bot.close()
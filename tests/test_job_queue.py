@@ -0,0 +1,238 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from job_queue import JobQueue, QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED, FINISHED_STATES
+
+
+def wait_for(jobs, job_id, states=FINISHED_STATES, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        snapshot = jobs.get(job_id)
+        if snapshot is not None and snapshot['status'] in states:
+            return snapshot
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {states}: {jobs.get(job_id)}")
+
+
+def dead_pid():
+    proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proc.wait()
+    return proc.pid
+
+
+def test_completed_job_keeps_result_and_full_progress():
+    jobs = JobQueue(lambda job, progress: {'verdict': 'real'}, max_workers=1)
+    job_id = jobs.submit('image', None)['id']
+    snapshot = wait_for(jobs, job_id)
+    assert snapshot['status'] == COMPLETED
+    assert snapshot['result'] == {'verdict': 'real'}
+    assert snapshot['progress'] == 1.0
+    assert snapshot['started_at'] is not None and snapshot['finished_at'] is not None
+
+
+def test_handler_returning_none_fails():
+    jobs = JobQueue(lambda job, progress: None, max_workers=1)
+    snapshot = wait_for(jobs, jobs.submit('image', None)['id'])
+    assert snapshot['status'] == FAILED
+    assert snapshot['error'] == 'Detection failed'
+
+
+def test_handler_exception_fails_with_message():
+    def handler(job, progress):
+        raise ValueError("corrupt upload")
+
+    jobs = JobQueue(handler, max_workers=1)
+    snapshot = wait_for(jobs, jobs.submit('video', None)['id'])
+    assert snapshot['status'] == FAILED
+    assert snapshot['error'] == 'corrupt upload'
+
+
+def test_finished_job_file_is_removed(tmp_path):
+    upload = tmp_path / 'upload.mp4'
+    upload.write_bytes(b'x')
+    jobs = JobQueue(lambda job, progress: {}, max_workers=1)
+    wait_for(jobs, jobs.submit('video', str(upload))['id'])
+    assert not upload.exists()
+
+
+def test_cancel_queued_job_never_starts():
+    release = threading.Event()
+    started = []
+
+    def handler(job, progress):
+        started.append(job.id)
+        release.wait(5)
+        return {}
+
+    jobs = JobQueue(handler, max_workers=1)
+    first = jobs.submit('video', None)['id']
+    wait_for(jobs, first, states=(RUNNING,))
+    second = jobs.submit('video', None)['id']
+    assert jobs.get(second)['status'] == QUEUED
+
+    assert jobs.cancel(second)['status'] == CANCELLED
+    release.set()
+    wait_for(jobs, first)
+    time.sleep(0.05)
+    assert started == [first]
+    assert jobs.get(second)['status'] == CANCELLED
+
+
+def test_cancel_running_job_stops_at_next_checkpoint():
+    def handler(job, progress):
+        for i in range(500):
+            if progress('inference', i, 500) is False:
+                return {'partial': True}
+            time.sleep(0.005)
+        return {'partial': False}
+
+    jobs = JobQueue(handler, max_workers=1)
+    job_id = jobs.submit('video', None)['id']
+    wait_for(jobs, job_id, states=(RUNNING,))
+    jobs.cancel(job_id)
+    snapshot = wait_for(jobs, job_id)
+    assert snapshot['status'] == CANCELLED
+    assert snapshot['result'] is None
+
+
+def test_cancel_finished_job_is_a_no_op():
+    jobs = JobQueue(lambda job, progress: {'ok': True}, max_workers=1)
+    job_id = jobs.submit('image', None)['id']
+    wait_for(jobs, job_id)
+    assert jobs.cancel(job_id)['status'] == COMPLETED
+
+
+def test_progress_follows_stage_spans_and_never_moves_back():
+    seen = []
+
+    def handler(job, progress):
+        for stage, done, total in (('detect', 0, 1), ('preprocess', 5, 10), ('preprocess', 10, 10),
+                                   ('inference', 0, 10), ('inference', 5, 10)):
+            progress(stage, done, total)
+            seen.append(job.progress)
+        return {}
+
+    jobs = JobQueue(handler, max_workers=1, stage_spans={'preprocess': (0.0, 0.5), 'inference': (0.5, 1.0)})
+    wait_for(jobs, jobs.submit('video', None)['id'])
+    assert seen == [0.0, 0.25, 0.5, 0.5, 0.75]
+
+
+def test_unknown_job_is_none():
+    jobs = JobQueue(lambda job, progress: {}, max_workers=1)
+    assert jobs.get('missing') is None
+    assert jobs.cancel('missing') is None
+
+
+def test_expired_jobs_are_purged():
+    jobs = JobQueue(lambda job, progress: {}, max_workers=1, result_ttl=0.2)
+    job_id = jobs.submit('image', None)['id']
+    wait_for(jobs, job_id)
+    time.sleep(0.3)
+    assert jobs.purge_expired() == 1
+    assert jobs.get(job_id) is None
+
+
+def test_pid_alive():
+    assert JobQueue._pid_alive(None) is False
+    assert JobQueue._pid_alive(0) is False
+    assert JobQueue._pid_alive(os.getpid()) is True
+    assert JobQueue._pid_alive(dead_pid()) is False
+
+
+def _insert_job(db_path, job_id, status, owner_pid, file_path=None):
+    db = sqlite3.connect(db_path)
+    db.execute(
+        "INSERT INTO jobs (id, kind, file_path, status, progress, created_at, owner_pid) VALUES (?, ?, ?, ?, 0, ?, ?)",
+        (job_id, 'video', file_path, status, time.time(), owner_pid)
+    )
+    db.commit()
+    db.close()
+
+
+def test_recovery_fails_jobs_of_dead_owners_only(tmp_path):
+    db_path = str(tmp_path / 'jobs.sqlite3')
+    JobQueue(lambda job, progress: {}, max_workers=1, db_path=db_path)  # Creates the schema
+    upload = tmp_path / 'orphan.mp4'
+    upload.write_bytes(b'x')
+    _insert_job(db_path, 'orphan', RUNNING, dead_pid(), str(upload))
+    _insert_job(db_path, 'sibling', RUNNING, os.getpid())
+
+    jobs = JobQueue(lambda job, progress: {}, max_workers=1, db_path=db_path)
+    orphan = jobs.get('orphan')
+    assert orphan['status'] == FAILED
+    assert orphan['error'] == 'Interrupted by server restart'
+    assert not upload.exists()
+    assert jobs.get('sibling')['status'] == RUNNING
+
+
+def test_old_store_gains_ownership_and_cancel_columns(tmp_path):
+    db_path = str(tmp_path / 'jobs.sqlite3')
+    db = sqlite3.connect(db_path)
+    db.execute(
+        """CREATE TABLE jobs (
+            id TEXT PRIMARY KEY, kind TEXT, file_path TEXT, status TEXT, progress REAL, stage TEXT,
+            result TEXT, error TEXT, created_at REAL, started_at REAL, finished_at REAL
+        )"""
+    )
+    db.execute("INSERT INTO jobs (id, kind, status, progress, created_at) VALUES ('old', 'video', 'queued', 0, ?)",
+               (time.time(),))
+    db.commit()
+    db.close()
+
+    jobs = JobQueue(lambda job, progress: {}, max_workers=1, db_path=db_path)
+    db = sqlite3.connect(db_path)
+    columns = {row[1] for row in db.execute("PRAGMA table_info(jobs)")}
+    db.close()
+    assert {'owner_pid', 'cancel_requested'} <= columns
+    # Without an owner it counts as interrupted
+    assert jobs.get('old')['status'] == FAILED
+
+
+def test_cancel_from_another_process_store(tmp_path):
+    db_path = str(tmp_path / 'jobs.sqlite3')
+    running = threading.Event()
+
+    def handler(job, progress):
+        running.set()
+        for i in range(1000):
+            if progress('inference', i, 1000) is False:
+                return {}
+            time.sleep(0.005)
+        return {}
+
+    owner = JobQueue(handler, max_workers=1, db_path=db_path, sync_interval=0.0)
+    sibling = JobQueue(lambda job, progress: {}, max_workers=1, db_path=db_path)
+    job_id = owner.submit('video', None)['id']
+    assert running.wait(5)
+
+    assert sibling.get(job_id)['status'] == RUNNING
+    sibling.cancel(job_id)
+    assert wait_for(owner, job_id)['status'] == CANCELLED
+    assert wait_for(sibling, job_id)['status'] == CANCELLED
+
+
+@pytest.mark.parametrize('sync_interval, expected', [(60.0, 1), (0.0, 50)])
+def test_progress_sync_is_throttled(tmp_path, sync_interval, expected):
+    db_path = str(tmp_path / 'jobs.sqlite3')
+    done = threading.Event()
+
+    def handler(job, progress):
+        for i in range(50):
+            progress('inference', i, 50)
+        done.set()
+        return {}
+
+    jobs = JobQueue(handler, max_workers=1, db_path=db_path, sync_interval=sync_interval)
+    writes = []
+    persist = jobs._persist
+    jobs._persist = lambda job: (writes.append(job.stage), persist(job))
+    wait_for(jobs, jobs.submit('video', None)['id'])
+    assert done.is_set()
+    # Submit, start and finish always persist; progress only on a stage change or once the interval passed
+    assert len(writes) - 3 == expected
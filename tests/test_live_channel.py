@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from live_channel import LiveAnalysisState, LiveStateRegistry
+
+LIVE_CONFIG = {'thumbnail_size': (64, 48), 'change_threshold': 4.0, 'max_reuse_frames': 3, 'ema_alpha': 0.5}
+
+
+class FakeDetector:
+    """Returns the queued raw scores, one per fresh inference"""
+
+    def __init__(self, scores):
+        self.scores = list(scores)
+        self.calls = 0
+        self.model_configs = {'live': LIVE_CONFIG, 'image': {'threshold': 0.5}}
+
+    def detect_image_array(self, frame, source=None):
+        self.calls += 1
+        score = self.scores.pop(0)
+        return {'result': {'raw_score': score, 'is_deepfake': score > 0.5, 'model_used': 'fake'}}
+
+    def _generate_summary(self, prediction, kind):
+        return ''
+
+
+def frame(value):
+    return np.full((120, 160, 3), value, dtype=np.uint8)
+
+
+def test_unchanged_frames_reuse_the_last_score():
+    detector = FakeDetector([0.8])
+    state = LiveAnalysisState(detector)
+
+    first = state.analyze(frame(100))
+    second = state.analyze(frame(101))  # Mean difference 1 < change_threshold
+
+    assert detector.calls == 1
+    assert first['result']['reused_previous'] is False
+    assert second['result']['reused_previous'] is True
+    assert second['result']['raw_score'] == pytest.approx(0.8)
+    assert second['live_session'] == {'frames': 2, 'inferences': 1, 'inference_rate': 0.5}
+
+
+def test_changed_frames_run_inference_and_smooth_with_ema():
+    detector = FakeDetector([0.8, 0.2, 0.6])
+    state = LiveAnalysisState(detector)
+
+    scores = [state.analyze(frame(value))['result'] for value in (0, 100, 200)]
+
+    assert detector.calls == 3
+    assert [s['frame_score'] for s in scores] == pytest.approx([0.8, 0.2, 0.6])
+    # alpha = 0.5: 0.8 -> 0.5 -> 0.55
+    assert [s['raw_score'] for s in scores] == pytest.approx([0.8, 0.5, 0.55])
+    assert [s['is_deepfake'] for s in scores] == [True, False, True]
+    assert scores[-1]['confidence'] == pytest.approx(55.0)
+
+
+def test_reuse_is_capped_by_max_reuse_frames():
+    detector = FakeDetector([0.7, 0.7])
+    state = LiveAnalysisState(detector)
+
+    reused = [state.analyze(frame(50))['result']['reused_previous'] for _ in range(5)]
+
+    # One inference, max_reuse_frames (3) reuses, then a forced inference
+    assert reused == [False, True, True, True, False]
+    assert detector.calls == 2
+
+
+def test_slow_drift_is_measured_against_the_last_analysed_frame():
+    detector = FakeDetector([0.3, 0.3])
+    state = LiveAnalysisState(detector)
+
+    results = [state.analyze(frame(value))['result'] for value in (100, 103, 106)]
+
+    # Each step differs by 3, but 106 is 6 away from the analysed 100
+    assert [r['reused_previous'] for r in results] == [False, True, False]
+    assert results[2]['frame_change'] == pytest.approx(6.0)
+
+
+def test_failed_inference_returns_none_and_keeps_state():
+    detector = FakeDetector([])
+    detector.detect_image_array = lambda frame, source=None: None
+    state = LiveAnalysisState(detector)
+    assert state.analyze(frame(0)) is None
+    assert state.inferences == 0 and state.smoothed_score is None
+
+
+class Session:
+    def __init__(self):
+        self.last_seen = time.time()
+
+
+def test_registry_evicts_least_recently_used_sessions():
+    registry = LiveStateRegistry(Session, max_entries=2)
+    a = registry.get('a')
+    registry.get('b')
+    assert registry.get('a') is a  # 'a' is now the most recent
+    registry.get('c')
+
+    assert len(registry) == 2
+    assert registry.evicted == 1
+    assert registry.get('a') is a
+    assert 'b' not in registry._states
+
+
+def test_registry_expires_idle_sessions():
+    registry = LiveStateRegistry(Session, idle_timeout=60)
+    stale = registry.get('stale')
+    stale.last_seen -= 120
+    registry.get('fresh')
+    assert len(registry) == 1
+    assert registry.get('stale') is not stale
@@ -0,0 +1,73 @@
+import json
+import os
+import sys
+
+import pytest
+
+import thread_tuning
+from thread_tuning import DEFAULT_PROFILE, candidate_profiles, blas_env, load_profile, save_profile, apply_profile
+
+
+def test_candidates_start_with_library_defaults():
+    candidates = candidate_profiles(cpu_count=16)
+    assert candidates[0] == DEFAULT_PROFILE
+    assert all(profile['job_workers'] for profile in candidates[1:])
+
+
+@pytest.mark.parametrize('cpu_count, levels', [(1, [1]), (2, [1, 2]), (16, [1, 2, 4]), (64, [1, 2, 4, 16])])
+def test_candidate_concurrency_levels(cpu_count, levels):
+    tuned = candidate_profiles(cpu_count=cpu_count)[1:]
+    assert sorted({profile['job_workers'] for profile in tuned}) == levels
+    # Two inter-op settings per level
+    assert len(tuned) == 2 * len(levels)
+
+
+def test_candidates_share_the_cores_between_workers():
+    for profile in candidate_profiles(cpu_count=16)[1:]:
+        share = 16 // profile['job_workers']
+        assert profile['tf_intra_op_threads'] == profile['cv2_threads'] == profile['blas_threads'] == share
+        assert profile['tf_inter_op_threads'] in (1, 2)
+        assert profile['bot_executor_workers'] == profile['soundtrack_workers'] == profile['job_workers']
+        assert profile['ensemble_workers'] == min(profile['job_workers'], 3)
+        assert set(profile) == set(DEFAULT_PROFILE)
+
+
+def test_blas_env():
+    assert blas_env(DEFAULT_PROFILE) == {}
+    env = blas_env(dict(DEFAULT_PROFILE, blas_threads=3))
+    assert set(env) == set(thread_tuning.BLAS_ENV_VARS)
+    assert set(env.values()) == {'3'}
+
+
+def test_profile_round_trip(tmp_path):
+    path = str(tmp_path / 'threads.json')
+    profile = candidate_profiles(cpu_count=8)[1]
+    save_profile(profile, path, meta={'throughput_per_s': 1.5})
+    assert load_profile(path) == profile
+    with open(path) as f:
+        assert json.load(f)['meta'] == {'throughput_per_s': 1.5}
+
+
+def test_load_profile_defaults_and_unknown_keys(tmp_path, monkeypatch):
+    monkeypatch.delenv('DEEPSHIELD_THREAD_PROFILE', raising=False)
+    assert load_profile() == DEFAULT_PROFILE
+
+    path = tmp_path / 'threads.json'
+    path.write_text(json.dumps({'job_workers': 3, 'gpu_threads': 9}))
+    monkeypatch.setenv('DEEPSHIELD_THREAD_PROFILE', str(path))
+    assert load_profile() == dict(DEFAULT_PROFILE, job_workers=3)
+
+
+def test_apply_profile_reports_blas_only_when_threadpoolctl_applied_it(monkeypatch):
+    for name in thread_tuning.BLAS_ENV_VARS:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setitem(sys.modules, 'threadpoolctl', None)  # Import fails as if not installed
+
+    applied = apply_profile(dict(DEFAULT_PROFILE, blas_threads=2))
+    assert 'blas_threads' not in applied
+    # Processes started afterwards still get the limit
+    assert os.environ['OMP_NUM_THREADS'] == '2'
+
+
+def test_apply_empty_profile_changes_nothing():
+    assert apply_profile(DEFAULT_PROFILE) == {}
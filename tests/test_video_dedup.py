@@ -0,0 +1,92 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+for module in ('cv2', 'librosa', 'soundfile', 'PIL', 'matplotlib', 'seaborn', 'sklearn', 'joblib', 'requests'):
+    pytest.importorskip(module)
+
+from accurate_deepfake_detector import AccurateDeepfakeDetector
+
+SIZE = (160, 120)
+
+
+def make_detector(frames, **video_config):
+    """Detector shell without models: no face detector, frames served from memory"""
+    detector = AccurateDeepfakeDetector.__new__(AccurateDeepfakeDetector)
+    detector.face_detector = None
+    detector.model_configs = {'video': dict({
+        'input_size': SIZE,
+        'frame_sample_rate': 1,
+        'max_frames': 100,
+        'dedup_threshold': 3.0,
+        'dedup_thumbnail_size': (64, 48),
+        'dedup_max_skipped': 100,
+        'dedup_fallback_stride': 10
+    }, **video_config)}
+
+    def read_frames(video_path):
+        yield from frames
+
+    detector._read_frames = read_frames
+    return detector
+
+
+def static_frames(count, base=100):
+    """Near-identical frames; pixel (0, 0) carries the frame index so kept frames can be identified"""
+    frames = []
+    for i in range(count):
+        frame = np.full((SIZE[1], SIZE[0], 3), base, dtype=np.uint8)
+        frame[0, 0] = i * 10
+        frames.append(frame)
+    return frames
+
+
+def kept_indices(detector, stats=None):
+    frames = list(detector._iter_video_frames('clip.mp4', stats))
+    return [int(round((frame[0, 0, 0] * 0.5 + 0.5) * 255 / 10)) for frame in frames]
+
+
+def test_distinct_frames_are_all_kept():
+    frames = [np.full((SIZE[1], SIZE[0], 3), value, dtype=np.uint8) for value in (0, 50, 100, 150, 200)]
+    stats = {}
+    assert len(list(make_detector(frames)._iter_video_frames('clip.mp4', stats))) == 5
+    assert stats == {'frames_decoded': 5, 'duplicates_skipped': 0}
+
+
+def test_near_duplicates_are_skipped():
+    stats = {}
+    assert kept_indices(make_detector(static_frames(20)), stats) == [0]
+    assert stats == {'frames_decoded': 20, 'duplicates_skipped': 19}
+
+
+def test_stride_sampling_once_the_skip_budget_is_spent():
+    stats = {}
+    detector = make_detector(static_frames(20), dedup_max_skipped=4, dedup_fallback_stride=3)
+    # Frames 1-4 spend the budget, then one duplicate in three is kept
+    assert kept_indices(detector, stats) == [0, 5, 8, 11, 14, 17]
+    assert stats['duplicates_skipped'] == 14
+
+
+def test_a_distinct_frame_restarts_the_stride():
+    frames = static_frames(12)
+    frames[6] = np.full_like(frames[6], 200)
+    frames[6][0, 0] = 60
+    detector = make_detector(frames, dedup_max_skipped=2, dedup_fallback_stride=3)
+    # 0 kept, 1-2 skipped, 3 kept by stride; 6 and 7 differ from the last kept frame and restart the stride
+    assert kept_indices(detector) == [0, 3, 6, 7, 10]
+
+
+def test_max_frames_bounds_decoding():
+    stats = {}
+    detector = make_detector(static_frames(50), dedup_max_skipped=0, dedup_fallback_stride=2, max_frames=3)
+    assert kept_indices(detector, stats) == [0, 2, 4]
+    assert stats['frames_decoded'] == 5
+
+
+def test_dedup_disabled():
+    assert kept_indices(make_detector(static_frames(6), dedup_threshold=0)) == [0, 1, 2, 3, 4, 5]
+
+
+def test_sample_rate_applies_before_dedup():
+    detector = make_detector(static_frames(12), frame_sample_rate=3, dedup_max_skipped=0, dedup_fallback_stride=2)
+    # Sampled frames 0, 3, 6, 9; every second sampled duplicate is kept
+    assert kept_indices(detector) == [0, 6]
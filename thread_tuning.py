@@ -0,0 +1,146 @@
+"""
+Thread topology of the detection pipeline.
+
+TensorFlow, OpenCV and the BLAS/OpenMP pool behind NumPy/librosa each size
+themselves to the whole machine, and the job queue, the bot's executor and
+the ensemble add their own threads on top. A profile caps each of them:
+
+    {
+        "tf_intra_op_threads": 4,     # Threads inside one TF op
+        "tf_inter_op_threads": 2,     # TF ops run concurrently
+        "cv2_threads": 2,             # cv2.setNumThreads
+        "blas_threads": 2,            # OpenMP/OpenBLAS/MKL pools
+        "job_workers": 2,             # Web app job queue threads
+        "bot_executor_workers": 2,    # Telegram bot detection threads
+        "ensemble_workers": 3,        # Concurrent optional ensemble members
+        "soundtrack_workers": 2       # Concurrent soundtrack branches (multimodal video)
+    }
+
+Missing or null entries keep the library default. Profiles are written by
+`python -m benchmarks.autotune` and picked up from DEEPSHIELD_THREAD_PROFILE.
+"""
+import os
+import json
+
+DEFAULT_PROFILE = {
+    'tf_intra_op_threads': None,
+    'tf_inter_op_threads': None,
+    'cv2_threads': None,
+    'blas_threads': None,
+    'job_workers': None,
+    'bot_executor_workers': None,
+    'ensemble_workers': None,
+    'soundtrack_workers': None
+}
+
+# Variables read by the BLAS/OpenMP runtimes when they start
+BLAS_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS',
+                 'NUMEXPR_NUM_THREADS')
+
+
+def load_profile(path=None):
+    """
+    Profile from a JSON file (default: $DEEPSHIELD_THREAD_PROFILE), merged
+    over DEFAULT_PROFILE; the defaults alone when no file is configured
+    """
+    profile = dict(DEFAULT_PROFILE)
+    path = path or os.getenv('DEEPSHIELD_THREAD_PROFILE')
+    if not path:
+        return profile
+
+    with open(path) as f:
+        stored = json.load(f)
+    for key, value in stored.get('profile', stored).items():
+        if key in profile:
+            profile[key] = value
+        else:
+            print(f"⚠️ Unknown thread profile setting ignored: {key}")
+    return profile
+
+
+def save_profile(profile, path, meta=None):
+    """Write a profile (and optional benchmark metadata) as JSON"""
+    with open(path, 'w') as f:
+        json.dump({'profile': {key: profile.get(key) for key in DEFAULT_PROFILE}, 'meta': meta or {}}, f, indent=2)
+
+
+def blas_env(profile):
+    """Environment variables capping BLAS/OpenMP pools, for processes started with them"""
+    if not profile.get('blas_threads'):
+        return {}
+    return {name: str(profile['blas_threads']) for name in BLAS_ENV_VARS}
+
+
+def apply_profile(profile):
+    """
+    Apply the library thread limits of a profile to this process
+
+    BLAS/OpenMP pools already loaded are resized through threadpoolctl when
+    it is installed; the environment is updated either way so pools loaded
+    later and child processes follow. TensorFlow only accepts thread counts
+    before its runtime starts, so apply profiles before loading models.
+
+    Returns:
+        dict of the settings that took effect in this process (blas_threads
+        only when threadpoolctl resized the running pools)
+    """
+    applied = {}
+
+    if profile.get('blas_threads'):
+        os.environ.update(blas_env(profile))
+        try:
+            from threadpoolctl import threadpool_limits
+            threadpool_limits(limits=profile['blas_threads'])
+            applied['blas_threads'] = profile['blas_threads']
+        except ImportError:
+            # Pools already loaded in this process keep their size; only later ones read the variables
+            print("⚠️ threadpoolctl not installed: BLAS threads not limited in this process")
+
+    if profile.get('cv2_threads') is not None:
+        import cv2
+        cv2.setNumThreads(profile['cv2_threads'])
+        applied['cv2_threads'] = profile['cv2_threads']
+
+    if profile.get('tf_intra_op_threads') or profile.get('tf_inter_op_threads'):
+        try:
+            import tensorflow as tf
+            if profile.get('tf_intra_op_threads'):
+                tf.config.threading.set_intra_op_parallelism_threads(profile['tf_intra_op_threads'])
+                applied['tf_intra_op_threads'] = profile['tf_intra_op_threads']
+            if profile.get('tf_inter_op_threads'):
+                tf.config.threading.set_inter_op_parallelism_threads(profile['tf_inter_op_threads'])
+                applied['tf_inter_op_threads'] = profile['tf_inter_op_threads']
+        except ImportError:
+            pass
+        except RuntimeError as e:
+            print(f"⚠️ TensorFlow threads already fixed for this process: {e}")
+
+    return applied
+
+
+def candidate_profiles(cpu_count=None):
+    """
+    Profiles worth benchmarking on this machine: the library defaults (no
+    job_workers; benchmarked at every concurrency), and for each request
+    concurrency, every library capped to its share of the cores so
+    concurrent requests do not oversubscribe the CPU
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    candidates = [dict(DEFAULT_PROFILE)]
+    for workers in sorted({1, 2, 4, max(cpu_count // 4, 1)}):
+        if workers > cpu_count:
+            continue
+        share = max(cpu_count // workers, 1)
+        for inter_op in (1, 2):
+            candidates.append(dict(
+                DEFAULT_PROFILE,
+                tf_intra_op_threads=share,
+                tf_inter_op_threads=inter_op,
+                cv2_threads=share,
+                blas_threads=share,
+                job_workers=workers,
+                bot_executor_workers=workers,
+                ensemble_workers=min(workers, 3),
+                soundtrack_workers=workers
+            ))
+    return candidates
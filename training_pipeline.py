@@ -0,0 +1,188 @@
+"""
+tf.data input pipelines used by AccurateDeepfakeDetector.train_model.
+
+Image training reads the face crops that dataset_cache.CropCache produced
+with a process pool (dlib face detection is GIL-bound, so it cannot scale
+inside tf.data map calls). Shards are read interleaved, cached to a local
+file after the first epoch, shuffled, batched, normalized in parallel and
+prefetched.
+"""
+import os
+import glob
+import json
+import time
+import zlib
+import hashlib
+
+import numpy as np
+import tensorflow as tf
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+
+def split_items(items, validation_split=0.1):
+    """Deterministic train/validation split by path hash, stable across reruns and dataset growth"""
+    train, validation = [], []
+    for item in items:
+        bucket = zlib.crc32(item[0].encode()) % 1000
+        (validation if bucket < validation_split * 1000 else train).append(item)
+    return train, validation
+
+
+def cache_file_for(cache_dir, prefix, entries, config):
+    """
+    Dataset.cache() file name for exactly this data. tf.data reuses any
+    existing cache with the requested name, so the name hashes the sorted
+    entries (e.g. (path, label, size, mtime) per example) and the
+    preprocessing config. Caches of the same prefix built for other data,
+    and any left half-written (lockfile present) by an interrupted run, are
+    deleted first.
+    """
+    payload = json.dumps([sorted(map(list, entries)), config], sort_keys=True, default=str)
+    name = f"{prefix}_{hashlib.sha1(payload.encode()).hexdigest()[:16]}"
+    cache_file = os.path.join(cache_dir, name)
+
+    interrupted = bool(glob.glob(glob.escape(cache_file) + '*.lockfile'))
+    for path in glob.glob(os.path.join(glob.escape(cache_dir), glob.escape(prefix) + '_*')):
+        if interrupted or not os.path.basename(path).startswith(name):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return cache_file
+
+
+def _prepare_crops(training):
+    def prepare(crops, labels):
+        x = tf.cast(crops, tf.float32) / 127.5 - 1.0  # FaceForensics++ normalization
+        if training:
+            x = tf.image.random_flip_left_right(x)
+        return x, tf.cast(labels, tf.float32)
+    return prepare
+
+
+def crop_dataset(cache, paths, batch_size, training=True, cache_file=None, cycle_length=4, shuffle_buffer=2048):
+    """
+    Batched (x, label) dataset over cached face crops
+
+    Args:
+        cache: dataset_cache.CropCache holding the crops
+        paths: Source paths to include (all crops of each, e.g. every sampled video frame)
+        batch_size: Examples per batch
+        training: Shuffle and augment
+        cache_file: Local file for Dataset.cache() ('' keeps it in memory, None disables);
+            name it with cache_file_for so stale caches are never reused
+        cycle_length: Shards read concurrently by interleave
+    """
+    groups = cache.shard_groups(cache.keys_for(paths))
+    if not groups:
+        return None
+    rows = {shard: (indices, labels) for shard, indices, labels in groups}
+    crop_shape = np.load(groups[0][0], mmap_mode='r').shape[1:]
+
+    def read_shard(shard):
+        shard = shard.decode()
+        crops = np.load(shard, mmap_mode='r')
+        indices, labels = rows[shard]
+        for index, label in zip(indices, labels):
+            yield crops[index], label
+
+    signature = (tf.TensorSpec(crop_shape, tf.uint8), tf.TensorSpec((), tf.int32))
+    ds = tf.data.Dataset.from_tensor_slices([shard for shard, _, _ in groups])
+    ds = ds.interleave(
+        lambda shard: tf.data.Dataset.from_generator(read_shard, output_signature=signature, args=(shard,)),
+        cycle_length=cycle_length,
+        num_parallel_calls=AUTOTUNE,
+        deterministic=not training
+    )
+    if cache_file is not None:
+        ds = ds.cache(cache_file)
+    if training:
+        ds = ds.shuffle(shuffle_buffer, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+    ds = ds.map(_prepare_crops(training), num_parallel_calls=AUTOTUNE)
+    return ds.prefetch(AUTOTUNE)
+
+
+def embedding_dataset(embeddings, labels, batch_size, training=True):
+    """Batched dataset over precomputed backbone embeddings (head-only training)"""
+    ds = tf.data.Dataset.from_tensor_slices((embeddings.astype(np.float32), labels.astype(np.float32)))
+    if training:
+        ds = ds.shuffle(len(labels), reshuffle_each_iteration=True)
+    return ds.batch(batch_size).prefetch(AUTOTUNE)
+
+
+def audio_dataset(items, preprocess, batch_size, training=True, cache_file=None, num_shards=8, shuffle_buffer=1024):
+    """
+    Batched (spectrogram, label) dataset over audio files
+
+    Args:
+        items: (path, label) pairs
+        preprocess: Callable path -> (1, 128, 128, 1) array or None (detector.preprocess_audio)
+        num_shards: File-list shards read interleaved so decoding overlaps across files
+    """
+    if not items:
+        return None
+    paths = [path for path, _ in items]
+    labels = [label for _, label in items]
+
+    def load(path):
+        x = preprocess(path.decode())
+        if x is None:
+            return np.zeros((128, 128, 1), dtype=np.float32), np.bool_(False)
+        return x[0].astype(np.float32), np.bool_(True)
+
+    def load_tf(path, label):
+        x, ok = tf.numpy_function(load, [path], (tf.float32, tf.bool))
+        x.set_shape((128, 128, 1))
+        ok.set_shape(())
+        return x, tf.cast(label, tf.float32), ok
+
+    base = tf.data.Dataset.from_tensor_slices((paths, labels))
+    num_shards = max(1, min(num_shards, len(paths)))
+    ds = tf.data.Dataset.range(num_shards).interleave(
+        lambda i: base.shard(num_shards, i),
+        cycle_length=num_shards,
+        num_parallel_calls=AUTOTUNE,
+        deterministic=not training
+    )
+    ds = ds.map(load_tf, num_parallel_calls=AUTOTUNE)
+    ds = ds.filter(lambda x, y, ok: ok).map(lambda x, y, ok: (x, y))
+    if cache_file is not None:
+        ds = ds.cache(cache_file)
+    if training:
+        ds = ds.shuffle(shuffle_buffer, reshuffle_each_iteration=True)
+    return ds.batch(batch_size).prefetch(AUTOTUNE)
+
+
+class ThroughputLogger(tf.keras.callbacks.Callback):
+    """Logs training examples/sec per epoch (the validation pass is not counted)"""
+
+    def __init__(self, examples_per_epoch):
+        super().__init__()
+        self.examples_per_epoch = examples_per_epoch
+        self.history = []
+        self._start = None
+        self._validation_start = None
+        self._validation_seconds = 0.0
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+        self._validation_seconds = 0.0
+
+    def on_test_begin(self, logs=None):
+        # During fit, test callbacks bracket the validation pass at the end of each epoch
+        self._validation_start = time.perf_counter()
+
+    def on_test_end(self, logs=None):
+        if self._validation_start is not None:
+            self._validation_seconds += time.perf_counter() - self._validation_start
+            self._validation_start = None
+
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = time.perf_counter() - self._start - self._validation_seconds
+        rate = self.examples_per_epoch / seconds if seconds > 0 else 0.0
+        self.history.append(rate)
+        if logs is not None:
+            logs['examples_per_sec'] = rate
+        print(f"⏱️  Epoch {epoch + 1}: {rate:.1f} examples/sec ({seconds:.1f}s)")